@@ -1,8 +1,21 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
-from app.core.dependencies import get_deepfake_detector, get_db
-from app.db import DatabaseManager
+from fastapi import APIRouter, UploadFile, File, Query, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse, FileResponse, Response
+from app.core.config import get_settings
+from app.core.dependencies import (
+    get_inference_executor, get_result_cache, get_db, get_blob_store, get_job_queue
+)
+from app.db import DatabaseManager, BlobStore
+from app.db.result_cache import ResultCache, content_hash, perceptual_hash
+from app.inference.executor import InferenceExecutor, InferenceQueueFull
+from app.inference.jobs import JobQueueFull, JobWorkerPool, LocalJobQueue
+from typing import List, Optional
+import asyncio
+import hashlib
+import os
+import tarfile
+import tempfile
 import uuid
+import zipfile
 from datetime import datetime
 
 # 추가
@@ -13,121 +26,260 @@ import numpy as np
 
 router = APIRouter(prefix="/inference", tags=["inference"])
 
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 같은 task_id 에 대한 Grad-CAM 중복 계산 방지 (task_id → 진행 중인 Future)
+_pending_explanations: dict = {}
+
+# API 프로세스 안에서 비동기 작업 큐를 소비하는 워커 (start_job_workers 에서 생성)
+job_workers: Optional[JobWorkerPool] = None
+
+
+def encode_jpeg(img_np):
+    if img_np is None: return None
+    pil_img = Image.fromarray(img_np)
+    buffered = io.BytesIO()
+    pil_img.save(buffered, format="JPEG") # JPEG로 압축
+    return buffered.getvalue()
+
+
+def decode_jpeg(data):
+    return np.array(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+def convert_to_base64(img_np):
+    if img_np is None: return None
+    return base64.b64encode(encode_jpeg(img_np)).decode("utf-8")
+
+
+def convert_from_base64(img_base64):
+    return decode_jpeg(base64.b64decode(img_base64))
+
+
+def validate_filename(filename, allowed_extensions=ALLOWED_EXTENSIONS):
+    """파일명 / 확장자 검증 후 확장자 반환 (실패 시 HTTPException)"""
+    # 파일명 검증
+    if not filename:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Filename is required"
+        )
+
+    # 파일 확장자 검증
+    filename_lower = filename.lower()
+    file_ext = filename_lower[filename_lower.rfind("."):] if "." in filename_lower else ""
+
+    if file_ext not in allowed_extensions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file format. Allowed: {', '.join(allowed_extensions)}"
+        )
+    return file_ext
+
+
+def validate_image_bytes(image_bytes):
+    """파일 크기 검증 (10MB 제한, 빈 파일 거절)"""
+    if len(image_bytes) > MAX_IMAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File too large. Maximum size: 10MB"
+        )
+
+    if len(image_bytes) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Empty file uploaded"
+        )
+
+
+def build_result(task_id, filename, file_size, is_fake, prob, orin_img_id, result_img_id, faces=None):
+    """
+    저장할 결과 문서 구성
+    is_fake / confidence 는 이미지 판정 (기본: 가장 큰 얼굴, FACE_AGGREGATION), faces 는 얼굴별 박스 / 점수
+    """
+    faces = faces or []
+    return {
+        "task_id": task_id,
+        "filename": filename,
+        "file_size": file_size,
+        "timestamp": datetime.utcnow().isoformat(),
+        "status": "done",
+        "detection_result": {
+            "is_fake": is_fake,
+            "confidence": float(prob),
+            "verdict": "TRUE" if is_fake else "FALSE",
+            "orin_img_id": orin_img_id,
+            "result_img_id": result_img_id,
+            "face_count": len(faces),
+            "faces": faces
+        }
+        # "detection_result": {
+        #     "is_fake": result["is_fake"],
+        #     "confidence": result["confidence"],
+        #     "fake_probability": result["fake_probability"],
+        #     "real_probability": result["real_probability"],
+        #     "verdict": "🚨 DEEPFAKE DETECTED" if result["is_fake"] else "✓ AUTHENTIC IMAGE"
+        # },
+        # "suspicious_regions": result["suspicious_regions"],
+        # "analysis": result.get("analysis", {}),
+        # "model_info": {
+        #     "name": result.get("model", "ensemble"),
+        #     "type": "Ensemble Detector (CNN + DeepFace + FaceRecognition)"
+        # }
+    }
+
+
+def blob_url(blob_id):
+    return f"{get_settings().API_V1_PREFIX}{router.prefix}/blob/{blob_id}"
+
+
+async def _put_image(blobs: BlobStore, img_np):
+    """JPEG 로 인코딩해서 blob 저장소에 넣고 blob id 반환 (이미지가 없으면 None)"""
+    if img_np is None: return None
+    return await blobs.put(encode_jpeg(img_np))
+
+
+async def _load_image_bytes(blobs: BlobStore, detection: dict, field: str):
+    """
+    결과 문서의 이미지 바이트 조회
+    새 문서는 {field}_id 로 blob 을 참조하고, 이전 문서는 base64 를 그대로 가지고 있음
+    """
+    blob_id = detection.get(f"{field}_id")
+    if blob_id:
+        return await blobs.get(blob_id)
+    if detection.get(field):
+        return base64.b64decode(detection[field])
+    return None
+
 
 @router.post("/upload", status_code=status.HTTP_200_OK)
 async def upload_file_for_inference(
     file: UploadFile = File(...),
-    detector=Depends(get_deepfake_detector),
-    db: DatabaseManager = Depends(get_db)
+    explain: bool = Query(True, description="false 이면 Grad-CAM 없이 점수만 계산 (score only)"),
+    mode: Optional[str] = Query(None, pattern="^(sync|async)$", description="sync | async (기본값: JOB_MODE)"),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    cache: ResultCache = Depends(get_result_cache),
+    db: DatabaseManager = Depends(get_db),
+    blobs: BlobStore = Depends(get_blob_store),
+    job_queue = Depends(get_job_queue)
 ):
     """
     프론트엔드에서 이미지 파일을 업로드하여 딥페이크 탐지를 수행합니다.
     
     - **file**: 탐지할 이미지 파일
+    - **explain**: false 이면 Grad-CAM 을 건너뜀 (result_img 는 /explanation/{task_id} 에서 생성)
+    - **mode**: async 이면 작업을 큐에 넣고 바로 202 로 응답 (결과는 /result/{task_id} 를 폴링)
     
     Returns:
         - task_id: 추론 결과를 조회할 수 있는 고유 ID
-        - status: 처리 상태 ("success")
+        - status: 처리 상태 ("success", async 모드는 "queued")
         - message: 처리 결과 메시지
+        - cached: 같은 내용(모델 버전 포함)의 이전 결과를 재사용했는지 여부
     """
     try:
-        # 파일명 검증
-        if not file.filename:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Filename is required"
-            )
-        
-        # 파일 확장자 검증
-        allowed_extensions = {".jpg", ".jpeg", ".png", ".webp"}
-        filename_lower = file.filename.lower()
-        file_ext = filename_lower[filename_lower.rfind("."):] if "." in filename_lower else ""
-        
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Unsupported file format. Allowed: {', '.join(allowed_extensions)}"
-            )
+        validate_filename(file.filename)
         
         # 이미지 파일 읽기
         image_bytes = await file.read()
+        validate_image_bytes(image_bytes)
         
-        # 파일 크기 검증 (10MB 제한)
-        max_size = 10 * 1024 * 1024  # 10MB
-        if len(image_bytes) > max_size:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="File too large. Maximum size: 10MB"
+        # 같은 내용의 업로드는 저장된 결과로 바로 응답 (추론 생략)
+        digest = content_hash(image_bytes)
+        if cache is not None:
+            cached = await cache.lookup("sha256", digest)
+            if cached is not None:
+                return _cached_response(cached)
+
+        if (mode or get_settings().JOB_MODE) == "async":
+            try:
+                task_id = await enqueue_detection(
+                    job_queue, db, blobs, file.filename, image_bytes, digest, explain
+                )
+            except JobQueueFull:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Job queue is full. Please retry later",
+                    headers={"Retry-After": str(get_settings().INFERENCE_RETRY_AFTER)}
+                )
+            return JSONResponse(
+                content={
+                    "task_id": task_id,
+                    "status": "queued",
+                    "message": "File uploaded and queued for processing",
+                    "cached": False
+                },
+                status_code=status.HTTP_202_ACCEPTED
             )
-        
-        if len(image_bytes) == 0:
+
+        # 딥페이크 탐지 수행 (워커 풀에서 실행, 큐가 가득 차면 503)
+        #result = detector.detect(image_bytes)
+        phashes = None
+        try:
+            if cache is not None and get_settings().RESULT_CACHE_PERCEPTUAL:
+                # 재인코딩 / 리사이즈된 같은 이미지는 모든 얼굴 크롭의 perceptual hash 로 찾음 (얼굴 수도 같아야 함)
+                faces = await executor.locate_faces(image_bytes)
+                if faces:
+                    phashes = [perceptual_hash(crop) for crop, _ in faces]
+                    cached = await cache.lookup_perceptual(
+                        phashes, faces[0][0], lambda result: _load_face_crop(blobs, result)
+                    )
+                    if cached is not None:
+                        await cache.remember("sha256", digest, cached["task_id"])
+                        return _cached_response(cached)
+                    detection = await executor.score_located(faces, explain=explain)
+                else:
+                    detection = (None, None, None, None, [])
+            else:
+                detection = await executor.detect(image_bytes, explain=explain)
+        except InferenceQueueFull:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Empty file uploaded"
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy. Please retry later",
+                headers={"Retry-After": str(get_settings().INFERENCE_RETRY_AFTER)}
             )
-        
-        # 딥페이크 탐지 수행
-        #result = detector.detect(image_bytes)
-        is_fake, prob, orig_img, result_img = detector.detect(image_bytes)
 
+        is_fake, prob, orig_img, result_img, faces = detection
         if is_fake is None:
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
                 detail = " No face detected in the image"
             )
-        def convert_to_base64(img_np):
-            if img_np is None: return None
-            pil_img = Image.fromarray(img_np)
-            buffered = io.BytesIO()
-            pil_img.save(buffered, format="JPEG") # JPEG로 압축
-            return base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-        # Grad-CAM 결과
-        result_img_base64 = convert_to_base64(result_img)
-        # 원본 크롭 얼굴
-        orig_img_base64 = convert_to_base64(orig_img)
+        # 이미지는 base64 로 문서에 넣지 않고 blob 저장소에 바이너리로 저장한 뒤 id 만 기록
+        # 원본 크롭 얼굴 / Grad-CAM 결과 (score only 모드에서는 Grad-CAM 이 없으므로 None)
+        orin_img_id, result_img_id = await asyncio.gather(
+            _put_image(blobs, result_img),
+            _put_image(blobs, orig_img),
+        )
 
 
         # 고유 task_id 생성
         task_id = str(uuid.uuid4())
         
         # 결과 구성
-        data = {
-            "task_id": task_id,
-            "filename": file.filename,
-            "file_size": len(image_bytes),
-            "timestamp": datetime.utcnow().isoformat(),
-            "detection_result": {
-                "is_fake": is_fake,
-                "confidence": float(prob),
-                "verdict": "TRUE" if is_fake else "FALSE",
-                "orin_img" : result_img_base64,
-                "result_img": orig_img_base64
-            }
-            # "detection_result": {
-            #     "is_fake": result["is_fake"],
-            #     "confidence": result["confidence"],
-            #     "fake_probability": result["fake_probability"],
-            #     "real_probability": result["real_probability"],
-            #     "verdict": "🚨 DEEPFAKE DETECTED" if result["is_fake"] else "✓ AUTHENTIC IMAGE"
-            # },
-            # "suspicious_regions": result["suspicious_regions"],
-            # "analysis": result.get("analysis", {}),
-            # "model_info": {
-            #     "name": result.get("model", "ensemble"),
-            #     "type": "Ensemble Detector (CNN + DeepFace + FaceRecognition)"
-            # }
-        }
+        data = build_result(
+            task_id, file.filename, len(image_bytes), is_fake, prob, orin_img_id, result_img_id, faces
+        )
         
         # Redis (cache) + MongoDB (persistent) 저장
         await db.save(task_id, data)
+
+        if cache is not None:
+            cache.record_miss()
+            await cache.remember("sha256", digest, task_id)
+            if phashes is not None:
+                await cache.remember_perceptual(phashes, task_id)
         
         # 성공 응답
         return JSONResponse(
             content={
                 "task_id": task_id,
                 "status": "success",
-                "message": "File uploaded and processed successfully"
+                "message": "File uploaded and processed successfully",
+                "cached": False
             },
             status_code=status.HTTP_200_OK
         )
@@ -141,14 +293,502 @@ async def upload_file_for_inference(
         )
 
 
+async def _load_face_crop(blobs: BlobStore, result: dict):
+    """결과 문서에 저장된 256x256 얼굴 크롭 (perceptual 캐시 후보 확인용, 없으면 None)"""
+    data = await _load_image_bytes(blobs, result.get("detection_result") or {}, "orin_img")
+    return decode_jpeg(data) if data else None
+
+
+def _cached_response(cached: dict) -> JSONResponse:
+    return JSONResponse(
+        content={
+            "task_id": cached["task_id"],
+            "status": "success",
+            "message": "Identical content already processed; returning stored result",
+            "cached": True
+        },
+        status_code=status.HTTP_200_OK
+    )
+
+
+async def enqueue_detection(job_queue, db: DatabaseManager, blobs: BlobStore,
+                            filename, image_bytes, digest, explain) -> str:
+    """
+    업로드 이미지를 작업 입력으로 저장하고 queued 상태 문서를 만든 뒤 작업을 큐에 넣음
+    (워커 프로세스도 같은 저장소에서 이미지를 읽고, 작업이 끝나면 지움)
+    """
+    task_id = str(uuid.uuid4())
+    await blobs.put_input(task_id, image_bytes)
+    job = {
+        "task_id": task_id,
+        "filename": filename,
+        "file_size": len(image_bytes),
+        "timestamp": datetime.utcnow().isoformat(),
+        "digest": digest,
+        "explain": explain,
+    }
+    await db.save(task_id, _job_document(job, "queued"))
+    try:
+        await job_queue.put(job)
+    except JobQueueFull:
+        await blobs.delete_input(task_id)
+        await db.update(task_id, _job_document(job, "failed", error="Job queue is full"))
+        raise
+    return task_id
+
+
+def _job_document(job: dict, job_status: str, error: Optional[str] = None) -> dict:
+    """탐지 결과가 아직 없는 작업의 상태 문서"""
+    doc = {
+        "task_id": job["task_id"],
+        "filename": job["filename"],
+        "file_size": job["file_size"],
+        "timestamp": job["timestamp"],
+        "status": job_status,
+    }
+    if error is not None:
+        doc["error"] = error
+    return doc
+
+
+async def process_job(job: dict):
+    """큐에서 꺼낸 작업 하나를 실행 (running → done | failed)"""
+    executor = get_inference_executor()
+    cache = get_result_cache()
+    db = get_db()
+    blobs = get_blob_store()
+    task_id = job["task_id"]
+
+    await db.update(task_id, _job_document(job, "running"))
+    try:
+        image_bytes = await blobs.get_input(task_id)
+        if image_bytes is None:
+            raise RuntimeError("Uploaded image is no longer available")
+
+        # 워커 풀이 가득 차면 거절하지 않고 잠시 뒤 다시 시도 (큐가 대기열 역할)
+        while True:
+            try:
+                detection = await executor.detect(image_bytes, explain=job["explain"])
+                break
+            except InferenceQueueFull:
+                await asyncio.sleep(get_settings().INFERENCE_RETRY_AFTER)
+
+        is_fake, prob, orig_img, result_img, faces = detection
+        if is_fake is None:
+            raise ValueError("No face detected in the image")
+
+        orin_img_id, result_img_id = await asyncio.gather(
+            _put_image(blobs, result_img),
+            _put_image(blobs, orig_img),
+        )
+        data = build_result(
+            task_id, job["filename"], job["file_size"], is_fake, prob, orin_img_id, result_img_id, faces
+        )
+        data["timestamp"] = job["timestamp"]
+        await db.update(task_id, data, record_stats=True)
+
+        if cache is not None:
+            cache.record_miss()
+            await cache.remember("sha256", job["digest"], task_id)
+    except Exception as e:
+        await db.update(task_id, _job_document(job, "failed", error=str(e)))
+        raise
+    finally:
+        await blobs.delete_input(task_id)
+
+
+def start_job_workers():
+    """API 프로세스 안의 작업 워커 시작 (로컬 큐는 다른 소비자가 없으므로 최소 1개)"""
+    global job_workers
+    if job_workers is not None:
+        return job_workers
+    queue = get_job_queue()
+    concurrency = get_settings().JOB_WORKERS
+    if isinstance(queue, LocalJobQueue):
+        concurrency = max(1, concurrency)
+    if concurrency <= 0:
+        return None
+    job_workers = JobWorkerPool(queue, process_job, concurrency)
+    job_workers.start()
+    return job_workers
+
+
+async def stop_job_workers():
+    global job_workers
+    if job_workers is not None:
+        await job_workers.stop()
+        job_workers = None
+
+
+def is_archive(filename):
+    return bool(filename) and filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def extract_archive(fileobj, filename, max_files, max_bytes):
+    """
+    zip / tar(.gz) 아카이브에서 (이름, 바이트) 목록 추출
+    tar 는 스트림 모드로 읽고, 숨김 파일 / 디렉터리는 건너뜀
+    항목 수나 전체 크기가 한도를 넘으면 ValueError
+    """
+    items = []
+    total = 0
+
+    def add(name, size, read):
+        nonlocal total
+        base = os.path.basename(name)
+        if not base or base.startswith(".") or name.startswith("__MACOSX/"):
+            return
+        if len(items) >= max_files:
+            raise ValueError(f"Too many files in archive. Maximum: {max_files}")
+        total += size
+        if total > max_bytes:
+            raise ValueError(f"Archive too large. Maximum: {max_bytes} bytes")
+        items.append((base, read()))
+
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                add(info.filename, info.file_size, lambda: archive.read(info))
+    else:
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                add(member.name, member.size, lambda: archive.extractfile(member).read())
+    return items
+
+
+@router.post("/upload/batch", status_code=status.HTTP_200_OK)
+async def upload_batch_for_inference(
+    files: List[UploadFile] = File(...),
+    explain: bool = Query(False, description="true 이면 항목마다 Grad-CAM 도 생성"),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    cache: ResultCache = Depends(get_result_cache),
+    db: DatabaseManager = Depends(get_db),
+    blobs: BlobStore = Depends(get_blob_store)
+):
+    """
+    여러 이미지를 한 번의 요청으로 탐지합니다.
+
+    - **files**: 이미지 파일들 또는 이미지가 담긴 zip / tar(.gz) 아카이브
+    - **explain**: 기본값 false (점수만 계산, Grad-CAM 은 /explanation/{task_id} 에서 생성)
+
+    얼굴 검출은 워커 풀에서 병렬로, 모든 이미지의 얼굴을 모은 Xception forward 는 BATCH_MAX_SIZE 단위 배치로 실행하고
+    결과는 Redis pipeline + MongoDB insert_many 로 한 번에 저장합니다.
+    항목별 검증 / 얼굴 미검출 오류는 해당 항목에만 표시됩니다.
+
+    Returns:
+        - items: 입력 순서대로 {filename, status, task_id | detail, cached}
+    """
+    settings = get_settings()
+    try:
+        # 1. 업로드 파일 / 아카이브 펼치기
+        entries = []
+        total_bytes = 0
+        for upload in files:
+            if is_archive(upload.filename):
+                try:
+                    extracted = await asyncio.to_thread(
+                        extract_archive,
+                        upload.file,
+                        upload.filename,
+                        settings.BATCH_UPLOAD_MAX_FILES - len(entries),
+                        settings.BATCH_UPLOAD_MAX_BYTES - total_bytes,
+                    )
+                except (zipfile.BadZipFile, tarfile.TarError) as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Invalid archive {upload.filename}: {str(e)}"
+                    )
+                except ValueError as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=str(e)
+                    )
+                entries.extend(extracted)
+                total_bytes += sum(len(data) for _, data in extracted)
+            else:
+                data = await upload.read()
+                entries.append((upload.filename, data))
+                total_bytes += len(data)
+
+            if len(entries) > settings.BATCH_UPLOAD_MAX_FILES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Too many files. Maximum: {settings.BATCH_UPLOAD_MAX_FILES}"
+                )
+            if total_bytes > settings.BATCH_UPLOAD_MAX_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Batch too large. Maximum: {settings.BATCH_UPLOAD_MAX_BYTES} bytes"
+                )
+
+        if not entries:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No files uploaded"
+            )
+
+        # 2. 항목별 검증 (단건 업로드와 같은 규칙)
+        items = [{"filename": filename} for filename, _ in entries]
+        valid = []
+        for item, (filename, data) in zip(items, entries):
+            try:
+                validate_filename(filename)
+                validate_image_bytes(data)
+            except HTTPException as e:
+                item.update(status="error", detail=e.detail)
+                continue
+            valid.append((item, data, content_hash(data)))
+
+        # 3. 내용 해시 캐시 + 같은 요청 안의 중복 제거
+        if cache is not None:
+            cached_docs = await asyncio.gather(*(cache.lookup("sha256", digest) for _, _, digest in valid))
+        else:
+            cached_docs = [None] * len(valid)
+
+        to_infer = []
+        first_by_digest = {}
+        for (item, data, digest), cached in zip(valid, cached_docs):
+            if cached is not None:
+                item.update(status="success", task_id=cached["task_id"], cached=True)
+            elif digest in first_by_digest:
+                first_by_digest[digest]["duplicates"].append(item)
+            else:
+                entry = {"item": item, "data": data, "digest": digest, "duplicates": []}
+                first_by_digest[digest] = entry
+                to_infer.append(entry)
+
+        # 4. 얼굴 검출 (병렬) → 모든 이미지의 얼굴을 모아 배치 forward
+        try:
+            face_lists = await executor.locate_faces_many([entry["data"] for entry in to_infer])
+            detected = []
+            for entry, faces in zip(to_infer, face_lists):
+                if not faces:
+                    entry["item"].update(status="error", detail="No face detected in the image")
+                else:
+                    entry["faces"] = faces
+                    detected.append(entry)
+            detections = await executor.score_images(
+                [entry["faces"] for entry in detected], explain=explain, batch_size=settings.BATCH_MAX_SIZE
+            )
+        except InferenceQueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy. Please retry later",
+                headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER)}
+            )
+
+        # 5. 이미지 blob 저장 → 결과 문서 일괄 저장
+        image_ids = await asyncio.gather(*(
+            asyncio.gather(_put_image(blobs, crop), _put_image(blobs, vis_image))
+            for _, _, vis_image, crop, _ in detections
+        ))
+        documents = {}
+        for entry, (is_fake, prob, _, _, faces), (orin_img_id, result_img_id) in zip(detected, detections, image_ids):
+            task_id = str(uuid.uuid4())
+            documents[task_id] = build_result(
+                task_id, entry["item"]["filename"], len(entry["data"]), is_fake, prob,
+                orin_img_id, result_img_id, faces
+            )
+            entry["item"].update(status="success", task_id=task_id, cached=False)
+            for duplicate in entry["duplicates"]:
+                duplicate.update(status="success", task_id=task_id, cached=True)
+
+        await db.save_many(documents)
+
+        if cache is not None:
+            for _ in documents:
+                cache.record_miss()
+            await asyncio.gather(*(
+                cache.remember("sha256", entry["digest"], entry["item"]["task_id"])
+                for entry in detected
+            ))
+
+        for entry in to_infer:
+            if entry["item"]["status"] == "error":
+                for duplicate in entry["duplicates"]:
+                    duplicate.update(status="error", detail=entry["item"]["detail"])
+
+        succeeded = sum(1 for item in items if item["status"] == "success")
+        return JSONResponse(
+            content={
+                "status": "success",
+                "count": len(items),
+                "succeeded": succeeded,
+                "failed": len(items) - succeeded,
+                "items": items
+            },
+            status_code=status.HTTP_200_OK
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+async def spool_upload(upload: UploadFile, suffix: str, max_bytes: int):
+    """
+    업로드를 청크 단위로 임시 파일에 기록 (전체를 메모리에 올리지 않음, cv2.VideoCapture 는 경로가 필요)
+    반환: (임시 파일 경로, 크기, SHA-256) — 한도를 넘으면 413, 호출 측에서 파일을 지워야 함
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File too large. Maximum size: {max_bytes} bytes"
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, size, digest.hexdigest()
+
+
+def _video_response(task_id: str, video: dict, cached: bool) -> JSONResponse:
+    return JSONResponse(
+        content={
+            "task_id": task_id,
+            "status": "success",
+            "message": "Video processed successfully" if not cached
+                       else "Identical content already processed; returning stored result",
+            "cached": cached,
+            "video": video
+        },
+        status_code=status.HTTP_200_OK
+    )
+
+
+@router.post("/upload/video", status_code=status.HTTP_200_OK)
+async def upload_video_for_inference(
+    file: UploadFile = File(...),
+    sampling: Optional[str] = Query(
+        None, pattern="^(fixed_num_frames|fixed_stride)$", description="기본값: VIDEO_SAMPLING_MODE"
+    ),
+    num_frames: Optional[int] = Query(None, ge=1, le=1000, description="fixed_num_frames 일 때 샘플 수"),
+    stride: Optional[int] = Query(None, ge=1, description="fixed_stride 일 때 프레임 간격"),
+    early_exit: Optional[bool] = Query(None, description="판정이 확실해지면 남은 프레임 생략 (기본값: VIDEO_EARLY_EXIT)"),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    cache: ResultCache = Depends(get_result_cache),
+    db: DatabaseManager = Depends(get_db),
+    blobs: BlobStore = Depends(get_blob_store)
+):
+    """
+    영상을 업로드하여 프레임 단위 딥페이크 탐지를 수행합니다.
+
+    업로드는 임시 파일로 스트리밍한 뒤 cv2.VideoCapture 로 샘플 프레임만 디코딩하고,
+    프레임마다 가장 큰 얼굴을 BATCH_MAX_SIZE 단위 배치로 점수화합니다.
+    영상 판정은 얼굴이 있는 프레임 확률의 평균입니다 (DeepfakeBench video metric 과 동일).
+
+    Returns:
+        - task_id: /result, /explanation 으로 조회 가능 (orin_img 는 가장 가짜 확률이 높은 프레임의 얼굴)
+        - video: {is_fake, confidence, verdict, sampled_frames, scored_frames, early_exit,
+                  frames: [{index, time, face, box, confidence, is_fake}, ...]}
+    """
+    settings = get_settings()
+    path = None
+    try:
+        suffix = validate_filename(file.filename, VIDEO_EXTENSIONS)
+        path, file_size, digest = await spool_upload(file, suffix, settings.VIDEO_MAX_BYTES)
+        if file_size == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Empty file uploaded"
+            )
+
+        options = {
+            "mode": sampling or settings.VIDEO_SAMPLING_MODE,
+            "num_frames": num_frames or settings.VIDEO_NUM_FRAMES,
+            "stride": stride or settings.VIDEO_STRIDE,
+            "batch_size": settings.BATCH_MAX_SIZE,
+            "early_exit": settings.VIDEO_EARLY_EXIT if early_exit is None else early_exit,
+            "min_frames": settings.VIDEO_EARLY_EXIT_MIN_FRAMES,
+            "z": settings.VIDEO_EARLY_EXIT_Z,
+        }
+
+        # 같은 영상 + 같은 샘플링 설정이면 저장된 결과 재사용
+        cache_key = f"{digest}:{options['mode']}:{options['num_frames']}:{options['stride']}:{int(options['early_exit'])}"
+        if cache is not None:
+            cached = await cache.lookup("video", cache_key)
+            if cached is not None and "video" in cached.get("detection_result", {}):
+                return _video_response(cached["task_id"], cached["detection_result"]["video"], cached=True)
+
+        try:
+            video, crop = await executor.detect_video(path, **options)
+        except InferenceQueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy. Please retry later",
+                headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER)}
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid video: {str(e)}"
+            )
+
+        if video["is_fake"] is None:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail="No face detected in the sampled frames"
+            )
+
+        task_id = str(uuid.uuid4())
+        orin_img_id = await _put_image(blobs, crop)
+        data = build_result(
+            task_id, file.filename, file_size, video["is_fake"], video["confidence"], orin_img_id, None
+        )
+        data["media_type"] = "video"
+        data["detection_result"]["video"] = video
+        await db.save(task_id, data)
+
+        if cache is not None:
+            cache.record_miss()
+            await cache.remember("video", cache_key, task_id)
+
+        return _video_response(task_id, video, cached=False)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}"
+        )
+    finally:
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+
 @router.get("/result/{task_id}")
 async def get_inference_result(
     task_id: str,
-    db: DatabaseManager = Depends(get_db)
+    inline_images: bool = Query(True, description="false 이면 이미지를 base64 로 넣지 않고 blob URL 만 반환"),
+    db: DatabaseManager = Depends(get_db),
+    blobs: BlobStore = Depends(get_blob_store)
 ):
     """
     업로드한 파일의 딥페이크 탐지 결과를 조회합니다.
     Redis → MongoDB → Fallback 순서로 조회
+
+    - **inline_images**: true 이면 orin_img / result_img 를 base64 로 채워서 반환 (기존 응답 형식),
+      false 이면 orin_img_url / result_img_url 만 반환 (이미지는 /blob/{blob_id} 에서 스트리밍)
+
+    status: queued | running | done | failed (failed 면 error 에 사유)
+    queued / running / failed 문서에는 detection_result 가 없습니다.
     """
     try:
         result = await db.get(task_id)
@@ -158,6 +798,21 @@ async def get_inference_result(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Result not found for task_id: {task_id}"
             )
+
+        # 작업 모드 이전에 저장된 문서는 status 가 없음 (모두 완료된 결과)
+        result.setdefault("status", "done")
+        if result["status"] != "done":
+            return JSONResponse(content=result, status_code=status.HTTP_200_OK)
+
+        detection = result["detection_result"]
+        for field in ("orin_img", "result_img"):
+            blob_id = detection.get(f"{field}_id")
+            if not blob_id:
+                continue
+            detection[f"{field}_url"] = blob_url(blob_id)
+            if inline_images:
+                data = await blobs.get(blob_id)
+                detection[field] = base64.b64encode(data).decode("utf-8") if data else None
         
         return JSONResponse(content=result, status_code=status.HTTP_200_OK)
         
@@ -170,10 +825,128 @@ async def get_inference_result(
         )
 
 
+@router.get("/explanation/{task_id}")
+async def get_explanation(
+    task_id: str,
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    db: DatabaseManager = Depends(get_db),
+    blobs: BlobStore = Depends(get_blob_store)
+):
+    """
+    Grad-CAM 시각화를 조회합니다.
+    score only 로 업로드된 결과는 첫 요청 시 저장된 얼굴 크롭으로 계산한 뒤 결과에 캐시합니다.
+    """
+    try:
+        result = await db.get(task_id)
+
+        if not result:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Result not found for task_id: {task_id}"
+            )
+
+        if result.get("status", "done") != "done":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Result is not ready (status: {result['status']})"
+            )
+
+        # orin_img: 얼굴 크롭, result_img: Grad-CAM 시각화
+        detection = result["detection_result"]
+        if not detection.get("result_img_id") and not detection.get("result_img"):
+            pending = _pending_explanations.get(task_id)
+            if pending is None:
+                pending = asyncio.ensure_future(_compute_explanation(task_id, result, executor, db, blobs))
+                _pending_explanations[task_id] = pending
+                pending.add_done_callback(lambda _: _pending_explanations.pop(task_id, None))
+            detection["result_img_id"] = await asyncio.shield(pending)
+
+        data = await _load_image_bytes(blobs, detection, "result_img")
+        content = {
+            "task_id": task_id,
+            "result_img": base64.b64encode(data).decode("utf-8") if data else None
+        }
+        if detection.get("result_img_id"):
+            content["result_img_url"] = blob_url(detection["result_img_id"])
+
+        return JSONResponse(content=content, status_code=status.HTTP_200_OK)
+
+    except HTTPException:
+        raise
+    except InferenceQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please retry later",
+            headers={"Retry-After": str(get_settings().INFERENCE_RETRY_AFTER)}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error computing explanation: {str(e)}"
+        )
+
+
+async def _compute_explanation(
+    task_id: str, result: dict, executor: InferenceExecutor, db: DatabaseManager, blobs: BlobStore
+) -> str:
+    """저장된 크롭(orin_img)으로 Grad-CAM 을 계산하고 blob 으로 저장한 뒤 결과 문서에 id 기록"""
+    detection = result["detection_result"]
+    crop_bytes = await _load_image_bytes(blobs, detection, "orin_img")
+    if crop_bytes is None:
+        raise RuntimeError("Stored face crop is no longer available")
+    cropped_img_np = decode_jpeg(crop_bytes)
+    vis_image = await executor.explain(cropped_img_np, detection["is_fake"])
+
+    detection["result_img_id"] = await _put_image(blobs, vis_image)
+    await db.update(task_id, result)
+    return detection["result_img_id"]
+
+
+@router.get("/blob/{blob_id}")
+async def get_blob(
+    blob_id: str,
+    request: Request,
+    blobs: BlobStore = Depends(get_blob_store)
+):
+    """
+    결과 이미지(JPEG) 스트리밍
+    blob id 는 내용의 SHA-256 이므로 내용이 절대 바뀌지 않음 → ETag + immutable 캐시
+    """
+    if not blobs.is_valid_id(blob_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid blob id"
+        )
+
+    etag = f'"{blob_id}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # 디스크에 있으면 메모리에 올리지 않고 파일을 그대로 스트리밍
+    path = blobs.path_for(blob_id)
+    if path.exists():
+        return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+    data = await blobs.get(blob_id)
+    if data is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Blob not found: {blob_id}"
+        )
+    return Response(content=data, media_type="image/jpeg", headers=headers)
+
+
 @router.get("/statistics")
 async def get_statistics(db: DatabaseManager = Depends(get_db)):
     """
-    전체 추론 통계 조회 (MongoDB 필요)
+    전체 추론 통계 조회
+    저장할 때마다 누적되는 카운터 문서 하나만 읽으므로 결과 수와 무관하게 O(1)
+    (total, fake, real, fake_rate, avg_confidence, confidence_histogram, source)
+    source 가 memory 면 MongoDB 없이 이 워커 프로세스가 저장한 결과만 센 값
     """
     try:
         stats = await db.stats()
@@ -181,7 +954,7 @@ async def get_statistics(db: DatabaseManager = Depends(get_db)):
         if not stats:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Statistics unavailable (MongoDB not connected)"
+                detail="Statistics unavailable"
             )
         
         return JSONResponse(content=stats, status_code=status.HTTP_200_OK)
@@ -193,3 +966,53 @@ async def get_statistics(db: DatabaseManager = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error: {str(e)}"
         )
+
+
+@router.get("/statistics/timeseries")
+async def get_statistics_timeseries(
+    bucket: str = Query("hour", pattern="^(hour|day)$", description="hour | day (UTC)"),
+    limit: int = Query(24, ge=1, le=1000, description="최근 구간 수"),
+    db: DatabaseManager = Depends(get_db)
+):
+    """
+    시간 / 일 단위 통계 (최신 구간부터): 구간별 fake_rate 와 confidence 히스토그램
+    """
+    try:
+        buckets = await db.stats_timeseries(bucket, limit)
+
+        if buckets is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Statistics unavailable"
+            )
+
+        return JSONResponse(
+            content={"bucket": bucket, "source": db.stats_source, "items": buckets},
+            status_code=status.HTTP_200_OK
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error: {str(e)}"
+        )
+
+
+@router.get("/metrics")
+async def get_inference_metrics(
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    cache: ResultCache = Depends(get_result_cache)
+):
+    """
+    추론 워커 풀 / 배치 엔진 상태 (큐 깊이, 처리량, 거절 수) + 결과 캐시 적중률 + 작업 큐 상태
+    """
+    return JSONResponse(
+        content={
+            "executor": executor.stats(),
+            "result_cache": cache.stats() if cache is not None else None,
+            "jobs": await job_workers.stats() if job_workers is not None else None
+        },
+        status_code=status.HTTP_200_OK
+    )
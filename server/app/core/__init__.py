@@ -2,12 +2,28 @@
 Core module for configuration and dependencies
 """
 from .config import Settings, get_settings
-from .dependencies import get_deepfake_detector, get_app_settings, get_db
+from .dependencies import (
+    get_deepfake_detector,
+    get_micro_batcher,
+    get_inference_executor,
+    get_model_version,
+    get_result_cache,
+    get_job_queue,
+    get_app_settings,
+    get_db,
+    get_blob_store,
+)
 
 __all__ = [
     "Settings",
     "get_settings",
     "get_deepfake_detector",
+    "get_micro_batcher",
+    "get_inference_executor",
+    "get_model_version",
+    "get_result_cache",
+    "get_job_queue",
     "get_app_settings",
     "get_db",
+    "get_blob_store",
 ]
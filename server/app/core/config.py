@@ -13,6 +13,65 @@ class Settings:
         self.RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
         self.RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
         self.RATE_LIMIT_PERIOD = int(os.getenv("RATE_LIMIT_PERIOD", "60"))
+        # Dynamic micro-batching (Xception forward)
+        self.BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "true").lower() == "true"
+        self.BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+        self.BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+        self.BATCH_INTRA_OP_THREADS = int(os.getenv("BATCH_INTRA_OP_THREADS", "0"))  # 0 = 사용 가능한 코어 전부
+        # Inference worker pool (thread | process)
+        self.INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread").lower()
+        self.INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+        self.INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+        self.INFERENCE_INTRA_OP_THREADS = int(os.getenv("INFERENCE_INTRA_OP_THREADS", "0"))  # 0 = auto
+        self.INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", "1"))
+        # Model replicas (none | shared_memory | mmap)
+        self.MODEL_WEIGHTS_SHARING = os.getenv("MODEL_WEIGHTS_SHARING", "none").lower()
+        self.CPU_PINNING = os.getenv("CPU_PINNING", "false").lower() == "true"
+        # uvicorn --workers 로 띄운 replica 수 (CPU 코어 분할 기준)
+        self.MODEL_REPLICAS = int(os.getenv("MODEL_REPLICAS", os.getenv("WEB_CONCURRENCY", "1")))
+        # Content-hash result cache (빈 값이면 가중치 파일에서 모델 버전 계산)
+        self.MODEL_VERSION = os.getenv("MODEL_VERSION", "")
+        self.RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+        self.RESULT_CACHE_PERCEPTUAL = os.getenv("RESULT_CACHE_PERCEPTUAL", "false").lower() == "true"
+        # perceptual 후보는 dHash Hamming 거리와 저장된 얼굴 크롭의 평균 픽셀 차이(32x32 흑백)가 모두 이하일 때만 재사용
+        self.RESULT_CACHE_PHASH_MAX_DISTANCE = int(os.getenv("RESULT_CACHE_PHASH_MAX_DISTANCE", "3"))
+        self.RESULT_CACHE_CROP_MAX_DIFF = float(os.getenv("RESULT_CACHE_CROP_MAX_DIFF", "6"))
+        self.RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "86400"))
+        self.RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+        # Face detector backend (auto | dlib_hog | dlib_cnn | haar | yunet)
+        self.FACE_DETECTOR = os.getenv("FACE_DETECTOR", "auto").lower()
+        # Face detection working resolution (긴 변 픽셀, 0 이면 원본 해상도로 검출)
+        self.FACE_DETECT_MAX_SIDE = int(os.getenv("FACE_DETECT_MAX_SIDE", "640"))
+        self.FACE_DETECT_REFINE = os.getenv("FACE_DETECT_REFINE", "true").lower() == "true"
+        # 이미지 하나에서 점수화할 최대 얼굴 수 (나머지 얼굴은 얼굴별 결과로만 보고)
+        self.FACE_MAX_PER_IMAGE = int(os.getenv("FACE_MAX_PER_IMAGE", "5"))
+        # 이미지 판정 기준 (primary: 가장 큰 얼굴 | max: FACE_MAX_MIN_SIZE 이상 얼굴 중 가짜 확률 최대)
+        self.FACE_AGGREGATION = os.getenv("FACE_AGGREGATION", "primary").lower()
+        self.FACE_MAX_MIN_SIZE = int(os.getenv("FACE_MAX_MIN_SIZE", "80"))
+        # JPEG 축소 디코딩 후에도 남길 최소 긴 변 (0 이면 항상 원본 크기로 디코딩)
+        self.FACE_DECODE_MIN_SIDE = int(os.getenv("FACE_DECODE_MIN_SIDE", "1024"))
+        # Xception 점수 계산 backend (eager | torchscript | compile | onnx | int8), Grad-CAM 은 항상 eager
+        self.INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "eager").lower()
+        # Batch upload (/upload/batch, 여러 파일 또는 zip / tar 아카이브)
+        self.BATCH_UPLOAD_MAX_FILES = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "100"))
+        self.BATCH_UPLOAD_MAX_BYTES = int(os.getenv("BATCH_UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+        # Video upload (/upload/video): 프레임 샘플링 (preprocess.py 와 같은 fixed_num_frames | fixed_stride)
+        self.VIDEO_MAX_BYTES = int(os.getenv("VIDEO_MAX_BYTES", str(200 * 1024 * 1024)))
+        self.VIDEO_SAMPLING_MODE = os.getenv("VIDEO_SAMPLING_MODE", "fixed_num_frames")
+        self.VIDEO_NUM_FRAMES = int(os.getenv("VIDEO_NUM_FRAMES", "32"))
+        self.VIDEO_STRIDE = int(os.getenv("VIDEO_STRIDE", "10"))
+        # 평균 ± z * 표준오차가 0.5 한쪽에 있으면 남은 프레임을 건너뜀
+        self.VIDEO_EARLY_EXIT = os.getenv("VIDEO_EARLY_EXIT", "true").lower() == "true"
+        self.VIDEO_EARLY_EXIT_MIN_FRAMES = int(os.getenv("VIDEO_EARLY_EXIT_MIN_FRAMES", "8"))
+        self.VIDEO_EARLY_EXIT_Z = float(os.getenv("VIDEO_EARLY_EXIT_Z", "3.0"))
+        # Async job mode (sync | async). async 면 업로드가 바로 queued 로 응답
+        self.JOB_MODE = os.getenv("JOB_MODE", "sync").lower()
+        self.JOB_QUEUE_NAME = os.getenv("JOB_QUEUE_NAME", "jobs:inference")
+        self.JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "1000"))
+        # API 프로세스 안에서 큐를 소비할 워커 수 (0 이면 python -m app.worker 에만 맡김)
+        self.JOB_WORKERS = int(os.getenv("JOB_WORKERS", os.getenv("INFERENCE_WORKERS", "2")))
+        # 통계 카운터를 결과 컬렉션에서 다시 계산하는 주기 (초, 0 이면 비활성)
+        self.STATS_RECONCILE_INTERVAL = int(os.getenv("STATS_RECONCILE_INTERVAL", "0"))
 
 
 @lru_cache
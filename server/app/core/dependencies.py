@@ -1,19 +1,148 @@
 from app.core.config import get_settings
 from app.db.database import db, DatabaseManager
+from app.db.result_cache import ResultCache
+from app.db.blob_store import blob_store, BlobStore
 from functools import lru_cache
+import hashlib
+import os
 from app.models.DeepfakeBench_main.deepfake_detector import DeepfakeDetector
+from app.inference.batching import MicroBatcher
+from app.inference.executor import InferenceExecutor
+from app.inference.jobs import LocalJobQueue, RedisJobQueue
+from app.inference.replicas import available_cpus, load_state_dict, pin_replica
+from app.models.DeepfakeBench_main.quantization import quantized_path_for
+from app.models.DeepfakeBench_main.serving_weights import resolve_weights_path
 
 WEIGHTS_PATH = "app/models/DeepfakeBench_main/training/pretrained/xception_best.pth"
 
 @lru_cache()
 def get_deepfake_detector():
-    deepfake_detector = DeepfakeDetector(weights_path = WEIGHTS_PATH, device='cpu')
+    settings = get_settings()
+    if settings.CPU_PINNING:
+        # uvicorn 워커끼리 겹치지 않는 코어 묶음을 나눠 가짐
+        pin_replica(settings.MODEL_REPLICAS)
+
+    state_dict = None
+    if settings.MODEL_WEIGHTS_SHARING == "mmap":
+        # 같은 가중치 파일을 여는 모든 워커가 page cache 를 공유
+        state_dict = load_state_dict(WEIGHTS_PATH, sharing="mmap")
+
+    deepfake_detector = DeepfakeDetector(
+        weights_path = WEIGHTS_PATH, device='cpu', state_dict=state_dict, **get_detector_options()
+    )
     return deepfake_detector
 
+def get_detector_options() -> dict:
+    """DeepfakeDetector 생성 옵션 (process 워커에도 그대로 전달)"""
+    settings = get_settings()
+    return {
+        "face_detector": settings.FACE_DETECTOR,
+        "face_detect_max_side": settings.FACE_DETECT_MAX_SIDE,
+        "face_detect_refine": settings.FACE_DETECT_REFINE,
+        "max_faces": settings.FACE_MAX_PER_IMAGE,
+        "decode_min_side": settings.FACE_DECODE_MIN_SIDE,
+        "backend": settings.INFERENCE_BACKEND,
+        "face_aggregation": settings.FACE_AGGREGATION,
+        "min_face_size": settings.FACE_MAX_MIN_SIZE,
+    }
+
+@lru_cache()
+def get_micro_batcher():
+    """배치 추론 엔진 (BATCHING_ENABLED=false 이면 None)"""
+    settings = get_settings()
+    if not settings.BATCHING_ENABLED:
+        return None
+    detector = get_deepfake_detector()
+    return MicroBatcher(
+        detector.predict_batch,
+        max_batch_size=settings.BATCH_MAX_SIZE,
+        max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+        intra_op_threads=settings.BATCH_INTRA_OP_THREADS or len(available_cpus()),
+    )
+
+@lru_cache()
+def get_inference_executor():
+    """이벤트 루프 밖에서 탐지를 수행하는 워커 풀"""
+    settings = get_settings()
+    if settings.INFERENCE_EXECUTOR == "process":
+        # 워커 프로세스마다 replica 를 로드하므로 메인 프로세스 모델은 필요 없음
+        return InferenceExecutor(
+            kind="process",
+            workers=settings.INFERENCE_WORKERS,
+            queue_size=settings.INFERENCE_QUEUE_SIZE,
+            intra_op_threads=settings.INFERENCE_INTRA_OP_THREADS,
+            weights_path=WEIGHTS_PATH,
+            device='cpu',
+            weights_sharing=settings.MODEL_WEIGHTS_SHARING,
+            cpu_pinning=settings.CPU_PINNING,
+            detector_options=get_detector_options(),
+        )
+    return InferenceExecutor(
+        kind="thread",
+        workers=settings.INFERENCE_WORKERS,
+        queue_size=settings.INFERENCE_QUEUE_SIZE,
+        intra_op_threads=settings.INFERENCE_INTRA_OP_THREADS,
+        detector=get_deepfake_detector(),
+        batcher=get_micro_batcher(),
+    )
+
+def _file_fingerprint(path: str) -> str:
+    try:
+        st = os.stat(path)
+        return f"{os.path.basename(path)}:{st.st_size}:{int(st.st_mtime)}"
+    except OSError:
+        return path
+
+@lru_cache()
+def get_model_version() -> str:
+    """
+    캐시 키에 들어가는 모델 버전 (MODEL_VERSION 또는 아래 값의 해시)
+    - 실제로 로드되는 가중치 파일 (서빙 가중치 / int8 결과물) 이름 / 크기 / 수정시각
+    - 크롭과 점수를 바꾸는 detector 옵션 (얼굴 검출 backend / 해상도 / refine, 판정 기준, 점수 backend 등)
+    """
+    settings = get_settings()
+    if settings.MODEL_VERSION:
+        return settings.MODEL_VERSION
+    options = get_detector_options()
+    parts = [_file_fingerprint(resolve_weights_path(WEIGHTS_PATH))]
+    if options["backend"] == "int8":
+        # INT8 점수는 float 과 조금씩 다르므로 결과물 자체로 캐시를 분리
+        parts.append(_file_fingerprint(quantized_path_for(WEIGHTS_PATH)))
+    parts.extend(f"{key}={options[key]}" for key in sorted(options))
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+@lru_cache()
+def get_result_cache():
+    """업로드 내용 해시 → 기존 결과 캐시 (RESULT_CACHE_ENABLED=false 이면 None)"""
+    settings = get_settings()
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    return ResultCache(
+        db,
+        model_version=get_model_version(),
+        ttl=settings.RESULT_CACHE_TTL,
+        max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+        phash_max_distance=settings.RESULT_CACHE_PHASH_MAX_DISTANCE,
+        crop_max_difference=settings.RESULT_CACHE_CROP_MAX_DIFF,
+    )
+
+@lru_cache()
+def get_job_queue():
+    """비동기 작업 큐 (Redis 연결 시 Redis list, 아니면 프로세스 내 큐)"""
+    settings = get_settings()
+    if db.redis_client:
+        return RedisJobQueue(db, name=settings.JOB_QUEUE_NAME, max_size=settings.JOB_QUEUE_MAX)
+    return LocalJobQueue(max_size=settings.JOB_QUEUE_MAX)
+
 def get_app_settings():
     return get_settings()
 
 
 def get_db() -> DatabaseManager:
     """데이터베이스 매니저 의존성"""
-    return db
\ No newline at end of file
+    return db
+
+
+def get_blob_store() -> BlobStore:
+    """결과 이미지 blob 저장소 의존성"""
+    return blob_store
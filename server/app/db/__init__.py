@@ -2,5 +2,15 @@
 Database module
 """
 from .database import DatabaseManager, db, get_db
+from .result_cache import ResultCache
+from .blob_store import BlobStore, blob_store, get_blob_store
 
-__all__ = ["DatabaseManager", "db", "get_db"]
+__all__ = [
+    "DatabaseManager",
+    "db",
+    "get_db",
+    "ResultCache",
+    "BlobStore",
+    "blob_store",
+    "get_blob_store",
+]
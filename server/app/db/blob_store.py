@@ -0,0 +1,199 @@
+"""
+Content-addressed blob store for result images
+
+결과 JSON 에 base64 JPEG 를 넣는 대신 원본 바이트를 따로 저장하고 참조(SHA-256)만 남긴다.
+- Redis 바이너리 키 (blob:{id}, TTL) — 최근 결과의 빠른 조회
+- 로컬 디렉터리 (BLOB_DIR/ab/cdef....jpg) — 장기 저장, 파일 스트리밍 응답
+  마지막으로 저장(같은 내용 재저장 포함)된 지 BLOB_DISK_TTL 이 지난 파일은 주기적으로 정리된다 (0 이면 보관).
+
+비동기 작업의 업로드 원본은 결과 blob 과 섞지 않고 task_id 로 따로 저장한다 (put_input).
+Redis 키 job_input:{task_id} (TTL) 또는 JOB_INPUT_DIR/{task_id}.upload 에 두고, 작업이 끝나면 지운다.
+/blob 으로는 노출되지 않으며, 지워지지 못한 파일은 TTL 이 지나면 다음 저장 시 정리된다.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from .database import db
+
+BLOB_DIR = os.getenv("BLOB_DIR", "data/blobs")
+BLOB_REDIS_TTL = int(os.getenv("BLOB_REDIS_TTL", os.getenv("REDIS_TTL", "86400")))
+BLOB_DISK_TTL = int(os.getenv("BLOB_DISK_TTL", str(30 * 86400)))
+JOB_INPUT_DIR = os.getenv("JOB_INPUT_DIR", "data/job_inputs")
+JOB_INPUT_TTL = int(os.getenv("JOB_INPUT_TTL", "86400"))
+
+
+class BlobStore:
+    """Immutable blobs addressed by the SHA-256 of their bytes"""
+
+    def __init__(self, db, blob_dir: str = BLOB_DIR, redis_ttl: int = BLOB_REDIS_TTL,
+                 input_dir: str = JOB_INPUT_DIR, input_ttl: int = JOB_INPUT_TTL,
+                 disk_ttl: int = BLOB_DISK_TTL):
+        self.db = db
+        self.blob_dir = Path(blob_dir)
+        self.redis_ttl = redis_ttl
+        self.disk_ttl = disk_ttl
+        self.input_dir = Path(input_dir)
+        self.input_ttl = input_ttl
+        self._in_memory_fallback: dict = {}
+        self._input_fallback: dict = {}
+        self._last_input_sweep = 0.0
+        self._last_blob_sweep = 0.0
+
+    def path_for(self, blob_id: str) -> Path:
+        return self.blob_dir / blob_id[:2] / f"{blob_id[2:]}.jpg"
+
+    @staticmethod
+    def is_valid_id(blob_id: str) -> bool:
+        return len(blob_id) == 64 and all(c in "0123456789abcdef" for c in blob_id)
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes):
+        """호출마다 고유한 임시 파일에 쓰고 교체 (다른 스레드 / 프로세스의 같은 blob 쓰기와 섞이지 않음)"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as f:
+            f.write(data)
+        try:
+            os.replace(f.name, path)  # 동시 쓰기에도 완성된 파일만 보이도록
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+    @staticmethod
+    def _sweep(paths, ttl: float, now: float):
+        for path in paths:
+            try:
+                if now - path.stat().st_mtime > ttl:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def _write_file(self, blob_id: str, data: bytes) -> bool:
+        self._sweep_blobs()
+        path = self.path_for(blob_id)
+        if path.exists():
+            # 다시 참조된 blob 은 정리 대상에서 미룸
+            os.utime(path)
+            return True
+        self._atomic_write(path, data)
+        return True
+
+    def _sweep_blobs(self):
+        """BLOB_DISK_TTL 동안 다시 저장되지 않은 blob 과 남은 임시 파일 삭제 (최대 한 시간에 한 번)"""
+        now = time.time()
+        if not self.disk_ttl or now - self._last_blob_sweep < min(self.disk_ttl, 3600):
+            return
+        self._last_blob_sweep = now
+        self._sweep(self.blob_dir.glob("*/*.jpg"), self.disk_ttl, now)
+        self._sweep(self.blob_dir.glob("*/*.tmp"), 3600, now)
+
+    async def put(self, data: bytes) -> str:
+        blob_id = hashlib.sha256(data).hexdigest()
+
+        async def to_redis() -> bool:
+            if not self.db.redis_binary_client:
+                return False
+            try:
+                await self.db.redis_binary_client.setex(f"blob:{blob_id}", self.redis_ttl, data)
+                return True
+            except Exception as e:
+                print(f"Redis blob save error: {e}")
+                return False
+
+        async def to_disk() -> bool:
+            try:
+                return await asyncio.to_thread(self._write_file, blob_id, data)
+            except Exception as e:
+                print(f"Blob file save error: {e}")
+                return False
+
+        results = await asyncio.gather(to_redis(), to_disk())
+        if not any(results):
+            self._in_memory_fallback[blob_id] = data
+        return blob_id
+
+    async def get(self, blob_id: str) -> Optional[bytes]:
+        """Redis → 로컬 파일 → in-memory 순서로 조회"""
+        if self.db.redis_binary_client:
+            try:
+                data = await self.db.redis_binary_client.get(f"blob:{blob_id}")
+                if data:
+                    return data
+            except Exception as e:
+                print(f"Redis blob get error: {e}")
+
+        path = self.path_for(blob_id)
+        if path.exists():
+            return await asyncio.to_thread(path.read_bytes)
+
+        return self._in_memory_fallback.get(blob_id)
+
+    def input_path_for(self, task_id: str) -> Path:
+        return self.input_dir / f"{task_id}.upload"
+
+    def _write_input(self, task_id: str, data: bytes):
+        self._sweep_inputs()
+        self._atomic_write(self.input_path_for(task_id), data)
+
+    def _sweep_inputs(self):
+        """TTL 이 지난 작업 입력 파일 삭제 (워커가 죽어서 지우지 못한 것, input_ttl 마다 최대 한 번)"""
+        now = time.time()
+        if now - self._last_input_sweep < self.input_ttl:
+            return
+        self._last_input_sweep = now
+        self._sweep(self.input_dir.glob("*.upload"), self.input_ttl, now)
+        self._sweep(self.input_dir.glob("*.tmp"), self.input_ttl, now)
+
+    async def put_input(self, task_id: str, data: bytes):
+        """비동기 작업 입력 저장 (Redis 가 있으면 TTL 키, 없으면 JOB_INPUT_DIR 파일)"""
+        if self.db.redis_binary_client:
+            try:
+                await self.db.redis_binary_client.setex(f"job_input:{task_id}", self.input_ttl, data)
+                return
+            except Exception as e:
+                print(f"Redis job input save error: {e}")
+        try:
+            await asyncio.to_thread(self._write_input, task_id, data)
+        except Exception as e:
+            print(f"Job input file save error: {e}")
+            self._input_fallback[task_id] = data
+
+    async def get_input(self, task_id: str) -> Optional[bytes]:
+        if self.db.redis_binary_client:
+            try:
+                data = await self.db.redis_binary_client.get(f"job_input:{task_id}")
+                if data:
+                    return data
+            except Exception as e:
+                print(f"Redis job input get error: {e}")
+
+        path = self.input_path_for(task_id)
+        if path.exists():
+            return await asyncio.to_thread(path.read_bytes)
+        return self._input_fallback.get(task_id)
+
+    async def delete_input(self, task_id: str):
+        """작업이 끝나면 (성공 / 실패 모두) 입력 삭제"""
+        if self.db.redis_binary_client:
+            try:
+                await self.db.redis_binary_client.delete(f"job_input:{task_id}")
+            except Exception as e:
+                print(f"Redis job input delete error: {e}")
+        try:
+            await asyncio.to_thread(self.input_path_for(task_id).unlink, missing_ok=True)
+        except OSError as e:
+            print(f"Job input file delete error: {e}")
+        self._input_fallback.pop(task_id, None)
+
+
+# Global instance
+blob_store = BlobStore(db)
+
+
+def get_blob_store() -> BlobStore:
+    """Dependency for FastAPI"""
+    return blob_store
@@ -1,15 +1,25 @@
 """
 Database module for Redis (cache) and MongoDB (persistent storage)
 """
-import redis
+import redis.asyncio as aioredis
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
+from pymongo import ReplaceOne, UpdateOne
 from typing import Optional
+import asyncio
 import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from .statistics import (
+    BUCKETS,
+    RECONCILE_PIPELINE,
+    apply_increments,
+    fold_reconcile_rows,
+    stats_increments,
+    summarize,
+)
+
 # Load .env file from project root
 env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
@@ -20,10 +30,16 @@ REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD") or None  # Empty string → None
 REDIS_TTL = int(os.getenv("REDIS_TTL", "86400"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2.0"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2.0"))
 
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 MONGODB_DB = os.getenv("MONGODB_DB", "deep_guard")
 MONGODB_COLLECTION = os.getenv("MONGODB_COLLECTION", "inference_results")
+MONGODB_STATS_COLLECTION = os.getenv("MONGODB_STATS_COLLECTION", f"{MONGODB_COLLECTION}_stats")
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_TIMEOUT_MS = int(os.getenv("MONGODB_TIMEOUT_MS", "2000"))
 
 # Log configuration on import (for debugging)
 if os.getenv("DEBUG", "false").lower() == "true":
@@ -36,79 +52,205 @@ class DatabaseManager:
     """Hybrid storage: Redis for cache, MongoDB for persistence"""
     
     def __init__(self):
-        self.redis_client: Optional[redis.Redis] = None
+        self.redis_client: Optional[aioredis.Redis] = None
+        self.redis_pool: Optional[aioredis.ConnectionPool] = None
+        # 이미지 blob 처럼 바이너리 값을 다루는 클라이언트 (decode_responses=False)
+        self.redis_binary_client: Optional[aioredis.Redis] = None
+        self.redis_binary_pool: Optional[aioredis.ConnectionPool] = None
         self.mongo_client: Optional[AsyncIOMotorClient] = None
         self.mongo_collection = None
+        self.stats_collection = None
         self._in_memory_fallback: dict = {}
+        self._stats_fallback: dict = {}
     
-    def connect_redis(self):
-        """Connect to Redis for caching"""
+    @staticmethod
+    def _make_redis_pool(decode_responses: bool) -> aioredis.ConnectionPool:
+        return aioredis.ConnectionPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            password=REDIS_PASSWORD if REDIS_PASSWORD else None,
+            decode_responses=decode_responses,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        )
+
+    async def connect_redis(self):
+        """Connect to Redis for caching (async client + connection pool)"""
         try:
-            self.redis_client = redis.Redis(
-                host=REDIS_HOST,
-                port=REDIS_PORT,
-                db=REDIS_DB,
-                password=REDIS_PASSWORD if REDIS_PASSWORD else None,
-                decode_responses=True
-            )
-            self.redis_client.ping()
-            print(f"✅ Redis connected: {REDIS_HOST}:{REDIS_PORT}")
+            self.redis_pool = self._make_redis_pool(decode_responses=True)
+            self.redis_client = aioredis.Redis(connection_pool=self.redis_pool)
+            await self.redis_client.ping()
+            self.redis_binary_pool = self._make_redis_pool(decode_responses=False)
+            self.redis_binary_client = aioredis.Redis(connection_pool=self.redis_binary_pool)
+            print(f"✅ Redis connected: {REDIS_HOST}:{REDIS_PORT} (pool={REDIS_MAX_CONNECTIONS})")
         except Exception as e:
             print(f"⚠️  Redis unavailable: {e}")
             print("   → Fallback: in-memory cache")
+            if self.redis_pool is not None:
+                await self.redis_pool.disconnect()
             self.redis_client = None
+            self.redis_pool = None
+            self.redis_binary_client = None
+            self.redis_binary_pool = None
     
-    def connect_mongodb(self):
+    async def connect_mongodb(self):
         """Connect to MongoDB for persistent storage"""
         try:
-            self.mongo_client = AsyncIOMotorClient(MONGODB_URL)
+            self.mongo_client = AsyncIOMotorClient(
+                MONGODB_URL,
+                maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                serverSelectionTimeoutMS=MONGODB_TIMEOUT_MS,
+                socketTimeoutMS=MONGODB_TIMEOUT_MS,
+            )
             self.mongo_collection = self.mongo_client[MONGODB_DB][MONGODB_COLLECTION]
-            # Test sync connection
-            sync_client = MongoClient(MONGODB_URL, serverSelectionTimeoutMS=2000)
-            sync_client.server_info()
-            sync_client.close()
+            self.stats_collection = self.mongo_client[MONGODB_DB][MONGODB_STATS_COLLECTION]
+            # Test connection with the same async client
+            await self.mongo_client.admin.command("ping")
             print(f"✅ MongoDB connected: {MONGODB_URL}")
         except Exception as e:
             print(f"⚠️  MongoDB unavailable: {e}")
             print("   → Fallback: in-memory storage only")
+            if self.mongo_client is not None:
+                self.mongo_client.close()
             self.mongo_client = None
             self.mongo_collection = None
+            self.stats_collection = None
     
-    def disconnect(self):
+    async def disconnect(self):
         """Close all connections"""
         if self.redis_client:
-            self.redis_client.close()
+            await self.redis_client.aclose()
+        if self.redis_pool:
+            await self.redis_pool.disconnect()
+        if self.redis_binary_client:
+            await self.redis_binary_client.aclose()
+        if self.redis_binary_pool:
+            await self.redis_binary_pool.disconnect()
         if self.mongo_client:
             self.mongo_client.close()
+
+    async def _redis_write(self, task_id: str, data: dict) -> bool:
+        """Write the task document in one pipelined round trip"""
+        if not self.redis_client:
+            return False
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(f"task:{task_id}", REDIS_TTL, json.dumps(data, ensure_ascii=False))
+                await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Redis save error: {e}")
+            return False
+
+    async def _redis_write_many(self, items: dict) -> bool:
+        """Write many task documents in a single pipelined round trip"""
+        if not self.redis_client:
+            return False
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for task_id, data in items.items():
+                    pipe.setex(f"task:{task_id}", REDIS_TTL, json.dumps(data, ensure_ascii=False))
+                await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Redis bulk save error: {e}")
+            return False
+
+    async def _mongo_insert(self, task_id: str, data: dict) -> bool:
+        if self.mongo_collection is None:
+            return False
+        try:
+            doc = data.copy()
+            doc["_id"] = task_id
+            await self.mongo_collection.insert_one(doc)
+            return True
+        except Exception as e:
+            print(f"MongoDB save error: {e}")
+            return False
+
+    async def _mongo_insert_many(self, items: dict) -> bool:
+        if self.mongo_collection is None:
+            return False
+        try:
+            docs = []
+            for task_id, data in items.items():
+                doc = data.copy()
+                doc["_id"] = task_id
+                docs.append(doc)
+            await self.mongo_collection.insert_many(docs, ordered=False)
+            return True
+        except Exception as e:
+            print(f"MongoDB bulk save error: {e}")
+            return False
+
+    async def _mongo_replace(self, task_id: str, data: dict) -> bool:
+        if self.mongo_collection is None:
+            return False
+        try:
+            doc = data.copy()
+            doc["_id"] = task_id
+            await self.mongo_collection.replace_one({"_id": task_id}, doc, upsert=True)
+            return True
+        except Exception as e:
+            print(f"MongoDB update error: {e}")
+            return False
     
-    async def save(self, task_id: str, data: dict):
-        """Save to Redis (cache) + MongoDB (persistent)"""
-        saved = False
-        
-        # Redis: Fast cache with TTL
-        if self.redis_client:
+    async def _record_stats(self, documents: list):
+        """Add finished results to the incremental statistics ($inc per bucket)"""
+        increments = stats_increments(documents)
+        if not increments:
+            return
+        if self.stats_collection is not None:
             try:
-                self.redis_client.setex(
-                    f"task:{task_id}",
-                    REDIS_TTL,
-                    json.dumps(data, ensure_ascii=False)
+                await self.stats_collection.bulk_write(
+                    [UpdateOne({"_id": stats_id}, {"$inc": inc}, upsert=True)
+                     for stats_id, inc in increments.items()],
+                    ordered=False,
                 )
-                saved = True
-            except Exception as e:
-                print(f"Redis save error: {e}")
-        
-        # MongoDB: Persistent storage
-        if self.mongo_collection is not None:
-            try:
-                doc = data.copy()
-                doc["_id"] = task_id
-                await self.mongo_collection.insert_one(doc)
-                saved = True
+                return
             except Exception as e:
-                print(f"MongoDB save error: {e}")
+                print(f"MongoDB stats update error: {e}")
+        apply_increments(self._stats_fallback, increments)
+
+    async def save(self, task_id: str, data: dict):
+        """Save to Redis (cache) + MongoDB (persistent), issued concurrently"""
+        results = await asyncio.gather(
+            self._redis_write(task_id, data),
+            self._mongo_insert(task_id, data),
+            self._record_stats([data]),
+        )
         
         # Fallback: In-memory
-        if not saved:
+        if not any(results[:2]):
+            self._in_memory_fallback[task_id] = data
+    
+    async def save_many(self, items: dict):
+        """Save {task_id: data} with one Redis pipeline + one MongoDB insert_many"""
+        if not items:
+            return
+        results = await asyncio.gather(
+            self._redis_write_many(items),
+            self._mongo_insert_many(items),
+            self._record_stats(list(items.values())),
+        )
+
+        if not any(results[:2]):
+            self._in_memory_fallback.update(items)
+    
+    async def update(self, task_id: str, data: dict, record_stats: bool = False):
+        """
+        Overwrite an existing result in Redis + MongoDB (+ Fallback)
+        record_stats: 처음으로 탐지 결과가 채워지는 업데이트(비동기 작업 완료)일 때만 True
+        """
+        results = await asyncio.gather(
+            self._redis_write(task_id, data),
+            self._mongo_replace(task_id, data),
+            self._record_stats([data] if record_stats else []),
+        )
+
+        if not any(results[:2]) or task_id in self._in_memory_fallback:
             self._in_memory_fallback[task_id] = data
     
     async def get(self, task_id: str) -> Optional[dict]:
@@ -117,7 +259,7 @@ class DatabaseManager:
         # 1. Try Redis (cache)
         if self.redis_client:
             try:
-                cached = self.redis_client.get(f"task:{task_id}")
+                cached = await self.redis_client.get(f"task:{task_id}")
                 if cached and isinstance(cached, str):
                     return json.loads(cached)
             except Exception as e:
@@ -130,15 +272,7 @@ class DatabaseManager:
                 if doc:
                     doc.pop("_id", None)
                     # Re-cache to Redis
-                    if self.redis_client:
-                        try:
-                            self.redis_client.setex(
-                                f"task:{task_id}",
-                                REDIS_TTL,
-                                json.dumps(doc, ensure_ascii=False)
-                            )
-                        except:
-                            pass
+                    await self._redis_write(task_id, doc)
                     return doc
             except Exception as e:
                 print(f"MongoDB get error: {e}")
@@ -146,23 +280,81 @@ class DatabaseManager:
         # 3. Fallback
         return self._in_memory_fallback.get(task_id)
     
+    @property
+    def stats_source(self) -> str:
+        """mongodb: 모든 워커 공통 카운터 | memory: 이 프로세스가 저장한 결과만 센 카운터"""
+        return "mongodb" if self.stats_collection is not None else "memory"
+
     async def stats(self) -> Optional[dict]:
-        """Get statistics from MongoDB"""
-        if self.mongo_collection is None:
-            return None
-        
+        """Get statistics from the incremental counters (single document read)"""
+        if self.stats_collection is not None:
+            try:
+                doc = await self.stats_collection.find_one({"_id": "global"})
+            except Exception as e:
+                print(f"MongoDB stats error: {e}")
+                return None
+        else:
+            doc = self._stats_fallback.get("global")
+        return {**summarize(doc), "source": self.stats_source}
+
+    async def stats_timeseries(self, bucket: str = "hour", limit: int = 24) -> Optional[list]:
+        """Most recent hourly / daily buckets, newest first"""
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unknown statistics bucket: {bucket}")
+        prefix = f"{bucket}:"
+
+        if self.stats_collection is not None:
+            try:
+                # _id 범위 조회라 기본 인덱스만으로 limit 개만 읽음
+                cursor = self.stats_collection.find(
+                    {"_id": {"$gte": prefix, "$lt": f"{bucket};"}}
+                ).sort("_id", -1).limit(limit)
+                docs = await cursor.to_list(length=limit)
+            except Exception as e:
+                print(f"MongoDB stats error: {e}")
+                return None
+        else:
+            docs = [
+                {"_id": stats_id, **doc}
+                for stats_id, doc in sorted(self._stats_fallback.items(), reverse=True)
+                if stats_id.startswith(prefix)
+            ][:limit]
+
+        return [{"bucket": doc["_id"][len(prefix):], **summarize(doc)} for doc in docs]
+
+    async def ensure_stats(self):
+        """Build the statistics documents once if results exist but counters do not"""
+        if self.mongo_collection is None or self.stats_collection is None:
+            return
         try:
-            total = await self.mongo_collection.count_documents({})
-            fake = await self.mongo_collection.count_documents({"detection_result.is_fake": True})
-            return {
-                "total": total,
-                "fake": fake,
-                "real": total - fake,
-                "fake_rate": fake / total if total > 0 else 0
-            }
-        except:
+            if await self.stats_collection.find_one({"_id": "global"}) is not None:
+                return
+            if await self.mongo_collection.estimated_document_count() == 0:
+                return
+            print("   → Building statistics counters from existing results")
+            await self.reconcile_stats()
+        except Exception as e:
+            print(f"Statistics bootstrap error: {e}")
+
+    async def reconcile_stats(self) -> Optional[dict]:
+        """
+        Rebuild the statistics documents from the results collection
+        (전체 스캔이므로 요청 경로가 아닌 주기 작업 / 수동 실행용)
+        """
+        if self.mongo_collection is None or self.stats_collection is None:
             return None
 
+        rows = await self.mongo_collection.aggregate(RECONCILE_PIPELINE).to_list(length=None)
+        docs = fold_reconcile_rows(rows)
+        if docs:
+            await self.stats_collection.bulk_write(
+                [ReplaceOne({"_id": stats_id}, doc, upsert=True) for stats_id, doc in docs.items()],
+                ordered=False,
+            )
+        # 결과가 모두 만료 / 삭제된 구간의 통계 문서 정리
+        await self.stats_collection.delete_many({"_id": {"$nin": list(docs.keys())}})
+        return summarize(docs.get("global"))
+
 
 # Global instance
 db = DatabaseManager()
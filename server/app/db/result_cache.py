@@ -0,0 +1,204 @@
+"""
+Content-addressed result cache
+
+업로드 바이트의 SHA-256 (및 선택적으로 얼굴 크롭의 perceptual hash)를 키로
+이미 저장된 task_id 를 찾아 추론을 건너뛴다.
+perceptual hash 는 후보를 찾는 힌트일 뿐이다. 얼굴 수가 같고 모든 얼굴의 Hamming 거리가 임계값 이하이며
+저장된 (가장 큰) 얼굴 크롭과 픽셀 차이도 임계값 이하일 때만 결과를 재사용한다
+(해시 충돌 / 비슷하지만 다르게 조작된 얼굴 / 같은 주 얼굴에 다른 얼굴이 추가된 이미지 방지).
+모델 버전이 키에 포함되므로 가중치가 바뀌면 기존 항목은 자동으로 무효화된다.
+
+Redis 가 있으면 TTL 키로 저장하고, 없으면 프로세스 내 LRU(최대 항목 수 + TTL)로 대체한다.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+from PIL import Image
+
+# 64bit dHash 를 16bit 씩 나눈 band 별로 저장 (Hamming 거리 3 이하면 최소 한 band 는 정확히 일치)
+PHASH_BANDS = 4
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(pil_img, hash_size: int = 8) -> str:
+    """
+    dHash: 재인코딩 / 리사이즈에도 유지되는 64bit 해시
+    (hash_size+1) x hash_size 흑백 축소 후 가로 인접 픽셀 대소 비교
+    pil_img 는 PIL 이미지 또는 RGB uint8 배열 (detector 얼굴 크롭)
+    """
+    if not isinstance(pil_img, Image.Image):
+        pil_img = Image.fromarray(pil_img)
+    small = pil_img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def crop_difference(a, b, size: int = 32) -> float:
+    """두 얼굴 크롭(PIL 또는 RGB 배열)을 size x size 흑백으로 줄였을 때 평균 절대 픽셀 차이 (0-255)"""
+    def small(img):
+        if not isinstance(img, Image.Image):
+            img = Image.fromarray(img)
+        return np.asarray(img.convert("L").resize((size, size), Image.BILINEAR), dtype=np.float32)
+    return float(np.abs(small(a) - small(b)).mean())
+
+
+class ResultCache:
+    """hash → task_id mapping with hit/miss counters"""
+
+    def __init__(
+        self,
+        db,
+        model_version: str,
+        ttl: int = 86400,
+        max_entries: int = 10000,
+        phash_max_distance: int = 3,
+        crop_max_difference: float = 6.0,
+    ):
+        self.db = db
+        self.model_version = model_version
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.phash_max_distance = phash_max_distance
+        self.crop_max_difference = crop_max_difference
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.perceptual_hits = 0
+        self.perceptual_rejects = 0
+        self.misses = 0
+
+    def _key(self, kind: str, digest: str) -> str:
+        return f"cache:{self.model_version}:{kind}:{digest}"
+
+    async def lookup(self, kind: str, digest: str) -> Optional[dict]:
+        """
+        캐시된 결과 문서 반환 (없거나 원본 결과가 만료됐으면 None)
+        kind: "sha256" | "video" (영상은 digest + 샘플링 설정), perceptual hash 는 lookup_perceptual 사용
+        """
+        key = self._key(kind, digest)
+        task_id = await self._get(key)
+        if task_id is not None:
+            result = await self.db.get(task_id)
+            if result is not None:
+                self.hits += 1
+                return result
+            await self._delete(key)
+        return None
+
+    def _band_keys(self, phash: str) -> list:
+        width = len(phash) // PHASH_BANDS
+        return [self._key("phash", f"{i}:{phash[i * width:(i + 1) * width]}") for i in range(PHASH_BANDS)]
+
+    async def lookup_perceptual(
+        self, phashes: list, crop, load_crop: Callable[[dict], Awaitable[Optional[np.ndarray]]]
+    ) -> Optional[dict]:
+        """
+        perceptual hash 가 가까운 이전 결과 중 얼굴 크롭까지 일치하는 결과 문서 (없으면 None)
+        phashes: 이미지의 모든 얼굴 크롭 hash (큰 얼굴부터), crop: 가장 큰 얼굴 크롭
+        load_crop: 결과 문서 → 저장된 256x256 RGB 얼굴 크롭
+        """
+        candidates = {}
+        for key in self._band_keys(phashes[0]):
+            value = await self._get(key)
+            if value is None:
+                continue
+            stored, task_id = value.split(":", 1)
+            stored_hashes = stored.split(",")
+            if len(stored_hashes) != len(phashes):
+                continue
+            distances = [hamming_distance(a, b) for a, b in zip(phashes, stored_hashes)]
+            if max(distances) <= self.phash_max_distance:
+                candidates[task_id] = sum(distances)
+
+        for task_id in sorted(candidates, key=candidates.get):
+            result = await self.db.get(task_id)
+            if result is None:
+                continue
+            stored_crop = await load_crop(result)
+            if stored_crop is not None and crop_difference(crop, stored_crop) <= self.crop_max_difference:
+                self.perceptual_hits += 1
+                return result
+            self.perceptual_rejects += 1
+        return None
+
+    async def remember_perceptual(self, phashes: list, task_id: str):
+        """가장 큰 얼굴의 hash band 로 색인하고 모든 얼굴의 hash 를 함께 저장"""
+        for key in self._band_keys(phashes[0]):
+            await self._set(key, f"{','.join(phashes)}:{task_id}")
+
+    def record_miss(self):
+        """캐시로 해결하지 못하고 추론을 실행한 경우"""
+        self.misses += 1
+
+    async def remember(self, kind: str, digest: str, task_id: str):
+        await self._set(self._key(kind, digest), task_id)
+
+    async def _get(self, key: str) -> Optional[str]:
+        if self.db.redis_client:
+            try:
+                return await self.db.redis_client.get(key)
+            except Exception as e:
+                print(f"Redis cache get error: {e}")
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            task_id, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return task_id
+
+    async def _set(self, key: str, task_id: str):
+        if self.db.redis_client:
+            try:
+                await self.db.redis_client.setex(key, self.ttl, task_id)
+                return
+            except Exception as e:
+                print(f"Redis cache set error: {e}")
+
+        with self._lock:
+            self._local[key] = (task_id, time.monotonic() + self.ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    async def _delete(self, key: str):
+        if self.db.redis_client:
+            try:
+                await self.db.redis_client.delete(key)
+            except Exception:
+                pass
+        with self._lock:
+            self._local.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.perceptual_hits + self.misses
+        return {
+            "model_version": self.model_version,
+            "hits": self.hits,
+            "perceptual_hits": self.perceptual_hits,
+            "perceptual_rejects": self.perceptual_rejects,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.perceptual_hits) / lookups if lookups else 0.0,
+            "local_entries": len(self._local),
+        }
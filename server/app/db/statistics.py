@@ -0,0 +1,131 @@
+"""
+Incremental inference statistics
+
+결과를 저장할 때마다 통계 문서에 $inc 로 카운터를 더해서 /statistics 가 컬렉션 크기와
+상관없이 문서 하나만 읽도록 한다.
+
+통계 문서 (_id)
+- "global"               : 전체 누적
+- "hour:2025-12-01T05"   : 시간 단위 (UTC)
+- "day:2025-12-01"       : 일 단위 (UTC)
+
+각 문서: {total, fake, confidence_sum, hist: {"0": n, ..., "9": n}}
+hist 는 confidence(가짜 확률)를 0.1 간격 10 구간으로 나눈 히스토그램이다.
+
+reconcile 은 결과 컬렉션 전체를 집계해서 통계 문서를 다시 만든다 (카운터 드리프트 보정용).
+    python -m app.db.statistics
+"""
+import asyncio
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+HISTOGRAM_BINS = 10
+BUCKETS = ("hour", "day")
+
+
+def histogram_bin(confidence: float) -> int:
+    return min(HISTOGRAM_BINS - 1, max(0, int(confidence * HISTOGRAM_BINS)))
+
+
+def bucket_ids(timestamp: str) -> List[str]:
+    """ISO timestamp (UTC) → 통계 문서 _id 목록"""
+    return ["global", f"hour:{timestamp[:13]}", f"day:{timestamp[:10]}"]
+
+
+def stats_increments(documents: Iterable[dict]) -> Dict[str, dict]:
+    """
+    결과 문서들 → {stats _id: $inc 필드} (탐지 결과가 없는 queued / failed 문서는 제외)
+    """
+    increments: Dict[str, dict] = defaultdict(lambda: defaultdict(int))
+    for data in documents:
+        detection = data.get("detection_result")
+        if not detection or not data.get("timestamp"):
+            continue
+        confidence = float(detection["confidence"])
+        for stats_id in bucket_ids(data["timestamp"]):
+            inc = increments[stats_id]
+            inc["total"] += 1
+            inc["fake"] += 1 if detection["is_fake"] else 0
+            inc["confidence_sum"] += confidence
+            inc[f"hist.{histogram_bin(confidence)}"] += 1
+    return {stats_id: dict(inc) for stats_id, inc in increments.items()}
+
+
+def apply_increments(target: Dict[str, dict], increments: Dict[str, dict]):
+    """in-memory fallback 용: $inc 를 dict 에 직접 적용"""
+    for stats_id, inc in increments.items():
+        doc = target.setdefault(stats_id, {"total": 0, "fake": 0, "confidence_sum": 0.0, "hist": {}})
+        for field, value in inc.items():
+            if field.startswith("hist."):
+                key = field.split(".", 1)[1]
+                doc["hist"][key] = doc["hist"].get(key, 0) + value
+            else:
+                doc[field] = doc.get(field, 0) + value
+
+
+def summarize(doc: Optional[dict]) -> dict:
+    """통계 문서 → API 응답 형식"""
+    doc = doc or {}
+    total = int(doc.get("total", 0))
+    fake = int(doc.get("fake", 0))
+    hist = doc.get("hist", {})
+    return {
+        "total": total,
+        "fake": fake,
+        "real": total - fake,
+        "fake_rate": fake / total if total > 0 else 0,
+        "avg_confidence": doc.get("confidence_sum", 0.0) / total if total > 0 else 0,
+        "confidence_histogram": [int(hist.get(str(i), 0)) for i in range(HISTOGRAM_BINS)],
+    }
+
+
+# 결과 컬렉션에서 (시간, 판정, 히스토그램 구간) 별 개수를 집계하는 파이프라인
+RECONCILE_PIPELINE = [
+    {"$match": {"detection_result.confidence": {"$exists": True}}},
+    {"$group": {
+        "_id": {
+            "hour": {"$substrCP": ["$timestamp", 0, 13]},
+            "is_fake": "$detection_result.is_fake",
+            "bin": {"$min": [
+                HISTOGRAM_BINS - 1,
+                {"$floor": {"$multiply": ["$detection_result.confidence", HISTOGRAM_BINS]}},
+            ]},
+        },
+        "count": {"$sum": 1},
+        "confidence_sum": {"$sum": "$detection_result.confidence"},
+    }},
+]
+
+
+def fold_reconcile_rows(rows: Iterable[dict]) -> Dict[str, dict]:
+    """RECONCILE_PIPELINE 결과 → 통계 문서 {_id: doc}"""
+    docs: Dict[str, dict] = {}
+    increments: Dict[str, dict] = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        key = row["_id"]
+        hour = key["hour"]
+        for stats_id in ("global", f"hour:{hour}", f"day:{hour[:10]}"):
+            inc = increments[stats_id]
+            inc["total"] += row["count"]
+            inc["fake"] += row["count"] if key["is_fake"] else 0
+            inc["confidence_sum"] += row["confidence_sum"]
+            inc[f"hist.{int(key['bin'])}"] += row["count"]
+    apply_increments(docs, {stats_id: dict(inc) for stats_id, inc in increments.items()})
+    for stats_id, doc in docs.items():
+        doc["_id"] = stats_id
+        doc["total"] = int(doc["total"])
+        doc["fake"] = int(doc["fake"])
+        doc["hist"] = {k: int(v) for k, v in doc["hist"].items()}
+    return docs
+
+
+async def _main():
+    from app.db.database import db
+    await db.connect_mongodb()
+    result = await db.reconcile_stats()
+    print(f"Rebuilt statistics: {result}")
+    await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
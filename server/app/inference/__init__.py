@@ -2,5 +2,17 @@
 Inference module for deepfake detection
 """
 from .detection_service import DeepfakeDetectionService
+from .batching import MicroBatcher
+from .executor import InferenceExecutor, InferenceQueueFull
+from .jobs import JobQueueFull, LocalJobQueue, RedisJobQueue, JobWorkerPool
 
-__all__ = ["DeepfakeDetectionService"]
+__all__ = [
+    "DeepfakeDetectionService",
+    "MicroBatcher",
+    "InferenceExecutor",
+    "InferenceQueueFull",
+    "JobQueueFull",
+    "LocalJobQueue",
+    "RedisJobQueue",
+    "JobWorkerPool",
+]
@@ -0,0 +1,135 @@
+"""
+Dynamic micro-batching for the Xception forward pass
+
+동시에 들어온 요청들의 전처리된 얼굴 텐서를 큐에 모았다가
+max_batch_size 개가 모이거나 max_wait_ms 가 지나면 한 번의 forward 로 처리하고,
+샘플별 prob 를 각 요청의 Future 로 돌려준다.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+import torch
+
+
+class MicroBatcher:
+    """Thread-backed batching engine shared by all requests of one process"""
+
+    def __init__(
+        self,
+        predict_fn: Callable[[torch.Tensor], List[float]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        intra_op_threads: int = 0,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        # 배치 forward 는 이 스레드 하나에서만 실행되므로 워커 수로 나누지 않은 스레드 수를 사용 (0 = torch 기본값)
+        self.intra_op_threads = max(0, intra_op_threads)
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # 모니터링용 카운터
+        self.batches_run = 0
+        self.samples_run = 0
+
+    def start(self):
+        """백그라운드 배치 스레드 시작 (이미 실행 중이면 무시)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="micro-batcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """남은 요청을 처리한 뒤 스레드 종료"""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, img_tensor: torch.Tensor) -> Future:
+        """
+        (1, 3, H, W) 또는 (3, H, W) 텐서를 큐에 넣고 prob 를 받을 Future 반환
+        동기 코드(워커 스레드)에서 호출 가능
+        """
+        if img_tensor.dim() == 3:
+            img_tensor = img_tensor.unsqueeze(0)
+        self.start()
+        future: Future = Future()
+        self._queue.put((img_tensor, future))
+        return future
+
+    async def infer(self, img_tensor: torch.Tensor) -> float:
+        """asyncio 핸들러용: 이벤트 루프를 막지 않고 prob 대기"""
+        return await asyncio.wrap_future(self.submit(img_tensor))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "intra_op_threads": self.intra_op_threads,
+            "queue_depth": self.queue_depth,
+            "batches_run": self.batches_run,
+            "samples_run": self.samples_run,
+            "avg_batch_size": self.samples_run / self.batches_run if self.batches_run else 0.0,
+        }
+
+    def _collect(self, first: tuple) -> tuple:
+        """첫 요청 이후 max_wait 동안 최대 max_batch_size 개까지 모음"""
+        items = [first]
+        deadline = time.monotonic() + self.max_wait
+        stop = False
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            items.append(item)
+        return items, stop
+
+    def _run(self):
+        if self.intra_op_threads:
+            torch.set_num_threads(self.intra_op_threads)
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            items, stop = self._collect(first)
+            self._flush(items)
+            if stop:
+                return
+
+    def _flush(self, items: list):
+        futures = [future for _, future in items]
+        try:
+            batch = torch.cat([tensor for tensor, _ in items], dim=0)
+            probs = self.predict_fn(batch)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.samples_run += len(items)
+        for future, prob in zip(futures, probs):
+            if not future.done():
+                future.set_result(float(prob))
@@ -0,0 +1,333 @@
+"""
+Bounded inference executor
+
+동기 탐지 파이프라인(dlib 얼굴 검출, torch forward, Grad-CAM backward)을
+이벤트 루프 밖의 워커 풀에서 실행한다.
+
+- thread: 한 프로세스 안의 공유 모델 + micro-batcher
+          워커 풀은 얼굴 검출 / 전처리 / Grad-CAM 만 실행하고, batcher 결과는 이벤트 루프에서 기다리므로
+          admission 한도(workers + queue_size)만큼의 요청이 동시에 같은 배치에 들어갈 수 있다.
+          배치 forward 는 batcher 스레드에서 전체 intra-op 스레드로, 워커 풀은 코어를 워커 수로 나눠 실행
+- process: 워커 프로세스마다 모델 replica (가중치는 공유 메모리 / mmap 으로 공유 가능)
+
+실행 중 + 대기 중 작업 수가 workers + queue_size 를 넘으면 InferenceQueueFull 로 거절한다.
+"""
+import asyncio
+import contextlib
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+
+import torch
+import torch.multiprocessing as torch_mp
+
+from app.inference.replicas import available_cpus, cpu_slices, load_state_dict, pin_to_cpus
+
+
+class InferenceQueueFull(Exception):
+    """Admission queue is full; the caller should retry later"""
+
+
+def resolve_intra_op_threads(workers: int, intra_op_threads: int = 0) -> int:
+    """워커 하나가 쓸 torch intra-op 스레드 수 (0 이면 코어 수를 워커 수로 나눔)"""
+    if intra_op_threads > 0:
+        return intra_op_threads
+    return max(1, len(available_cpus()) // max(1, workers))
+
+
+def face_tensors_local(detector, faces):
+    """thread 모드: batcher 에 넣을 얼굴별 (1, 3, 256, 256) 텐서"""
+    return [detector.face_tensor(crop) for crop, _ in faces]
+
+
+def detect_video_local(detector, video_path: str, options: dict):
+    """thread 모드: 영상 프레임은 이미 batch_size 단위로 묶이므로 batcher 를 거치지 않고 직접 forward"""
+    return detector.detect_video(video_path, **options)
+
+
+# process 모드에서 워커 프로세스마다 하나씩 로드되는 replica
+_worker_detector = None
+
+
+def _init_process_worker(
+    weights_path: str,
+    device: str,
+    intra_op_threads: int,
+    state_dict=None,
+    weights_sharing: str = "none",
+    cpu_slot_queue=None,
+    detector_options=None,
+):
+    global _worker_detector
+    if cpu_slot_queue is not None:
+        # replica 마다 겹치지 않는 코어 묶음에 고정
+        pin_to_cpus(cpu_slot_queue.get())
+    else:
+        torch.set_num_threads(intra_op_threads)
+
+    if state_dict is None and weights_sharing == "mmap":
+        state_dict = load_state_dict(weights_path, sharing="mmap")
+
+    from app.models.DeepfakeBench_main.deepfake_detector import DeepfakeDetector
+    _worker_detector = DeepfakeDetector(
+        weights_path=weights_path, device=device, state_dict=state_dict, **(detector_options or {})
+    )
+
+
+def _detect_in_worker(image_bytes: bytes, explain: bool = True):
+    return _worker_detector.detect_faces(image_bytes, explain=explain)
+
+
+def _locate_in_worker(image_bytes: bytes):
+    return _worker_detector.locate_faces(image_bytes)
+
+
+def _score_located_in_worker(faces, explain: bool = True):
+    return _worker_detector.score_located(faces, explain=explain)
+
+
+def _locate_many_in_worker(images):
+    return _worker_detector.locate_faces_many(images)
+
+
+def _score_images_in_worker(face_lists, explain: bool = True, batch_size: int = 16):
+    return _worker_detector.score_images(face_lists, explain=explain, batch_size=batch_size)
+
+
+def _explain_in_worker(cropped_img_np, is_fake: bool):
+    return _worker_detector.explain(cropped_img_np, is_fake)
+
+
+def _detect_video_in_worker(video_path: str, options: dict):
+    return _worker_detector.detect_video(video_path, **options)
+
+
+class InferenceExecutor:
+    """Worker pool with an admission queue and queue-depth metrics"""
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: int = 2,
+        queue_size: int = 32,
+        intra_op_threads: int = 0,
+        detector=None,
+        batcher=None,
+        weights_path: Optional[str] = None,
+        device: str = "cpu",
+        weights_sharing: str = "none",
+        cpu_pinning: bool = False,
+        detector_options: Optional[dict] = None,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.intra_op_threads = resolve_intra_op_threads(self.workers, intra_op_threads)
+        self.batcher = batcher if kind == "thread" else None
+        self.detector = detector if kind == "thread" else None
+
+        if kind == "thread":
+            if detector is None:
+                raise ValueError("thread executor requires a detector")
+            if batcher is None:
+                # 모든 워커 스레드가 같은 intra-op 풀을 쓰므로 전체 코어를 넘지 않도록 분할
+                torch.set_num_threads(self.intra_op_threads)
+            # batcher 가 있으면 배치 forward 는 batcher 스레드가 전체 스레드로 실행하고 (MicroBatcher.intra_op_threads)
+            # 워커 스레드의 Grad-CAM 만 분할된 스레드 수로 실행
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="inference",
+                initializer=torch.set_num_threads,
+                initargs=(self.intra_op_threads,),
+            )
+            self._detect_fn = detector.detect_faces
+            self._locate_fn = detector.locate_faces
+            self._score_located_fn = detector.score_located
+            self._explain_fn = detector.explain
+            self._locate_many_fn = detector.locate_faces_many
+            self._score_images_fn = detector.score_images
+            self._detect_video_fn = partial(detect_video_local, detector)
+        else:
+            if weights_path is None:
+                raise ValueError("process executor requires weights_path")
+            # torch 의 multiprocessing context 로 넘기면 공유 메모리 텐서가 복사 없이 전달됨
+            mp_context = torch_mp.get_context("spawn")
+
+            state_dict = None
+            if weights_sharing == "shared_memory":
+                state_dict = load_state_dict(weights_path, sharing="shared_memory")
+
+            cpu_slot_queue = None
+            if cpu_pinning:
+                slices = cpu_slices(self.workers)
+                self.intra_op_threads = min(len(cpus) for cpus in slices)
+                cpu_slot_queue = mp_context.Queue()
+                for cpus in slices:
+                    cpu_slot_queue.put(cpus)
+
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=mp_context,
+                initializer=_init_process_worker,
+                initargs=(
+                    weights_path,
+                    device,
+                    self.intra_op_threads,
+                    state_dict,
+                    weights_sharing,
+                    cpu_slot_queue,
+                    detector_options,
+                ),
+            )
+            self._detect_fn = _detect_in_worker
+            self._locate_fn = _locate_in_worker
+            self._score_located_fn = _score_located_in_worker
+            self._explain_fn = _explain_in_worker
+            self._locate_many_fn = _locate_many_in_worker
+            self._score_images_fn = _score_images_in_worker
+            self._detect_video_fn = _detect_video_in_worker
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._total_latency = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    @property
+    def queue_depth(self) -> int:
+        """워커를 기다리는 작업 수 (실행 중인 작업 제외, batcher 결과를 기다리는 요청 포함)"""
+        return max(0, self._in_flight - self.workers)
+
+    def _admit(self):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise InferenceQueueFull(
+                    f"Inference queue is full ({self._in_flight}/{self.capacity})"
+                )
+            self._in_flight += 1
+
+    def _release(self, ok: bool, latency: float):
+        with self._lock:
+            self._in_flight -= 1
+            if ok:
+                self.completed += 1
+                self._total_latency += latency
+            else:
+                self.failed += 1
+
+    @contextlib.asynccontextmanager
+    async def _admitted(self):
+        """요청 하나가 여러 단계(워커 풀 / batcher)를 거치는 동안 admission 슬롯 하나를 점유"""
+        self._admit()
+        start = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self._release(ok, time.monotonic() - start)
+
+    async def _in_pool(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, fn, *args)
+
+    async def run(self, fn, *args):
+        """임의의 동기 함수를 admission 제어 하에 워커 풀에서 실행"""
+        async with self._admitted():
+            return await self._in_pool(fn, *args)
+
+    async def _score_batched(self, faces, explain: bool):
+        """
+        얼굴들을 batcher 에 한꺼번에 넣어 같은 배치로 점수화하고 이미지 단위로 집계
+        배치 결과는 이벤트 루프에서 기다리므로 대기 중에는 워커 스레드를 점유하지 않음
+        """
+        tensors = await self._in_pool(face_tensors_local, self.detector, faces)
+        probs = await asyncio.gather(*(asyncio.wrap_future(self.batcher.submit(t)) for t in tensors))
+        return await self._in_pool(partial(self.detector.score_located, faces, explain=explain, probs=list(probs)))
+
+    async def detect(self, image_bytes: bytes, explain: bool = True):
+        """
+        (is_fake, prob, vis_image, cropped_img_np, faces) — 얼굴이 없으면 (None, None, None, None, [])
+        이미지 판정은 DeepfakeDetector.score_located 기준 (기본: 가장 큰 얼굴)
+        """
+        if self.batcher is None:
+            return await self.run(self._detect_fn, image_bytes, explain)
+        async with self._admitted():
+            faces = await self._in_pool(self._locate_fn, image_bytes)
+            if not faces:
+                return None, None, None, None, []
+            return await self._score_batched(faces, explain)
+
+    async def locate_faces(self, image_bytes: bytes):
+        """얼굴 검출 + 크롭만 수행 ([(256x256 RGB 크롭, 박스), ...])"""
+        return await self.run(self._locate_fn, image_bytes)
+
+    async def score_located(self, faces, explain: bool = True):
+        """locate_faces 결과로 점수 + (선택) Grad-CAM 계산 (detect 와 같은 튜플)"""
+        if self.batcher is None:
+            return await self.run(self._score_located_fn, faces, explain)
+        async with self._admitted():
+            return await self._score_batched(faces, explain)
+
+    async def explain(self, cropped_img_np, is_fake: bool):
+        """저장된 256x256 크롭으로 Grad-CAM 시각화 생성"""
+        return await self.run(self._explain_fn, cropped_img_np, is_fake)
+
+    async def locate_faces_many(self, images: list):
+        """
+        여러 이미지의 얼굴 검출을 워커 수만큼 나눠 병렬 실행 (입력 순서 유지)
+        디코딩 + 얼굴 검출은 이미지 단위라 배치 대신 워커 간 병렬화
+        """
+        if not images:
+            return []
+        chunk_size = -(-len(images) // self.workers)
+        chunks = [images[i:i + chunk_size] for i in range(0, len(images), chunk_size)]
+        results = await asyncio.gather(*(self.run(self._locate_many_fn, chunk) for chunk in chunks))
+        return [faces for chunk in results for faces in chunk]
+
+    async def score_images(self, face_lists: list, explain: bool = True, batch_size: int = 16):
+        """
+        여러 이미지의 얼굴들을 batch_size 단위 forward 로 점수화 후 이미지별 집계
+        (이미지마다 detect 와 같은 튜플, 얼굴이 없으면 None)
+        """
+        if not face_lists:
+            return []
+        return await self.run(self._score_images_fn, face_lists, explain, batch_size)
+
+    async def detect_video(self, video_path: str, **options):
+        """
+        디스크에 있는 영상 하나를 워커 하나에서 끝까지 처리 (프레임 디코딩 → 얼굴 검출 → 배치 forward)
+        반환: (영상 요약 dict, 대표 프레임 256x256 크롭) — DeepfakeDetector.detect_video 참고
+        """
+        return await self.run(self._detect_video_fn, video_path, options)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "intra_op_threads": self.intra_op_threads,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "queue_depth": self.queue_depth,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_latency_ms": (self._total_latency / self.completed * 1000.0) if self.completed else 0.0,
+                "batcher": self.batcher.stats() if self.batcher is not None else None,
+                "face_detector": self.detector.face_detector.stats() if self.detector is not None else None,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
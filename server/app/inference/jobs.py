@@ -0,0 +1,142 @@
+"""
+Asynchronous inference jobs
+
+업로드 요청은 작업을 큐에 넣고 task_id 를 바로 돌려주고, 워커가 큐에서 꺼내 탐지를 수행한다.
+결과 문서의 status 가 queued → running → done | failed 로 바뀌며 /result/{task_id} 로 조회한다.
+
+- RedisJobQueue: Redis list (LPUSH / BRPOP). API 프로세스 안의 워커와
+  별도 워커 프로세스(python -m app.worker)가 같은 큐를 나눠 소비할 수 있다.
+- LocalJobQueue: 프로세스 내 asyncio.Queue (Redis 가 없을 때 / 테스트용 대체)
+
+작업은 꺼내는 순간 큐에서 사라지므로 (at-most-once) 워커가 죽으면 해당 작업은 running 으로 남는다.
+"""
+import asyncio
+import json
+from typing import Awaitable, Callable, List, Optional
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+
+class JobQueueFull(Exception):
+    """The job queue reached its maximum length; the caller should retry later"""
+
+
+class LocalJobQueue:
+    """In-process job queue"""
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max(0, max_size)
+        self._queue: Optional[asyncio.Queue] = None
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # 이벤트 루프 안에서 처음 쓰일 때 생성
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        return self._queue
+
+    async def put(self, job: dict):
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self.max_size})")
+
+    async def get(self, timeout: float = 1.0) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def size(self) -> int:
+        return self.queue.qsize()
+
+
+class RedisJobQueue:
+    """Job queue backed by a Redis list shared across processes"""
+
+    def __init__(self, db, name: str = "jobs:inference", max_size: int = 1000):
+        self.db = db
+        self.name = name
+        self.max_size = max(0, max_size)
+
+    async def put(self, job: dict):
+        if self.max_size and await self.size() >= self.max_size:
+            raise JobQueueFull(f"Job queue is full ({self.max_size})")
+        await self.db.redis_client.lpush(self.name, json.dumps(job, ensure_ascii=False))
+
+    async def get(self, timeout: float = 1.0) -> Optional[dict]:
+        # BRPOP 대기 시간은 소켓 타임아웃(REDIS_SOCKET_TIMEOUT)보다 짧아야 함
+        item = await self.db.redis_client.brpop(self.name, timeout=max(1, int(timeout)))
+        if item is None:
+            return None
+        _, payload = item
+        return json.loads(payload)
+
+    async def size(self) -> int:
+        return await self.db.redis_client.llen(self.name)
+
+
+class JobWorkerPool:
+    """N concurrent consumers that pull jobs from a queue and run the handler"""
+
+    def __init__(self, queue, handler: Callable[[dict], Awaitable[None]], concurrency: int = 2):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+        # 모니터링용 카운터
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._consume(), name=f"job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        """새 작업은 받지 않고 진행 중인 작업이 끝날 때까지 대기"""
+        self._stopping = True
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _consume(self):
+        while not self._stopping:
+            try:
+                job = await self.queue.get(timeout=1.0)
+            except Exception as e:
+                print(f"Job queue error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if job is None:
+                continue
+
+            self.running += 1
+            try:
+                await self.handler(job)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Job {job.get('task_id')} failed: {e}")
+            finally:
+                self.running -= 1
+
+    async def stats(self) -> dict:
+        try:
+            queued = await self.queue.size()
+        except Exception:
+            queued = None
+        return {
+            "queue": type(self.queue).__name__,
+            "workers": self.concurrency,
+            "queued": queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
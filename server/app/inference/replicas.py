@@ -0,0 +1,112 @@
+"""
+Model replica helpers
+
+- 가중치 공유: state dict 를 한 번만 로드해서 여러 프로세스가 같은 메모리를 참조
+  - shared_memory: torch 공유 메모리 텐서 (process executor 가 워커에 전달)
+  - mmap: torch.load(mmap=True) — 같은 파일을 여는 모든 프로세스가 page cache 를 공유
+- CPU 고정: replica 마다 서로 겹치지 않는 코어 묶음을 할당해서 intra-op 스레드 과다 구독 방지
+"""
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+import torch
+
+from app.models.DeepfakeBench_main.serving_weights import load_weights
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+WEIGHTS_SHARING_MODES = ("none", "shared_memory", "mmap")
+
+# 프로세스가 살아 있는 동안 slot 잠금을 유지하기 위해 파일 핸들을 보관
+_slot_lock_file = None
+_claimed_slot: Optional[int] = None
+
+
+def available_cpus() -> List[int]:
+    """현재 프로세스가 사용할 수 있는 코어 목록 (affinity 반영)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cpu_slices(num_replicas: int, cpus: Optional[List[int]] = None) -> List[List[int]]:
+    """
+    코어를 replica 수만큼 겹치지 않게 나눈다.
+    코어가 replica 보다 적으면 코어 하나씩 돌려가며 공유한다.
+    """
+    cpus = cpus if cpus is not None else available_cpus()
+    num_replicas = max(1, num_replicas)
+    if len(cpus) < num_replicas:
+        return [[cpus[i % len(cpus)]] for i in range(num_replicas)]
+
+    per_replica = len(cpus) // num_replicas
+    return [cpus[i * per_replica:(i + 1) * per_replica] for i in range(num_replicas)]
+
+
+def pin_to_cpus(cpus: List[int]) -> int:
+    """현재 프로세스를 주어진 코어에 고정하고 torch 스레드 수를 코어 수에 맞춤"""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    num_threads = max(1, len(cpus))
+    torch.set_num_threads(num_threads)
+    return num_threads
+
+
+def claim_replica_slot(num_replicas: int, namespace: str = "deep_guard") -> Optional[int]:
+    """
+    uvicorn --workers 처럼 인덱스를 모르는 형제 프로세스끼리 slot 번호를 나눠 갖는다.
+    파일 잠금으로 비어 있는 첫 slot 을 잡고, 프로세스가 끝나면 잠금이 자동으로 풀린다.
+    """
+    global _slot_lock_file, _claimed_slot
+    if fcntl is None:
+        return None
+    if _claimed_slot is not None:
+        return _claimed_slot
+
+    lock_dir = tempfile.gettempdir()
+    for slot in range(max(1, num_replicas)):
+        path = os.path.join(lock_dir, f"{namespace}_replica_{slot}.lock")
+        f = open(path, "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            continue
+        _slot_lock_file = f
+        _claimed_slot = slot
+        return slot
+    return None
+
+
+def pin_replica(num_replicas: int) -> Optional[List[int]]:
+    """slot 을 잡아서 해당 코어 묶음에 고정 (slot 이 없으면 고정하지 않음)"""
+    slot = claim_replica_slot(num_replicas)
+    if slot is None:
+        return None
+    cpus = cpu_slices(num_replicas)[slot]
+    pin_to_cpus(cpus)
+    return cpus
+
+
+def load_state_dict(weights_path: str, sharing: str = "none") -> Dict[str, torch.Tensor]:
+    """
+    sharing 모드에 맞게 CPU state dict 로드
+    - none: 일반 로드
+    - shared_memory: 공유 메모리로 옮김 (spawn 된 워커에 pickle 해도 복사되지 않음)
+    - mmap: 파일을 mmap 해서 페이지를 프로세스 간 공유
+    변환된 서빙 가중치(serving_weights.py)가 있으면 그 파일을 정규화 없이 바로 사용
+    """
+    if sharing not in WEIGHTS_SHARING_MODES:
+        raise ValueError(f"Unknown weights sharing mode: {sharing}")
+
+    state_dict = load_weights(weights_path, mmap=(sharing == "mmap"))
+
+    if sharing == "shared_memory":
+        for tensor in state_dict.values():
+            if isinstance(tensor, torch.Tensor):
+                tensor.share_memory_()
+    return state_dict
@@ -2,12 +2,16 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from app.api import server
-from app.core import get_settings
+from app.core import get_settings, get_micro_batcher, get_inference_executor
 from app.db import db
+import asyncio
 import time
 
 settings = get_settings()
 
+# 통계 재계산 주기 작업 (STATS_RECONCILE_INTERVAL > 0 일 때만)
+_reconcile_task = None
+
 app = FastAPI(
     title=settings.APP_NAME,
     debug=settings.DEBUG,
@@ -29,20 +33,46 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 @app.on_event("startup")
 async def startup():
     """서버 시작 시 DB 연결"""
+    global _reconcile_task
     print("=" * 50)
     print("🚀 Deep Guard Server Starting...")
     print("=" * 50)
-    db.connect_redis()
-    db.connect_mongodb()
+    await asyncio.gather(db.connect_redis(), db.connect_mongodb())
+    # 비동기 작업 큐 소비자 (Redis 가 없으면 프로세스 내 큐)
+    server.start_job_workers()
+    # 증분 통계 도입 전에 쌓인 결과가 있으면 카운터를 한 번 만들어 둠
+    asyncio.create_task(db.ensure_stats())
+    if settings.STATS_RECONCILE_INTERVAL > 0:
+        _reconcile_task = asyncio.create_task(reconcile_stats_periodically())
     print("=" * 50)
 
 
+async def reconcile_stats_periodically():
+    """증분 통계 카운터의 드리프트를 결과 컬렉션 기준으로 주기적으로 보정"""
+    while True:
+        await asyncio.sleep(settings.STATS_RECONCILE_INTERVAL)
+        try:
+            await db.reconcile_stats()
+        except Exception as e:
+            print(f"Statistics reconcile error: {e}")
+
+
 @app.on_event("shutdown")
 async def shutdown():
     """서버 종료 시 DB 연결 해제"""
     print("\n" + "=" * 50)
     print("🛑 Shutting down...")
-    db.disconnect()
+    await server.stop_job_workers()
+    if _reconcile_task is not None:
+        _reconcile_task.cancel()
+    # 이미 생성된 경우에만 정리 (종료 시 모델을 새로 로드하지 않도록)
+    if get_inference_executor.cache_info().currsize:
+        get_inference_executor().shutdown()
+    if get_micro_batcher.cache_info().currsize:
+        batcher = get_micro_batcher()
+        if batcher is not None:
+            batcher.stop()
+    await db.disconnect()
     print("=" * 50)
 
 
@@ -1,11 +1,10 @@
 import sys
 import os
+import threading
 from pathlib import Path
 import torch
 import cv2
-import dlib
 import numpy as np
-from PIL import Image
 from torchvision import transforms
 
 current_file_path = Path(__file__).resolve()
@@ -26,6 +25,12 @@ except ImportError:
 from pytorch_grad_cam import GradCAM
 from pytorch_grad_cam.utils.model_targets import ClassifierOutputTarget
 
+from face_detectors import AdaptiveFaceDetector
+from fused_preprocess import FusedPreprocessor
+from inference_backends import create_backend
+from serving_weights import load_weights
+from video_inference import VideoVerdict, open_video, read_sampled_frames, sample_frame_indices
+
 
 class DeepfakeBenchWrapper(torch.nn.Module):
     def __init__(self, model):
@@ -38,22 +43,59 @@ class DeepfakeBenchWrapper(torch.nn.Module):
 
 
 class DeepfakeDetector:
-    def __init__(self, weights_path, device='cpu'):
+    def __init__(self, weights_path, device='cpu', state_dict=None,
+                 face_detector="auto", face_detect_max_side=640, face_detect_refine=True,
+                 max_faces=5, decode_min_side=1024, backend="eager",
+                 face_aggregation="primary", min_face_size=80):
+        """
+        state_dict: 이미 로드된 (공유 메모리 / mmap) 가중치. 주어지면 파일을 다시 읽지 않고
+                    텐서를 그대로 파라미터로 사용하므로 replica 끼리 메모리를 공유한다.
+        face_detector: 얼굴 검출 backend (auto | dlib_hog | dlib_cnn | haar | yunet)
+        face_detect_max_side: 얼굴 검출용 작업 해상도 (긴 변, 0 이면 원본 해상도)
+        face_detect_refine: 축소 검출 후 원본 해상도 ROI 에서 박스 보정
+        max_faces: 이미지 하나에서 점수화할 최대 얼굴 수 (큰 얼굴부터)
+        face_aggregation: 이미지 판정 기준 (primary: 가장 큰 얼굴, max: 가짜 확률이 가장 높은 얼굴)
+        min_face_size: max 집계에 넣을 얼굴의 최소 변 길이 (원본 픽셀, 작은 오검출 박스로 판정이 뒤집히지 않도록)
+        decode_min_side: 큰 JPEG 를 축소 디코딩할 때 남길 최소 긴 변 (0 이면 원본 크기로 디코딩)
+        backend: 점수 계산 backend (eager | torchscript | compile | onnx | int8, inference_backends.py)
+        """
         self.device = device
         self.weights_path = weights_path
-        self.model = self._load_model()
+        self.max_faces = max(1, max_faces)
+        if face_aggregation not in ("primary", "max"):
+            raise ValueError(f"Unknown face aggregation: {face_aggregation} (choices: primary, max)")
+        self.face_aggregation = face_aggregation
+        self.min_face_size = min_face_size
+        self.model = self._load_model(state_dict)
+        # CAM 훅을 걸기 전에 만들어야 export / trace 에 훅이 섞이지 않음 (Grad-CAM 은 계속 eager 모델 사용)
+        self.backend = create_backend(backend, self.model, device=device, weights_path=weights_path)
         self.cam_wrapper = DeepfakeBenchWrapper(self.model)
-        self.face_detector = dlib.get_frontal_face_detector()
-        
+        # Grad-CAM 객체와 훅은 detector 당 한 번만 생성
+        self.cam = GradCAM(model=self.cam_wrapper, target_layers=[self.model.backbone.conv4])
+        self.face_detector = AdaptiveFaceDetector(
+            backend=face_detector, max_side=face_detect_max_side, refine=face_detect_refine
+        )
+        # Grad-CAM 훅은 모델 전체에 걸리므로 forward / CAM 을 여러 스레드에서 섞지 않도록 직렬화
+        self._model_lock = threading.RLock()
+        # decode → crop/resize → 정규화를 OpenCV / 공유 버퍼로 처리 (크롭은 256x256 RGB uint8 배열)
+        self.preprocessor = FusedPreprocessor(size=256, decode_min_side=decode_min_side)
+
+        # PIL 크롭을 넘기는 외부 호출용
         self.transform = transforms.Compose([
             transforms.Resize((256, 256)),
             transforms.ToTensor(),
             transforms.Normalize([0.5]*3, [0.5]*3)
         ])
 
-    def _load_model(self):
+    def _load_model(self, shared_state_dict=None):
+        """
+        가중치 파일을 한 번만 읽어 모델을 만든다.
+        - 학습용 ImageNet 초기화(config['pretrained'])는 생략: 어차피 체크포인트로 덮어쓰므로
+        - 모델은 meta 디바이스에 만들어 랜덤 초기화 메모리를 쓰지 않고, 체크포인트 텐서를 그대로 파라미터로 사용
+        - 변환된 서빙 가중치(serving_weights.py)가 있으면 정규화 없이 mmap 으로 연다
+        """
         config = {
-            'pretrained': self.weights_path,
+            'pretrained': None,
             'backbone_name': 'xception',
             'backbone_config': {
                 'mode': 'original', 
@@ -63,88 +105,291 @@ class DeepfakeDetector:
             },
             'loss_func': 'cross_entropy', 
         }
-        
-        original_torch_load = torch.load
-        def safe_cpu_load(*args, **kwargs):
-            kwargs['map_location'] = torch.device('cpu')
-            return original_torch_load(*args, **kwargs)
-            
-        try:
-            torch.load = safe_cpu_load
-            model = XceptionDetector(config)
-        finally:
-            torch.load = original_torch_load
 
         try:
-            checkpoint = torch.load(self.weights_path, map_location=self.device)
-            state_dict = checkpoint.get('state_dict') or checkpoint.get('model') or checkpoint
-            
-            new_state_dict = {}
-            for k, v in state_dict.items():
-                name = k.replace("module.", "") 
-                new_state_dict[name] = v
-            
-            model.load_state_dict(new_state_dict, strict=False)
+            # shared_state_dict: 복사 없이 공유 텐서를 파라미터로 사용
+            state_dict = shared_state_dict if shared_state_dict is not None else load_weights(self.weights_path)
+
+            with torch.device('meta'):
+                model = XceptionDetector(config)
+            model.load_state_dict(state_dict, strict=False, assign=True)
+
+            missing = [name for name, tensor in list(model.named_parameters()) + list(model.named_buffers()) if tensor.is_meta]
+            if missing:
+                # 체크포인트에 없는 텐서가 있으면 기존처럼 초기화된 모델에 복사해서 로드
+                model = XceptionDetector(config)
+                model.load_state_dict(state_dict, strict=False)
+
             model.eval().to(self.device)
-            
             return model
         except Exception as e:
             raise RuntimeError(f"가중치 적용 실패: {e}")
 
-    def detect(self, image_input):
-        pil_img = self._get_cropped_face(image_input)
+    def detect(self, image_input, explain=True):
+        """
+        explain=False 이면 Grad-CAM backward 를 건너뛰고 점수만 계산 (vis_image 는 None)
+        """
+        pil_img = self.crop_face(image_input)
         if pil_img is None:
             return None, None, None, None
 
-        img_tensor = self.transform(pil_img).unsqueeze(0).to(self.device)
-        
-        with torch.no_grad():
-            input_data = {'image': img_tensor, 'label': torch.tensor([0]).to(self.device)}
-            prob = self.model(input_data, inference=True)['prob'].item()
+        return self.score(pil_img, explain=explain)
 
+    def score(self, crop, explain=True):
+        """크롭된 얼굴 하나에 대해 (is_fake, prob, vis_image, cropped_img_np) 반환"""
+        img_tensor = self.face_tensor(crop)
+        prob = self.predict_batch(img_tensor)[0]
         is_fake = prob > 0.5
 
-        target_category = 1 if is_fake else 0
-        target_layers = [self.model.backbone.conv4] 
+        cropped_img_np = self.crop_to_array(crop)
+        vis_image = self.explain(cropped_img_np, is_fake, img_tensor) if explain else None
 
-        cam = GradCAM(model=self.cam_wrapper, target_layers=target_layers)
-        targets = [ClassifierOutputTarget(target_category)]
-        
-        grayscale_cam = cam(input_tensor=img_tensor, targets=targets)[0, :]
+        return is_fake, prob, vis_image, cropped_img_np
+
+    def detect_faces(self, image_input, explain=True):
+        """
+        이미지의 모든 얼굴(최대 max_faces)을 한 번의 배치 forward 로 점수화
+        반환: (is_fake, prob, vis_image, cropped_img_np, faces) — 얼굴이 없으면 (None, None, None, None, [])
+        """
+        faces = self.locate_faces(image_input)
+        if not faces:
+            return None, None, None, None, []
+        return self.score_located(faces, explain=explain)
+
+    def score_located(self, faces, explain=True, probs=None):
+        """
+        locate_faces 결과를 점수화 (probs 가 주어지면 forward 생략)
+        이미지 판정은 가장 큰 얼굴 기준이고 (face_aggregation=max 면 min_face_size 이상 얼굴 중 가짜 확률이 가장 높은 얼굴),
+        Grad-CAM 도 그 얼굴만 생성한다. 나머지 얼굴은 faces 에 얼굴별로 보고한다.
+        faces 항목: {"box": [x1, y1, x2, y2], "confidence": prob, "is_fake": bool}
+        """
+        if probs is None:
+            probs = self.predict_batch(self.face_batch([crop for crop, _ in faces]))
+
+        primary = self._verdict_face(faces, probs)
+        prob = probs[primary]
+        is_fake = prob > 0.5
+
+        cropped_img_np = self.crop_to_array(faces[primary][0])
+        vis_image = None
+        if explain:
+            vis_image = self.explain(cropped_img_np, is_fake, self.face_tensor(faces[primary][0]))
+
+        face_results = [
+            {"box": [int(v) for v in box], "confidence": float(p), "is_fake": bool(p > 0.5)}
+            for (_, box), p in zip(faces, probs)
+        ]
+        return is_fake, prob, vis_image, cropped_img_np, face_results
+
+    def _verdict_face(self, faces, probs):
+        """판정에 쓸 얼굴 index (faces 는 큰 얼굴부터 정렬되어 있음)"""
+        if self.face_aggregation == "primary":
+            return 0
+        candidates = [
+            i for i, (_, (x1, y1, x2, y2)) in enumerate(faces)
+            if min(x2 - x1, y2 - y1) >= self.min_face_size
+        ]
+        if not candidates:
+            return 0
+        return max(candidates, key=lambda i: probs[i])
+
+    def locate_faces_many(self, image_inputs):
+        """여러 이미지의 locate_faces 결과 목록 (얼굴이 없는 항목은 빈 리스트)"""
+        return [self.locate_faces(image_input) for image_input in image_inputs]
+
+    def score_images(self, face_lists, explain=True, batch_size=16):
+        """
+        여러 이미지의 얼굴들을 모아 batch_size 단위 forward 로 점수화한 뒤 이미지별로 집계
+        반환: 이미지마다 score_located 와 같은 튜플 (얼굴이 없으면 None)
+        """
+        crops = [crop for faces in face_lists for crop, _ in faces]
+        probs = []
+        for start in range(0, len(crops), max(1, batch_size)):
+            chunk = crops[start:start + max(1, batch_size)]
+            probs.extend(self.predict_batch(self.face_batch(chunk)))
+
+        results = []
+        offset = 0
+        for faces in face_lists:
+            if not faces:
+                results.append(None)
+                continue
+            results.append(self.score_located(faces, explain, probs[offset:offset + len(faces)]))
+            offset += len(faces)
+        return results
+
+    def detect_video(self, video_path, mode="fixed_num_frames", num_frames=32, stride=10,
+                     batch_size=16, early_exit=True, min_frames=8, z=3.0):
+        """
+        영상에서 프레임을 샘플링해 프레임마다 가장 큰 얼굴을 batch_size 단위 forward 로 점수화
+        (early_exit 이면 min_frames 단위로 forward 하고 매번 판정 확인)
+        영상 판정은 얼굴이 있는 프레임 확률의 평균이고, early_exit 이면 판정이 확실해진 시점에 중단한다.
+        반환: {"is_fake", "confidence", "frames", ...} 요약 dict 와 가장 가짜 확률이 높은 프레임의 256x256 크롭
+              (얼굴이 있는 프레임이 없으면 is_fake / confidence 가 None, 크롭도 None)
+        """
+        capture, frame_count, fps = open_video(video_path)
+        indices = sample_frame_indices(frame_count, mode, num_frames, stride)
+        verdict = VideoVerdict(min_frames=min_frames, z=z)
+        frames = []
+        pending = []
+        best = (-1.0, None)
+        stopped_early = False
+        # early exit 판정은 forward 직후에만 하므로 min_frames 단위로 나눠 forward
+        # (batch_size 단위로만 확인하면 32 프레임 / 16 배치에서 건너뛸 수 있는 배치가 하나뿐)
+        chunk_size = min(batch_size, max(1, min_frames)) if early_exit else batch_size
+
+        def flush():
+            nonlocal best
+            probs = self.predict_batch(self.face_batch([crop for _, crop in pending]))
+            verdict.add(probs)
+            for (frame, crop), prob in zip(pending, probs):
+                frame.update(confidence=float(prob), is_fake=bool(prob > 0.5))
+                if prob > best[0]:
+                    best = (prob, crop)
+            pending.clear()
+
+        try:
+            for index, img in read_sampled_frames(capture, indices, stride):
+                frame = {"index": index, "time": round(index / fps, 3) if fps else None}
+                frames.append(frame)
+                boxes = self.face_detector.detect(img)
+                if not boxes:
+                    frame["face"] = False
+                    continue
+                x1, y1, x2, y2 = max(boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]))
+                box = (max(0, x1), max(0, y1), min(img.shape[1], x2), min(img.shape[0], y2))
+                crop = self.preprocessor.crop(img, box)
+                if crop is None:
+                    frame["face"] = False
+                    continue
+                frame.update(face=True, box=[int(v) for v in box])
+                pending.append((frame, crop))
+
+                if len(pending) >= chunk_size:
+                    flush()
+                    if early_exit and verdict.decided():
+                        stopped_early = True
+                        break
+            if pending:
+                flush()
+        finally:
+            capture.release()
+
+        is_fake = verdict.is_fake if verdict.count else None
+        summary = {
+            "is_fake": is_fake,
+            "confidence": verdict.mean,
+            "verdict": None if is_fake is None else ("TRUE" if is_fake else "FALSE"),
+            "frame_count": frame_count,
+            "fps": fps,
+            "sampling": {"mode": mode, "num_frames": num_frames, "stride": stride},
+            "sampled_frames": len(frames),
+            "scored_frames": verdict.count,
+            "early_exit": stopped_early,
+            "frames": frames,
+        }
+        return summary, best[1]
+
+    def preprocess(self, image_input):
+        """
+        얼굴 크롭 + 정규화까지 수행 (배치 추론 전 단계)
+        반환: (256x256 RGB 크롭, (1, 3, 256, 256) 텐서) 또는 얼굴이 없으면 None
+        """
+        crop = self.crop_face(image_input)
+        if crop is None:
+            return None
+        return crop, self.face_tensor(crop)
+
+    def crop_face(self, image_input):
+        """이미지 경로 / 바이트에서 가장 큰 얼굴의 마진 포함 256x256 RGB 크롭 반환 (없으면 None)"""
+        faces = self._get_cropped_faces(image_input, max_faces=1)
+        return faces[0][0] if faces else None
+
+    def locate_faces(self, image_input):
+        """
+        이미지의 얼굴들을 큰 순서로 최대 max_faces 개 찾음
+        반환: [(마진 포함 256x256 RGB uint8 크롭, (x1, y1, x2, y2) 원본 좌표 박스), ...]
+        """
+        return self._get_cropped_faces(image_input, self.max_faces)
+
+    def face_tensor(self, crop):
+        """크롭된 얼굴 → 정규화된 새 (1, 3, 256, 256) 텐서 (배처 큐 / CAM 입력처럼 오래 쥐는 용도)"""
+        if isinstance(crop, np.ndarray):
+            return self.preprocessor.to_tensor(crop)
+        return self.transform(crop).unsqueeze(0)
+
+    def face_batch(self, crops):
+        """
+        크롭 여러 개 → (N, 3, 256, 256) 텐서
+        배열 크롭은 스레드별 공유 버퍼에 바로 정규화하므로 결과는 곧바로 predict_batch 에 넘길 것
+        """
+        if all(isinstance(crop, np.ndarray) for crop in crops):
+            return self.preprocessor.batch_tensor(crops)
+        return torch.cat([self.face_tensor(crop) for crop in crops])
+
+    def predict_batch(self, img_tensor):
+        """
+        (N, 3, 256, 256) 텐서를 한 번의 forward로 처리하고 샘플별 가짜 확률 리스트를 반환
+        """
+        img_tensor = img_tensor.to(self.device)
+        if not self.backend.shares_model:
+            # CAM 훅이 없는 별도 모듈이므로 lock 없이 동시에 실행
+            return self.backend(img_tensor).cpu().tolist()
+        with self._model_lock:
+            probs = self.backend(img_tensor)
+            # 상주하는 CAM 훅이 잡아 둔 activation 참조 해제
+            self._clear_cam_buffers()
+        return probs.cpu().tolist()
+
+    def crop_to_array(self, crop):
+        """결과 저장 / 시각화용 256x256 RGB 크롭"""
+        if isinstance(crop, np.ndarray):
+            return crop
+        return np.array(crop.resize((256, 256)))
+
+    def explain(self, cropped_img_np, is_fake, img_tensor=None):
+        """
+        Grad-CAM 시각화 이미지를 반환
+        img_tensor 가 없으면 저장된 256x256 크롭에서 입력 텐서를 다시 만든다 (lazy 설명용)
+        """
+        if img_tensor is None:
+            img_tensor = self.preprocessor.to_tensor(cropped_img_np)
+        img_tensor = img_tensor.to(self.device)
+        targets = [ClassifierOutputTarget(1 if is_fake else 0)]
+
+        with self._model_lock:
+            grayscale_cam = self.cam(input_tensor=img_tensor, targets=targets)[0, :]
+            self._clear_cam_buffers()
 
-        pil_img_resized = pil_img.resize((256, 256))
-        cropped_img_np = np.array(pil_img_resized)
-        
         rgb_img_float = cropped_img_np.astype(np.float32) / 255.0
-        
-        vis_image = self._apply_cam_on_image(rgb_img_float, grayscale_cam, threshold=0.3)
 
-        return is_fake, prob, vis_image, cropped_img_np
+        return self._apply_cam_on_image(rgb_img_float, grayscale_cam, threshold=0.3)
 
-    def _get_cropped_face(self, image_input):
-        if isinstance(image_input, str):
-            img = cv2.imread(image_input)
-        else:
-            img = cv2.imdecode(np.frombuffer(image_input, np.uint8), cv2.IMREAD_COLOR)
-        
-        if img is None: return None
+    def _clear_cam_buffers(self):
+        self.cam.activations_and_grads.activations = []
+        self.cam.activations_and_grads.gradients = []
 
-        detector = self.face_detector
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = detector(gray)
-        if not faces: return None
+    def _get_cropped_faces(self, image_input, max_faces):
+        # 큰 JPEG 는 축소 디코딩 (박스는 factor 를 곱해 원본 좌표로 반환)
+        img, factor = self.preprocessor.decode(image_input)
+        if img is None: return []
 
-        face = faces[0]
-        x1, y1 = face.left(), face.top()
-        x2, y2 = face.right(), face.bottom()
-        
-        w, h = x2 - x1, y2 - y1
-        margin = int(w * 0.2)
-        x1, y1 = max(0, x1 - margin), max(0, y1 - margin)
-        x2, y2 = min(img.shape[1], x2 + margin), min(img.shape[0], y2 + margin)
+        faces = self.face_detector.detect(img)
+        if not faces: return []
+
+        # 큰 얼굴부터 max_faces 개만 사용
+        faces = sorted(faces, key=lambda box: (box[2] - box[0]) * (box[3] - box[1]), reverse=True)
+
+        results = []
+        for box in faces[:max_faces]:
+            x1, y1 = max(0, box[0]), max(0, box[1])
+            x2, y2 = min(img.shape[1], box[2]), min(img.shape[0], box[3])
 
-        cropped_img_bgr = img[y1:y2, x1:x2]
-        return Image.fromarray(cv2.cvtColor(cropped_img_bgr, cv2.COLOR_BGR2RGB))
+            crop = self.preprocessor.crop(img, (x1, y1, x2, y2))
+            if crop is None:
+                continue
+            results.append((crop, (x1 * factor, y1 * factor, x2 * factor, y2 * factor)))
+        return results
 
     def _apply_cam_on_image(self, img, mask, threshold=0.3, image_weight=0.5):
         """
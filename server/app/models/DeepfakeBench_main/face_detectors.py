@@ -0,0 +1,288 @@
+"""
+Pluggable face detectors
+
+모든 backend 는 BGR 이미지를 받아 [(x1, y1, x2, y2), ...] 박스를 같은 좌표계로 반환하고,
+호출 횟수 / 평균 지연을 stats() 로 보고한다.
+
+- dlib_hog : dlib.get_frontal_face_detector (기존 기본값)
+- dlib_cnn : dlib MMOD CNN (mmod_human_face_detector.dat 필요, GPU 빌드가 아니면 느림)
+- haar     : OpenCV Haar cascade (opencv 에 포함, 가장 가벼움)
+- yunet    : OpenCV FaceDetectorYN (face_detection_yunet_*.onnx 필요, CPU 에서 빠르고 정확)
+- auto     : dlib_hog (학습 데이터 전처리와 같은 검출기)
+
+haar / yunet 은 CPU 에서 더 빠르지만 박스 크기 / 위치가 Xception 학습에 쓰인 dlib 박스와 달라
+정확도(AUC)를 확인한 뒤 FACE_DETECTOR 로 명시적으로 선택한다.
+YuNet 모델은 저장소에 포함되어 있지 않으므로 한 번 받아 둔다 (server/ 에서):
+    python -m app.models.DeepfakeBench_main.face_detectors --download-yunet
+
+AdaptiveFaceDetector 는 어떤 backend 든 감싸서
+1. 긴 변이 max_side 가 되도록 축소한 이미지에서 검출하고
+2. 박스를 원본 좌표로 되돌린 뒤
+3. (refine) 박스 주변 ROI 만 더 높은 해상도로 다시 검출해서 경계를 보정한다.
+"""
+import argparse
+import os
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import cv2
+
+try:
+    import dlib
+except ImportError:  # OpenCV backend 만 쓰는 환경
+    dlib = None
+
+DEFAULT_MODEL_DIR = Path(__file__).resolve().parent / "preprocessing" / "dlib_tools"
+DLIB_CNN_MODEL = os.getenv(
+    "FACE_DLIB_CNN_MODEL", str(DEFAULT_MODEL_DIR / "mmod_human_face_detector.dat")
+)
+YUNET_MODEL = os.getenv(
+    "FACE_YUNET_MODEL", str(DEFAULT_MODEL_DIR / "face_detection_yunet_2023mar.onnx")
+)
+YUNET_MODEL_URL = (
+    "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx"
+)
+
+# ROI 보정 시 박스 주변에 더 볼 여백 (박스 크기 대비)
+ROI_PADDING = 0.5
+
+
+class FaceDetectorBackend:
+    """Base class: subclasses implement _detect(img_bgr) -> list of boxes"""
+
+    name = "base"
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.total_ms = 0.0
+
+    def detect(self, img_bgr):
+        start = time.perf_counter()
+        boxes = self._detect(img_bgr)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with self._stats_lock:
+            self.calls += 1
+            self.total_ms += elapsed
+        return boxes
+
+    def _detect(self, img_bgr):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "backend": self.name,
+                "calls": self.calls,
+                "avg_ms": self.total_ms / self.calls if self.calls else 0.0,
+            }
+
+
+def _to_gray(img):
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+class DlibHogBackend(FaceDetectorBackend):
+    name = "dlib_hog"
+
+    def __init__(self, upsample=0):
+        super().__init__()
+        if dlib is None:
+            raise RuntimeError("dlib is not installed")
+        self.upsample = upsample
+        self._detector = dlib.get_frontal_face_detector()
+
+    def _detect(self, img_bgr):
+        rects = self._detector(_to_gray(img_bgr), self.upsample)
+        return [(r.left(), r.top(), r.right(), r.bottom()) for r in rects]
+
+
+class DlibCnnBackend(FaceDetectorBackend):
+    name = "dlib_cnn"
+
+    def __init__(self, model_path=DLIB_CNN_MODEL, upsample=0):
+        super().__init__()
+        if dlib is None:
+            raise RuntimeError("dlib is not installed")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"dlib CNN face model not found: {model_path}")
+        self.upsample = upsample
+        self._detector = dlib.cnn_face_detection_model_v1(model_path)
+
+    def _detect(self, img_bgr):
+        rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB) if img_bgr.ndim == 3 else img_bgr
+        detections = self._detector(rgb, self.upsample)
+        return [(d.rect.left(), d.rect.top(), d.rect.right(), d.rect.bottom()) for d in detections]
+
+
+class HaarBackend(FaceDetectorBackend):
+    name = "haar"
+
+    def __init__(self, scale_factor=1.1, min_neighbors=5, min_size=30):
+        super().__init__()
+        cascade_path = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        self._cascade = cv2.CascadeClassifier(cascade_path)
+        if self._cascade.empty():
+            raise RuntimeError(f"Failed to load Haar cascade: {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = (min_size, min_size)
+
+    def _detect(self, img_bgr):
+        faces = self._cascade.detectMultiScale(
+            _to_gray(img_bgr),
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=self.min_size,
+        )
+        return [(int(x), int(y), int(x + w), int(y + h)) for x, y, w, h in faces]
+
+
+class YuNetBackend(FaceDetectorBackend):
+    name = "yunet"
+
+    def __init__(self, model_path=YUNET_MODEL, score_threshold=0.8, nms_threshold=0.3):
+        super().__init__()
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"YuNet model not found: {model_path}")
+        self._detector = cv2.FaceDetectorYN.create(
+            model_path, "", (320, 320), score_threshold, nms_threshold
+        )
+        # FaceDetectorYN 은 입력 크기를 상태로 가지므로 스레드 간 호출을 직렬화
+        self._lock = threading.Lock()
+
+    def _detect(self, img_bgr):
+        if img_bgr.ndim == 2:
+            img_bgr = cv2.cvtColor(img_bgr, cv2.COLOR_GRAY2BGR)
+        h, w = img_bgr.shape[:2]
+        with self._lock:
+            self._detector.setInputSize((w, h))
+            _, faces = self._detector.detect(img_bgr)
+        if faces is None:
+            return []
+        # 점수 내림차순 (가장 확실한 얼굴이 먼저)
+        faces = sorted(faces, key=lambda f: -f[14])
+        return [(int(f[0]), int(f[1]), int(f[0] + f[2]), int(f[1] + f[3])) for f in faces]
+
+
+FACE_DETECTOR_BACKENDS = {
+    "dlib_hog": DlibHogBackend,
+    "dlib_cnn": DlibCnnBackend,
+    "haar": HaarBackend,
+    "yunet": YuNetBackend,
+}
+
+
+def create_backend(name="auto", **options) -> FaceDetectorBackend:
+    """이름으로 backend 생성 (auto: dlib_hog, haar / yunet 은 이름으로 지정할 때만 사용)"""
+    if name == "auto":
+        name = "dlib_hog"
+    if name not in FACE_DETECTOR_BACKENDS:
+        raise ValueError(
+            f"Unknown face detector: {name} (choices: auto, {', '.join(FACE_DETECTOR_BACKENDS)})"
+        )
+    return FACE_DETECTOR_BACKENDS[name](**options)
+
+
+class AdaptiveFaceDetector:
+    """Runs a backend on a downscaled copy and maps boxes back to full resolution"""
+
+    def __init__(self, backend="auto", max_side=640, refine=True, **backend_options):
+        """
+        backend: backend 이름 또는 FaceDetectorBackend 인스턴스
+        max_side: 검출용 작업 해상도 (긴 변 픽셀, 0 이면 원본 해상도로 검출)
+        refine: 축소 검출 후 원본 해상도 ROI 에서 박스 재검출
+        """
+        if isinstance(backend, str):
+            backend = create_backend(backend, **backend_options)
+        self.backend = backend
+        self.max_side = max_side
+        self.refine = refine
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    @staticmethod
+    def _resize(img, max_side):
+        """긴 변이 max_side 를 넘으면 축소하고 (이미지, 축소 비율) 반환"""
+        h, w = img.shape[:2]
+        if not max_side or max(h, w) <= max_side:
+            return img, 1.0
+        scale = max_side / max(h, w)
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA), scale
+
+    @staticmethod
+    def _unscale(box, scale, offset=(0, 0)):
+        return tuple(
+            int(round(v / scale)) + o for v, o in zip(box, (offset[0], offset[1], offset[0], offset[1]))
+        )
+
+    def detect(self, img):
+        """
+        BGR(또는 흑백) 이미지에서 얼굴 박스 목록 [(x1, y1, x2, y2), ...] 을 원본 좌표로 반환
+        박스 순서는 backend 검출 순서와 같음
+        """
+        small, scale = self._resize(img, self.max_side)
+        boxes = self.backend.detect(small)
+        if not boxes and scale < 1.0:
+            # 축소하면서 너무 작아진 얼굴은 2배 해상도로 한 번 더 시도
+            upscaled = cv2.resize(small, None, fx=2.0, fy=2.0, interpolation=cv2.INTER_LINEAR)
+            boxes = self.backend.detect(upscaled)
+            scale *= 2.0
+        if not boxes:
+            return []
+
+        boxes = [self._unscale(box, scale) for box in boxes]
+        if self.refine and scale < 1.0:
+            boxes = [self._refine(img, box) for box in boxes]
+        return boxes
+
+    def _refine(self, img, box):
+        """박스 주변 ROI 를 작업 해상도 안에서 최대한 크게 다시 검출 (실패하면 원래 박스)"""
+        x1, y1, x2, y2 = box
+        pad_x, pad_y = int((x2 - x1) * ROI_PADDING), int((y2 - y1) * ROI_PADDING)
+        rx1, ry1 = max(0, x1 - pad_x), max(0, y1 - pad_y)
+        rx2, ry2 = min(img.shape[1], x2 + pad_x), min(img.shape[0], y2 + pad_y)
+        if rx2 <= rx1 or ry2 <= ry1:
+            return box
+
+        roi, scale = self._resize(img[ry1:ry2, rx1:rx2], self.max_side)
+        found = self.backend.detect(roi)
+        if not found:
+            return box
+
+        # ROI 안에서 원래 박스 중심에 가장 가까운 검출 결과 사용
+        cx, cy = (x1 + x2) / 2 - rx1, (y1 + y2) / 2 - ry1
+        best = min(
+            found,
+            key=lambda b: ((b[0] + b[2]) / 2 / scale - cx) ** 2 + ((b[1] + b[3]) / 2 / scale - cy) ** 2,
+        )
+        return self._unscale(best, scale, offset=(rx1, ry1))
+
+    def stats(self) -> dict:
+        return {**self.backend.stats(), "max_side": self.max_side, "refine": self.refine}
+
+
+def download_yunet_model(path=YUNET_MODEL, url=YUNET_MODEL_URL):
+    """YuNet ONNX 모델을 path 에 받음 (이미 있으면 그대로 사용)"""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    urllib.request.urlretrieve(url, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Face detector utilities")
+    parser.add_argument("--download-yunet", action="store_true", help=f"YuNet 모델을 {YUNET_MODEL} 에 받음")
+    args = parser.parse_args()
+    if args.download_yunet:
+        print(download_yunet_model())
+    else:
+        parser.print_help()
@@ -0,0 +1,124 @@
+"""
+Fused decode → crop → normalize preprocessing
+
+기존 경로: bytes → imdecode(원본 크기 BGR) → cvtColor → PIL → Resize → ToTensor → Normalize
+          → (시각화용) PIL resize → numpy  — 요청마다 원본 크기 사본이 여러 개 생긴다.
+
+이 경로:
+1. JPEG 은 헤더에서 크기만 읽고 IMREAD_REDUCED_COLOR_{2,4,8} 로 DCT 단계에서 축소 디코딩
+   (긴 변이 decode_min_side 이상 남는 가장 큰 축소 비율)
+2. 얼굴 박스를 OpenCV 로 잘라(뷰) 바로 size x size 로 리사이즈 + RGB 변환 → 결과 저장 / CAM 에도 그대로 사용
+3. 정규화((x / 255 - 0.5) / 0.5)를 스레드별로 미리 할당한 float32 (N, 3, size, size) 버퍼에 직접 기록
+"""
+import io
+import threading
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class FusedPreprocessor:
+    """Decode, crop and normalize face inputs with as few full-size copies as possible"""
+
+    def __init__(self, size=256, decode_min_side=1024, margin=0.2):
+        """
+        size: 모델 입력 / 저장 크롭 크기
+        decode_min_side: 축소 디코딩 후에도 보장할 긴 변 길이 (0 이면 항상 원본 크기로 디코딩)
+        margin: 얼굴 박스 폭 대비 크롭 여백
+        """
+        self.size = size
+        self.decode_min_side = decode_min_side
+        self.margin = margin
+        self._local = threading.local()
+
+    def reduction_for(self, width, height):
+        """긴 변이 decode_min_side 이상 남는 가장 큰 축소 비율 (1, 2, 4, 8)"""
+        if not self.decode_min_side:
+            return 1
+        long_side = max(width, height)
+        for factor in (8, 4, 2):
+            if long_side // factor >= self.decode_min_side:
+                return factor
+        return 1
+
+    def decode(self, image_input):
+        """
+        이미지 경로 / 바이트 → (BGR 이미지, 축소 비율) — 실패하면 (None, 1)
+        JPEG 만 축소 디코딩 (다른 포맷은 OpenCV 가 전체 디코딩 후 줄이므로 이득이 없음)
+        """
+        if isinstance(image_input, str):
+            with open(image_input, "rb") as f:
+                image_input = f.read()
+        data = np.frombuffer(image_input, np.uint8)
+
+        factor = 1
+        if image_input[:2] == b"\xff\xd8":
+            try:
+                # 헤더만 읽음 (픽셀 디코딩 없음)
+                width, height = Image.open(io.BytesIO(image_input)).size
+                factor = self.reduction_for(width, height)
+            except Exception:
+                factor = 1
+
+        img = cv2.imdecode(data, REDUCED_FLAGS[factor])
+        if img is None and factor != 1:
+            img, factor = cv2.imdecode(data, cv2.IMREAD_COLOR), 1
+        return img, factor
+
+    def crop(self, img, box):
+        """
+        박스(+여백)를 잘라 size x size RGB uint8 로 반환 (원본에서는 뷰만 사용)
+        box 는 img 좌표계, 범위를 벗어나거나 비어 있으면 None
+        """
+        x1, y1, x2, y2 = box
+        margin = int((x2 - x1) * self.margin)
+        x1, y1 = max(0, x1 - margin), max(0, y1 - margin)
+        x2, y2 = min(img.shape[1], x2 + margin), min(img.shape[0], y2 + margin)
+        if x2 <= x1 or y2 <= y1:
+            return None
+
+        region = img[y1:y2, x1:x2]
+        shrinking = region.shape[0] > self.size or region.shape[1] > self.size
+        resized = cv2.resize(
+            region, (self.size, self.size),
+            interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR,
+        )
+        return cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=resized)
+
+    def normalize_into(self, rgb, out):
+        """(size, size, 3) uint8 RGB → out (3, size, size) float32 에 x / 127.5 - 1 기록"""
+        out_np = out.numpy()
+        for channel in range(3):
+            np.multiply(rgb[:, :, channel], np.float32(1.0 / 127.5), out=out_np[channel],
+                        dtype=np.float32, casting="unsafe")
+        out_np -= np.float32(1.0)
+        return out
+
+    def to_tensor(self, rgb):
+        """크롭 하나 → 새 (1, 3, size, size) 텐서 (다른 스레드 / 큐로 넘길 때 사용)"""
+        out = torch.empty((1, 3, self.size, self.size), dtype=torch.float32)
+        self.normalize_into(rgb, out[0])
+        return out
+
+    def batch_tensor(self, rgbs):
+        """
+        크롭 여러 개 → 스레드별 공유 버퍼의 (N, 3, size, size) 뷰
+        같은 스레드가 다음 batch_tensor 를 호출하기 전까지만 유효하므로 바로 forward 에 사용할 것
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < len(rgbs):
+            buffer = torch.empty((max(len(rgbs), 1), 3, self.size, self.size), dtype=torch.float32)
+            self._local.buffer = buffer
+        out = buffer[:len(rgbs)]
+        for i, rgb in enumerate(rgbs):
+            self.normalize_into(rgb, out[i])
+        return out
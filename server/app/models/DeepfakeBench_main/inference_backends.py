@@ -0,0 +1,224 @@
+"""
+Pluggable inference backends for the Xception scorer
+
+모든 backend 는 (N, 3, 256, 256) 정규화 텐서를 받아 (N,) 가짜 확률 텐서를 반환한다.
+XceptionDetector.forward 와 달리 feat 맵 / pred dict 를 만들지 않고 backbone → head → softmax[:, 1] 만 계산한다.
+
+- eager      : detector 모델을 그대로 사용 (Grad-CAM 훅이 걸린 모델이므로 model lock 필요)
+- torchscript: torch.jit.trace + freeze + optimize_for_inference
+- compile    : torch.compile (batch 크기가 바뀌어도 재컴파일하지 않도록 dynamic=True)
+- onnx       : ONNX 로 export 해서 ONNX Runtime CPU 로 실행 (onnxruntime 필요)
+- int8       : training/quantize.py 로 만든 INT8 TorchScript (<가중치 이름>.int8.pt, quantization.py)
+
+eager 외 backend 는 CAM 훅이 없는 별도 모듈을 사용하므로 lock 없이 여러 스레드에서 동시에 호출할 수 있다.
+
+가중치 공유 (MODEL_WEIGHTS_SHARING=shared_memory | mmap) 와의 관계:
+- compile    : 모듈 구조만 새로 만들고 파라미터 / 버퍼 텐서는 detector 모델과 공유 (추가 복사 없음)
+- torchscript: freeze + optimize_for_inference 가 conv-bn 을 접어 새 상수 텐서를 만들므로 replica 마다 가중치 사본 보유
+- onnx       : ONNX Runtime 세션이 initializer 를 자체 메모리에 보관하므로 replica 마다 가중치 사본 보유
+- int8       : 별도 INT8 결과물을 로드 (float 가중치의 1/4 크기, 공유되지 않음)
+생성 시 무작위 입력으로 eager 결과와 비교해서 허용 오차를 넘으면 생성 실패로 처리한다.
+int8 은 eager 와 수치가 같을 수 없으므로 대신 training/test.py 정확도 게이트를 통과한 결과물만 로드한다.
+"""
+import copy
+import io
+import os
+import threading
+import time
+
+import torch
+
+from quantization import check_gate, load_quantized, quantized_path_for
+
+INFERENCE_BACKENDS = ("eager", "torchscript", "compile", "onnx", "int8")
+
+# 확률 기준 eager 대비 허용 오차
+DEFAULT_ATOL = 1e-4
+INPUT_SIZE = 256
+
+
+class XceptionScorer(torch.nn.Module):
+    """backbone.features → backbone.classifier → softmax[:, 1]"""
+
+    def __init__(self, backbone):
+        super().__init__()
+        self.backbone = backbone
+
+    def forward(self, x):
+        logits = self.backbone.classifier(self.backbone.features(x))
+        return torch.softmax(logits, dim=1)[:, 1]
+
+
+class InferenceBackend:
+    """Base class: subclasses implement _predict(x) -> (N,) prob tensor"""
+
+    name = "base"
+    # True 면 detector 모델(Grad-CAM 훅 포함)을 직접 쓰므로 호출 측이 model lock 을 잡아야 함
+    shares_model = False
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.total_ms = 0.0
+
+    def __call__(self, x):
+        start = time.perf_counter()
+        with torch.no_grad():
+            probs = self._predict(x)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with self._stats_lock:
+            self.calls += 1
+            self.total_ms += elapsed
+        return probs
+
+    def _predict(self, x):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "backend": self.name,
+                "calls": self.calls,
+                "avg_ms": self.total_ms / self.calls if self.calls else 0.0,
+            }
+
+
+class EagerBackend(InferenceBackend):
+    name = "eager"
+    shares_model = True
+
+    def __init__(self, model):
+        super().__init__()
+        self.scorer = XceptionScorer(model.backbone).eval()
+
+    def _predict(self, x):
+        return self.scorer(x)
+
+
+def _detached_scorer(model):
+    """
+    CAM 훅과 분리된 추론 전용 모듈. 모듈 구조만 복사하고 파라미터 / 버퍼 텐서는 그대로 공유해서
+    공유 메모리 / mmap 가중치를 복사하지 않는다 (Grad-CAM 이 쓰는 requires_grad 는 건드리지 않음)
+    """
+    backbone = model.backbone
+    memo = {id(tensor): tensor for tensor in list(backbone.parameters()) + list(backbone.buffers())}
+    return XceptionScorer(copy.deepcopy(backbone, memo)).eval()
+
+
+def _example_input(batch_size=2, device="cpu"):
+    return torch.randn(batch_size, 3, INPUT_SIZE, INPUT_SIZE, device=device)
+
+
+class TorchScriptBackend(InferenceBackend):
+    name = "torchscript"
+
+    def __init__(self, model, device="cpu"):
+        super().__init__()
+        scorer = _detached_scorer(model)
+        with torch.no_grad():
+            traced = torch.jit.trace(scorer, _example_input(device=device))
+        self.module = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+
+    def _predict(self, x):
+        return self.module(x)
+
+
+class CompileBackend(InferenceBackend):
+    name = "compile"
+
+    def __init__(self, model, device="cpu", mode="default"):
+        super().__init__()
+        self.module = torch.compile(_detached_scorer(model), mode=mode, dynamic=True)
+        # 첫 호출에서 컴파일되므로 서버 기동 중에 미리 한 번 실행
+        with torch.no_grad():
+            self.module(_example_input(device=device))
+
+    def _predict(self, x):
+        return self.module(x)
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    name = "onnx"
+
+    def __init__(self, model, device="cpu", opset=17, intra_op_threads=0):
+        super().__init__()
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("onnxruntime is not installed")
+
+        scorer = _detached_scorer(model).to("cpu")
+        buffer = io.BytesIO()
+        torch.onnx.export(
+            scorer, _example_input(), buffer,
+            input_names=["image"], output_names=["prob"],
+            dynamic_axes={"image": {0: "batch"}, "prob": {0: "batch"}},
+            opset_version=opset,
+        )
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads or torch.get_num_threads()
+        self.session = onnxruntime.InferenceSession(
+            buffer.getvalue(), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+
+    def _predict(self, x):
+        (probs,) = self.session.run(["prob"], {"image": x.detach().cpu().numpy()})
+        return torch.from_numpy(probs).to(x.device)
+
+
+class Int8Backend(InferenceBackend):
+    name = "int8"
+
+    def __init__(self, weights_path):
+        super().__init__()
+        path = quantized_path_for(weights_path)
+        if not os.path.exists(path):
+            raise RuntimeError(f"Quantized model not found: {path} (create it with training/quantize.py)")
+        if os.path.exists(weights_path) and os.path.getmtime(path) < os.path.getmtime(weights_path):
+            raise RuntimeError(f"{path} is older than {weights_path}, quantize again")
+        self.report = check_gate(path)
+        self.module, self.meta = load_quantized(path)
+
+    def _predict(self, x):
+        return self.module(x.cpu()).to(x.device)
+
+
+def verify_backend(backend, model, atol=DEFAULT_ATOL, batch_size=2, device="cpu"):
+    """무작위 입력에 대한 eager 결과와의 최대 차이 (허용 오차를 넘으면 ValueError)"""
+    x = _example_input(batch_size, device=device)
+    with torch.no_grad():
+        expected = XceptionScorer(model.backbone).eval()(x)
+    diff = (backend(x).float() - expected.float()).abs().max().item()
+    if diff > atol:
+        raise ValueError(f"{backend.name} backend differs from eager by {diff:.2e} (atol {atol:.0e})")
+    return diff
+
+
+def create_backend(name, model, device="cpu", verify=True, atol=DEFAULT_ATOL, weights_path=None,
+                   **options) -> InferenceBackend:
+    """
+    이름으로 backend 생성. eager / int8 외 backend 는 verify=True 면 eager 와 수치 비교를 통과해야 한다.
+    weights_path: int8 결과물 위치를 정하는 원본 가중치 경로
+    """
+    name = (name or "eager").lower()
+    if name == "eager":
+        return EagerBackend(model)
+    if name == "int8":
+        if device != "cpu" or weights_path is None:
+            raise ValueError("int8 backend runs on CPU only and needs weights_path")
+        return Int8Backend(weights_path)
+    if name == "torchscript":
+        backend = TorchScriptBackend(model, device=device)
+    elif name == "compile":
+        backend = CompileBackend(model, device=device, **options)
+    elif name == "onnx":
+        if device != "cpu":
+            raise ValueError("onnx backend runs on CPU only")
+        backend = OnnxRuntimeBackend(model, **options)
+    else:
+        raise ValueError(
+            f"Unknown inference backend: {name} (choices: {', '.join(INFERENCE_BACKENDS)})"
+        )
+    if verify:
+        verify_backend(backend, model, atol=atol, device=device)
+    return backend
@@ -1,11 +1,25 @@
 import os
-import json
+import time
+import datetime
+import argparse
+import concurrent.futures
+from collections import defaultdict
+
 import cv2
-import lmdb
 import yaml
 from PIL import Image
 import io
 import numpy as np
+from tqdm import tqdm
+
+from lmdb_utils import (
+    INITIAL_MAP_SIZE, lmdb_key, open_lmdb, open_writable, put_batch, shard_for, shard_paths, write_index
+)
+
+BATCH_ITEMS = 2000
+BATCH_BYTES = 256 << 20
+
+
 def file_to_binary(file_path):
     """将图片转换为二进制数据"""
     if file_path.endswith('.npy'):
@@ -17,35 +31,120 @@ def file_to_binary(file_path):
     return file_binary
 
 
-def create_lmdb_dataset(source_folder, lmdb_path, dataset_name, map_size):
-    """创建LMDB数据集"""
-    # 打开LMDB文件，创建数据库
-    db = lmdb.open(lmdb_path, map_size=map_size)
-    with db.begin(write=True) as txn:
-        for root, dirs, files in os.walk(source_folder,followlinks=True):
-            print(root)
-            if 'video' in root:
-                continue
-            for file in files:
-                print(file)
-                image_path = os.path.join(root, file)
-                # 生成相对路径键
-                relative_path = f"{dataset_name}\\" + os.path.relpath(image_path, source_folder)
-                key = relative_path.encode('utf-8')
-                # txn.delete(key)
-                # relative_path = f"{dataset_name}\\original_sequences" + os.path.relpath(image_path, source_folder)
-                # key = relative_path.encode('utf-8')
-                value = file_to_binary(image_path)
-
-                # 写入数据库
-                txn.put(key, value)
-
-    db.close()
- 
+def iter_dataset_files(source_folder):
+    """Every file under source_folder except the source videos, in os.walk order."""
+    for root, dirs, files in os.walk(source_folder, followlinks=True):
+        if 'video' in root:
+            continue
+        for file in files:
+            yield os.path.join(root, file)
+
+
+def iter_batches(paths, batch_items):
+    batch = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) >= batch_items:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def create_lmdb_dataset(source_folder, lmdb_path, dataset_name, map_size=None, shards=1, workers=8,
+                        batch_items=BATCH_ITEMS, batch_bytes=BATCH_BYTES):
+    """
+    创建LMDB数据集
+
+    Files are read by a thread pool while the previous batch is committed, and every batch is written
+    in its own transaction (no single giant transaction). The map starts at `map_size` (or 1 GB) and
+    doubles on MapFullError, so the dataset size does not have to be known up front. With shards > 1
+    the keys are hashed into `shard_XX` environments (see lmdb_utils.open_lmdb for reading them).
+    An index.json with key counts and byte totals is written next to the data.
+
+    Returns:
+        dict: The index.
+    """
+    shards = max(1, shards)
+    envs = [open_writable(path, map_size or INITIAL_MAP_SIZE) for path in shard_paths(lmdb_path, shards)]
+    keys_per_shard = [0] * shards
+    bytes_per_shard = [0] * shards
+    by_extension = defaultdict(lambda: {'keys': 0, 'bytes': 0})
+    start_time = time.monotonic()
+
+    def read(path):
+        return path, file_to_binary(path)
+
+    def commit(results):
+        pending = defaultdict(list)
+        pending_bytes = defaultdict(int)
+        for path, value in results:
+            key = lmdb_key(dataset_name, source_folder, path)
+            shard = shard_for(key, shards)
+            pending[shard].append((key, value))
+            pending_bytes[shard] += len(value)
+            extension = os.path.splitext(path)[1].lower()
+            by_extension[extension]['keys'] += 1
+            by_extension[extension]['bytes'] += len(value)
+            # bounded by bytes too, a batch of large frames could otherwise get huge
+            if pending_bytes[shard] >= batch_bytes:
+                flush(shard, pending, pending_bytes)
+        for shard in list(pending):
+            flush(shard, pending, pending_bytes)
+
+    def flush(shard, pending, pending_bytes):
+        if not pending[shard]:
+            return
+        put_batch(envs[shard], pending[shard])
+        keys_per_shard[shard] += len(pending[shard])
+        bytes_per_shard[shard] += pending_bytes[shard]
+        pending[shard] = []
+        pending_bytes[shard] = 0
+
+    progress = tqdm(unit='file', desc=dataset_name)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        # read batch k+1 in the background while batch k is being committed
+        in_flight = None
+        for paths in iter_batches(iter_dataset_files(source_folder), batch_items):
+            submitted = pool.map(read, paths)
+            if in_flight is not None:
+                commit(in_flight[1])
+                progress.update(len(in_flight[0]))
+            in_flight = (paths, submitted)
+        if in_flight is not None:
+            commit(in_flight[1])
+            progress.update(len(in_flight[0]))
+    progress.close()
+
+    map_sizes = [env.info()['map_size'] for env in envs]
+    for env in envs:
+        env.sync()
+        env.close()
+
+    duration = time.monotonic() - start_time
+    index = {
+        'dataset_name': dataset_name,
+        'source_folder': os.path.abspath(source_folder),
+        'shards': shards,
+        'keys': sum(keys_per_shard),
+        'bytes': sum(bytes_per_shard),
+        'by_extension': dict(by_extension),
+        'shard_stats': [
+            {'path': os.path.relpath(path, lmdb_path), 'keys': keys, 'bytes': size, 'map_size': map_size}
+            for path, keys, size, map_size in zip(shard_paths(lmdb_path, shards), keys_per_shard, bytes_per_shard, map_sizes)
+        ],
+        'seconds': round(duration, 1),
+        'created_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    write_index(lmdb_path, index)
+    print(f"{index['keys']} keys, {index['bytes'] / (1 << 30):.2f} GB in {shards} shard(s), "
+          f"{duration:.1f}s ({index['bytes'] / (1 << 20) / max(duration, 1e-9):.1f} MB/s)")
+    return index
+
 
 def read_lmdb(lmdb_dir_path):
     # validate the key and value in the generated LMDB
-    env = lmdb.open(lmdb_dir_path)
+    env = open_lmdb(lmdb_dir_path)
 
     idx = '%09d' % 5
     with env.begin(write=False) as txn:
@@ -59,19 +158,22 @@ def read_lmdb(lmdb_dir_path):
         # image = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
 
 
-# 使用示例
-import argparse
-# 创建 ArgumentParser 对象
-parser = argparse.ArgumentParser(description='Process some inputs.')
+if __name__ == '__main__':
+    # 使用示例
+    # 创建 ArgumentParser 对象
+    parser = argparse.ArgumentParser(description='Process some inputs.')
 
-# 添加 --name 参数
-parser.add_argument('--dataset_size', type=int, default=25, required=True,
-                    help='lmdb requires pre-specifying the total dataset size (GB)')
+    # 添加 --name 参数
+    parser.add_argument('--dataset_size', type=int, default=0,
+                        help='initial LMDB map size (GB); optional, the map grows automatically when full')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='number of LMDB shards (keys hashed into shard_XX sub-directories)')
+    parser.add_argument('--workers', type=int, default=8, help='number of file reader threads')
+    parser.add_argument('--batch_items', type=int, default=BATCH_ITEMS, help='files per write transaction')
 
-# 解析参数
-args = parser.parse_args()
+    # 解析参数
+    args = parser.parse_args()
 
-if __name__ == '__main__':
     # from config.yaml load parameters
     yaml_path = './preprocessing/config.yaml'
     # open the yaml file
@@ -89,5 +191,9 @@ if __name__ == '__main__':
     os.makedirs(output_lmdb_dir,exist_ok=True)
     dataset_dir_path = f"{dataset_root_path}/{dataset_name}"
     lmdb_path=f"{output_lmdb_dir}/{dataset_name}_lmdb"
-    create_lmdb_dataset(dataset_dir_path, lmdb_path, dataset_name,map_size=int(dataset_size) * 1024 * 1024 * 1024)
+    create_lmdb_dataset(
+        dataset_dir_path, lmdb_path, dataset_name,
+        map_size=int(dataset_size) * 1024 * 1024 * 1024 if dataset_size else None,
+        shards=args.shards, workers=args.workers, batch_items=args.batch_items,
+    )
     #read_lmdb(lmdb_path)
@@ -0,0 +1,98 @@
+"""
+Sparse frame reading for video preprocessing.
+
+`facecrop` keeps a handful of frames per video (32 of ~600 on FF++), so decoding and colour-converting
+every frame wastes most of the time. `SparseFrameReader` reads only what is kept:
+
+- skipped frames are only `grab()`bed (demuxed and decoded, no BGR conversion / copy); `retrieve()` is
+  called for the selected frames only
+- when the gap to the next selected frame exceeds `seek_gap`, it seeks (CAP_PROP_POS_FRAMES, the backend
+  jumps to the preceding keyframe) instead of grabbing through the gap, so large strides skip decoding too
+- membership is a set lookup and reading stops after the last selected frame
+- the mask video is advanced in lockstep and retrieved for the selected frames only
+"""
+import cv2
+
+# Gap (in frames) above which seeking is cheaper than grabbing through it. FF++ GOPs are ~12-250 frames;
+# seeking lands on the preceding keyframe and decodes forward, so small gaps are faster to grab.
+SEEK_GAP = 250
+
+
+class SparseFrameReader:
+    """Read selected frames of a video (and the paired mask video) with as little decoding as possible."""
+
+    def __init__(self, capture, mask_capture=None, seek_gap=SEEK_GAP):
+        """
+        Args:
+            capture (cv2.VideoCapture): The video.
+            mask_capture (cv2.VideoCapture): The mask video with the same frame numbering, or None.
+            seek_gap (int): Seek when the next selected frame is more than this many frames ahead (0 never seeks).
+        """
+        self.capture = capture
+        self.mask_capture = mask_capture
+        self.seek_gap = seek_gap
+        self.error = None
+
+        self.grabbed = 0
+        self.retrieved = 0
+        self.seeks = 0
+
+    def frames(self, indices):
+        """
+        Yield (frame number, BGR frame, mask frame or None) for the selected frames in frame order.
+
+        Stops early and sets `error` if a frame cannot be read.
+        """
+        wanted = set(int(index) for index in indices if index >= 0)
+        if not wanted:
+            return
+        targets = iter(sorted(wanted))
+        target = next(targets)
+        last = max(wanted)
+        position = 0
+
+        while position <= last:
+            if self.seek_gap and target - position > self.seek_gap and self._seek(target):
+                position = target
+
+            if not self.capture.grab():
+                self.error = f"Failed to read frame {position}"
+                return
+            if self.mask_capture is not None and not self.mask_capture.grab():
+                self.error = f"Failed to read mask {position}"
+                return
+            self.grabbed += 1
+
+            if position in wanted:
+                ok, frame = self.capture.retrieve()
+                if not ok or frame is None:
+                    self.error = f"Failed to read frame {position}"
+                    return
+                self.retrieved += 1
+
+                mask = None
+                if self.mask_capture is not None:
+                    ok, mask = self.mask_capture.retrieve()
+                    if not ok or mask is None:
+                        self.error = f"Failed to read mask {position}"
+                        return
+                yield position, frame, mask
+                target = next(targets, last)
+            position += 1
+
+    def _seek(self, target):
+        if not self.capture.set(cv2.CAP_PROP_POS_FRAMES, target):
+            # The backend cannot seek this video, read the rest sequentially
+            self.seek_gap = 0
+            return False
+        if self.mask_capture is not None and not self.mask_capture.set(cv2.CAP_PROP_POS_FRAMES, target):
+            raise RuntimeError(f"Failed to seek mask video to frame {target} (video and mask would be out of step)")
+        self.seeks += 1
+        return True
+
+    def stats(self):
+        return {
+            'grabbed': self.grabbed,
+            'retrieved': self.retrieved,
+            'seeks': self.seeks,
+        }
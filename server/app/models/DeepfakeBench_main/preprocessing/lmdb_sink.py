@@ -0,0 +1,73 @@
+"""
+Write preprocessing outputs straight into LMDB.
+
+Keys follow the scheme of `dataset2lmdb_test.py` that `DeepfakeAbstractBaseDataset.load_rgb`,
+`load_landmark` and `load_mask` expect: f"{dataset_name}\\" + path relative to the dataset directory,
+e.g. "FaceForensics++\\manipulated_sequences/Deepfakes/c23/frames/000_003/000.png".
+Values are the PNG bytes for frames / masks and the raw uint32 (81, 2) array bytes for landmarks.
+
+- puts are buffered and committed in bounded batches (and on every `flush`), never in one giant transaction
+- the map grows automatically (doubling) on MapFullError, so no dataset size has to be guessed up front
+- several processes may write to the same environment; LMDB serializes their write transactions
+- with shards > 1, keys are spread over `shard_XX` sub-environments by a stable hash of the key
+"""
+from lmdb_utils import lmdb_key, open_writable, put_batch, shard_for, shard_paths
+
+BATCH_ITEMS = 1000
+BATCH_BYTES = 64 << 20
+
+
+class LMDBSink:
+    """Buffered writer of preprocessing outputs into one or more LMDB environments."""
+
+    def __init__(self, lmdb_path, dataset_name, dataset_dir, shards=1,
+                 batch_items=BATCH_ITEMS, batch_bytes=BATCH_BYTES):
+        """
+        Args:
+            lmdb_path (str): Output directory, e.g. f"{output_lmdb_dir}/{dataset_name}_lmdb".
+            dataset_name (str): First component of every key.
+            dataset_dir (str): Directory the file paths are made relative to (dataset_root_path/dataset_name).
+            shards (int): Number of sub-environments the keys are hashed into.
+        """
+        self.dataset_name = dataset_name
+        self.dataset_dir = dataset_dir
+        self.shards = max(1, shards)
+        self.batch_items = batch_items
+        self.batch_bytes = batch_bytes
+        self._envs = [open_writable(path) for path in shard_paths(lmdb_path, self.shards)]
+        self._pending = [[] for _ in self._envs]
+        self._pending_bytes = [0 for _ in self._envs]
+        self.written = 0
+        self.written_bytes = 0
+
+    def key(self, file_path):
+        return lmdb_key(self.dataset_name, self.dataset_dir, file_path)
+
+    def put(self, file_path, value):
+        """Buffer the value of the output file `file_path`; commits once the shard batch is full."""
+        key = self.key(file_path)
+        shard = shard_for(key, self.shards)
+        self._pending[shard].append((key, value))
+        self._pending_bytes[shard] += len(value)
+        if len(self._pending[shard]) >= self.batch_items or self._pending_bytes[shard] >= self.batch_bytes:
+            self._commit(shard)
+
+    def flush(self):
+        """Commit everything buffered (call before reporting a video as finished)."""
+        for shard in range(len(self._envs)):
+            self._commit(shard)
+
+    def _commit(self, shard):
+        items = self._pending[shard]
+        if not items:
+            return
+        put_batch(self._envs[shard], items)
+        self.written += len(items)
+        self.written_bytes += self._pending_bytes[shard]
+        self._pending[shard] = []
+        self._pending_bytes[shard] = 0
+
+    def close(self):
+        self.flush()
+        for env in self._envs:
+            env.close()
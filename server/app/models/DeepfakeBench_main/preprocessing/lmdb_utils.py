@@ -0,0 +1,134 @@
+"""
+LMDB helpers shared by the preprocessing sink, the LMDB builder and the dataset readers.
+
+A dataset LMDB is either a single environment (`{dataset_name}_lmdb/data.mdb`, the original layout)
+or N shard environments `{dataset_name}_lmdb/shard_XX/` with keys spread by `shard_for` (crc32 of the key).
+The builder writes an `index.json` next to the shards with the shard count, key counts and byte totals.
+
+`open_lmdb` opens either layout for reading and returns an object with the same `begin()` / `txn.get(key)`
+interface as `lmdb.Environment`, so the datasets do not need to know whether the LMDB is sharded.
+"""
+import glob
+import json
+import os
+import zlib
+
+import lmdb
+
+INITIAL_MAP_SIZE = 1 << 30  # 1 GB, grown on demand
+INDEX_NAME = 'index.json'
+
+
+def lmdb_key(dataset_name, dataset_dir, file_path):
+    """LMDB key of a dataset file: f"{dataset_name}\\" + path relative to the dataset directory."""
+    return (f"{dataset_name}\\" + os.path.relpath(str(file_path), str(dataset_dir))).encode('utf-8')
+
+
+def shard_for(key, shards):
+    """Stable shard index of a key (crc32, identical across processes and runs)."""
+    return zlib.crc32(key) % shards if shards > 1 else 0
+
+
+def shard_paths(lmdb_path, shards):
+    """Environment directories of a (possibly sharded) LMDB dataset."""
+    if shards <= 1:
+        return [lmdb_path]
+    return [os.path.join(lmdb_path, f"shard_{i:02d}") for i in range(shards)]
+
+
+def open_writable(path, map_size=INITIAL_MAP_SIZE):
+    """Open (or create) a writable environment; an existing larger data file keeps its own map size."""
+    os.makedirs(path, exist_ok=True)
+    return lmdb.open(path, map_size=map_size, subdir=True, readahead=False, meminit=False)
+
+
+def put_batch(env, items):
+    """
+    Write (key, value) pairs in one transaction, growing the map and retrying on MapFullError.
+    Returns the (possibly resized) map size.
+    """
+    while True:
+        try:
+            with env.begin(write=True) as txn:
+                for key, value in items:
+                    txn.put(key, value)
+            return env.info()['map_size']
+        except lmdb.MapFullError:
+            # the aborted transaction is retried from scratch on the larger map
+            env.set_mapsize(env.info()['map_size'] * 2)
+        except lmdb.MapResizedError:
+            # another process grew the map; adopt its size
+            env.set_mapsize(0)
+
+
+def write_index(lmdb_path, index):
+    with open(os.path.join(lmdb_path, INDEX_NAME), 'w') as f:
+        json.dump(index, f, indent=2)
+
+
+def read_index(lmdb_path):
+    path = os.path.join(lmdb_path, INDEX_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def shard_count(lmdb_path):
+    """Number of shards of an LMDB dataset (1 for the single-environment layout)."""
+    index = read_index(lmdb_path)
+    if index is not None:
+        return index.get('shards', 1)
+    return max(1, len(glob.glob(os.path.join(lmdb_path, 'shard_[0-9][0-9]'))))
+
+
+class ShardedTransaction:
+    """Read transaction over all shards; a shard's transaction is only started when one of its keys is read."""
+
+    def __init__(self, envs):
+        self._envs = envs
+        self._txns = {}
+
+    def get(self, key, default=None):
+        shard = shard_for(key, len(self._envs))
+        txn = self._txns.get(shard)
+        if txn is None:
+            txn = self._txns[shard] = self._envs[shard].begin(write=False)
+        return txn.get(key, default)
+
+    def abort(self):
+        for txn in self._txns.values():
+            txn.abort()
+        self._txns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.abort()
+
+
+class ShardedLMDB:
+    """Read-only stand-in for lmdb.Environment over shard_XX environments."""
+
+    def __init__(self, paths, **kwargs):
+        self.envs = [lmdb.open(path, **kwargs) for path in paths]
+
+    def begin(self, write=False):
+        if write:
+            raise ValueError('ShardedLMDB is read-only')
+        return ShardedTransaction(self.envs)
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+
+def open_lmdb(lmdb_path, **kwargs):
+    """
+    Open a dataset LMDB for reading, sharded or not (kwargs are passed to lmdb.open for every shard).
+    """
+    shards = shard_count(lmdb_path)
+    if shards <= 1:
+        return lmdb.open(lmdb_path, **kwargs)
+    return ShardedLMDB(shard_paths(lmdb_path, shards), **kwargs)
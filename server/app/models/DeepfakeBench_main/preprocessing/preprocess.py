@@ -63,6 +63,8 @@ import yaml
 import logging
 import datetime
 import glob
+import json
+import hashlib
 import concurrent.futures
 import numpy as np
 from tqdm import tqdm
@@ -70,6 +72,12 @@ from pathlib import Path
 from imutils import face_utils
 from skimage import transform as trans
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from face_detectors import AdaptiveFaceDetector
+from face_tracking import TrackThenDetect
+from frame_sampler import SEEK_GAP, SparseFrameReader
+from lmdb_sink import LMDBSink
+
 
 def create_logger(log_path):
     """
@@ -101,6 +109,86 @@ def create_logger(log_path):
     return logger
 
 
+def build_face_detector(name='dlib_hog'):
+    """
+    Face detector used for preprocessing (full resolution, see face_detectors.py for backends).
+    dlib backends keep the original 1x upsampling so that small faces are still found.
+    """
+    options = {'upsample': 1} if name in ('dlib_hog', 'dlib_cnn') else {}
+    return AdaptiveFaceDetector(backend=name, max_side=0, refine=False, **options)
+
+
+PREDICTOR_PATH = './dlib_tools/shape_predictor_81_face_landmarks.dat'
+MANIFEST_NAME = 'preprocess_manifest.jsonl'
+
+# (face_detector, face_predictor) loaded once per process-pool worker by init_preprocess_worker
+_worker_models = None
+# LMDBSink of the worker when outputs go straight into LMDB (None = write files)
+_worker_sink = None
+
+
+def load_face_models(face_detector_name='dlib_hog'):
+    """
+    Face detector and 81-point shape predictor used by facecrop.
+    """
+    return build_face_detector(face_detector_name), dlib.shape_predictor(PREDICTOR_PATH)
+
+
+def init_preprocess_worker(face_detector_name, log_path=None, lmdb_options=None):
+    """
+    Process pool initializer: load the dlib models once per worker instead of once per video.
+    Workers started with `spawn` do not run the __main__ block, so the logger is created here too.
+    lmdb_options: LMDBSink arguments when crops / landmarks / masks go straight into LMDB.
+    """
+    global _worker_models, _worker_sink, logger
+    if 'logger' not in globals():
+        logger = create_logger(log_path) if log_path else logging.getLogger()
+    # One OpenCV thread per worker, parallelism comes from the pool
+    cv2.setNumThreads(1)
+    _worker_models = load_face_models(face_detector_name)
+    if lmdb_options:
+        _worker_sink = LMDBSink(**lmdb_options)
+
+
+def config_signature(mode, num_frames, stride, face_detector_name, track_interval, lmdb_options=None):
+    """
+    Short hash of the settings that change the output; manifest entries only count as done for the same settings.
+    """
+    settings = [mode, num_frames, stride, face_detector_name, track_interval]
+    if lmdb_options:
+        settings.append(lmdb_options)
+    settings = json.dumps(settings, sort_keys=True)
+    return hashlib.sha1(settings.encode()).hexdigest()[:12]
+
+
+def load_manifest(manifest_path, signature):
+    """
+    Videos already processed with the same settings (set of paths relative to the dataset).
+    Lines cut short by a crash are ignored.
+    """
+    done = set()
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get('config') == signature:
+                done.add(entry['video'])
+    return done
+
+
+def append_manifest(manifest, entry):
+    """
+    Record one finished video; flushed and fsynced so that a crash right after still counts it as done.
+    """
+    manifest.write(json.dumps(entry) + '\n')
+    manifest.flush()
+    os.fsync(manifest.fileno())
+
+
 def get_keypts(image, face, predictor, face_detector):
     # detect the facial landmarks for the selected face
     shape = predictor(image, face)
@@ -117,7 +205,11 @@ def get_keypts(image, face, predictor, face_detector):
     return pts
 
 
-def extract_aligned_face_dlib(face_detector, predictor, image, res=256, mask=None):
+def extract_aligned_face_dlib(face_detector, predictor, image, res=256, mask=None, face_box=None):
+    """
+    face_box: known (x1, y1, x2, y2) box of the face to align (e.g. propagated by a tracker);
+              when given, full-frame detection is skipped.
+    """
     def img_align_crop(img, landmark=None, outsize=None, scale=1.3, mask=None):
         """ 
         align and crop the face according to the given bbox and landmarks
@@ -181,11 +273,11 @@ def extract_aligned_face_dlib(face_detector, predictor, image, res=256, mask=Non
     # Convert to rgb
     rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
-    # Detect with dlib
-    faces = face_detector(rgb, 1)
+    # Detect with the configured backend (unless the box is already known)
+    faces = [face_box] if face_box is not None else face_detector.detect(image)
     if len(faces):
         # For now only take the biggest face
-        face = max(faces, key=lambda rect: rect.width() * rect.height())
+        face = dlib.rectangle(*max(faces, key=lambda box: (box[2] - box[0]) * (box[3] - box[1])))
         
         # Get the landmarks/parts for the face in box d only with the five key points
         landmarks = get_keypts(rgb, face, predictor, face_detector)
@@ -195,10 +287,10 @@ def extract_aligned_face_dlib(face_detector, predictor, image, res=256, mask=Non
         cropped_face = cv2.cvtColor(cropped_face, cv2.COLOR_RGB2BGR)
         
         # Extract the all landmarks from the aligned face
-        face_align = face_detector(cropped_face, 1)
+        face_align = face_detector.detect(cropped_face)
         if len(face_align) == 0:
             return None, None, None
-        landmark = predictor(cropped_face, face_align[0])
+        landmark = predictor(cropped_face, dlib.rectangle(*face_align[0]))
         landmark = face_utils.shape_to_np(landmark)
 
         return cropped_face, landmark, mask_face
@@ -213,6 +305,9 @@ def video_manipulate(
     mode: str,
     num_frames: int, 
     stride: int, 
+    face_detector_name: str = 'dlib_hog',
+    track_interval: int = 0,
+    seek_gap: int = SEEK_GAP,
     ) -> None:
     """
     Processes a single video file by detecting and cropping the largest face in each frame and saving the results.
@@ -224,21 +319,27 @@ def video_manipulate(
         mode (str): Either 'fixed_num_frames' or 'fixed_stride'.
         num_frames (int): Number of frames to extract from the video.
         stride (int): Number of frames to skip between each frame extracted.
+        face_detector_name (str): Face detector backend (dlib_hog, dlib_cnn, haar, yunet, auto).
+        track_interval (int): Track-then-detect mode when > 0: run the full detector every `track_interval`
+            sampled frames (and on scene cuts / lost tracks / gaps of more than face_tracking.MAX_GAP frames) and
+            track the face in between. 0 detects every frame.
+        seek_gap (int): Seek instead of grabbing through gaps longer than this many frames (0 never seeks).
         margin (float): Amount to increase the size of the face bounding box by.
         visualization (bool): Whether to save visualization images.
 
     Returns:
-        None
+        int: Number of saved frames, or None if the video could not be processed.
     """
 
-    # Define face detector and predictor models
-    face_detector = dlib.get_frontal_face_detector()
-    predictor_path = './dlib_tools/shape_predictor_81_face_landmarks.dat'
-    ## Check if predictor path exists
-    if not os.path.exists(predictor_path):
-        logger.error(f"Predictor path does not exist: {predictor_path}")
-        sys.exit()
-    face_predictor = dlib.shape_predictor(predictor_path)
+    # Define face detector and predictor models (already loaded once per worker in the process pool)
+    if _worker_models is not None:
+        face_detector, face_predictor = _worker_models
+    else:
+        ## Check if predictor path exists
+        if not os.path.exists(PREDICTOR_PATH):
+            logger.error(f"Predictor path does not exist: {PREDICTOR_PATH}")
+            sys.exit()
+        face_detector, face_predictor = load_face_models(face_detector_name)
     
     def facecrop(
         org_path: Path,
@@ -248,12 +349,14 @@ def video_manipulate(
         num_frames: int, 
         stride: int,
         face_predictor: dlib.shape_predictor, 
-        face_detector: dlib.fhog_object_detector,
+        face_detector: AdaptiveFaceDetector,
+        track_interval: int = 0,
+        seek_gap: int = SEEK_GAP,
         margin: float = 0.5, 
         visualization: bool = False
-        ) -> None:
+        ) -> int:
         """
-        Helper function for cropping face and extracting landmarks.
+        Helper function for cropping face and extracting landmarks. Returns the number of saved frames.
         """
         
         # Open the video file
@@ -263,6 +366,7 @@ def video_manipulate(
             logger.error(f"Failed to open {org_path}")
             return
 
+        cap_mask = None
         if mask_path is not None:
             cap_mask = cv2.VideoCapture(str(mask_path))
             if not cap_mask.isOpened():
@@ -280,33 +384,28 @@ def video_manipulate(
             # Get the frame rate of the video by dividing the number of frames by the duration (same interval between frames)
             frame_idxs = np.arange(0, frame_count_org, stride, dtype=int)
 
-        # Iterate through the frames
-        for cnt_frame in range(frame_count_org):
-            ret_org, frame_org = cap_org.read()
-            if mask_path is not None:
-                ret_mask, frame_mask = cap_mask.read()
-            else:
-                frame_mask = None
-            height, width = frame_org.shape[:-1]
+        # Track-then-detect: the tracker sees the sampled frames only, the detector runs on keyframes
+        tracker = TrackThenDetect(face_detector, interval=track_interval) if track_interval > 0 else None
+        saved_frames = 0
 
-            # Check if the frame was successfully read
-            if not ret_org:
-                logger.warning(f"Failed to read frame {cnt_frame} of {org_path}")
-                break
-            
-            # Check if the mask was successfully read
-            if mask_path is not None and not ret_mask:
-                logger.warning(f"Failed to read mask {cnt_frame} of {mask_path}")
-                break
-            # Check if the frame is one of the frames to extract
-            if cnt_frame not in frame_idxs:
-                continue
+        # Decode only the frames to extract, grab through or seek over the rest
+        reader = SparseFrameReader(cap_org, cap_mask, seek_gap=seek_gap)
+
+        # Iterate through the frames
+        for cnt_frame, frame_org, frame_mask in reader.frames(frame_idxs):
+            face_box = None
+            if tracker is not None:
+                tracker.observe(frame_org, cnt_frame)
+                face_box = tracker.locate(frame_org)
+                if face_box is None:
+                    logger.warning(f"No faces in frame {cnt_frame} of {org_path}")
+                    continue
 
             # Use the function to extract the aligned and cropped face
             if mask_path is not None:
-                cropped_face, landmarks, masks = extract_aligned_face_dlib(face_detector, face_predictor, frame_org, mask=frame_mask)
+                cropped_face, landmarks, masks = extract_aligned_face_dlib(face_detector, face_predictor, frame_org, mask=frame_mask, face_box=face_box)
             else:
-                cropped_face, landmarks, _ = extract_aligned_face_dlib(face_detector, face_predictor, frame_org, mask=frame_mask)
+                cropped_face, landmarks, _ = extract_aligned_face_dlib(face_detector, face_predictor, frame_org, mask=frame_mask, face_box=face_box)
             
             # Check if a face was detected and cropped
             if cropped_face is None:
@@ -320,38 +419,78 @@ def video_manipulate(
 
             # Save cropped face, landmarks, and visualization image
             save_path_ = save_path / 'frames' / org_path.stem
+            image_path = save_path_ / f"{cnt_frame:03d}.png"
+            land_path = save_path / 'landmarks' / org_path.stem / f"{cnt_frame:03d}.npy"
+
+            if _worker_sink is not None:
+                # Same keys / encodings as dataset2lmdb_test.py, without the files in between
+                _worker_sink.put(image_path, cv2.imencode('.png', cropped_face)[1].tobytes())
+                _worker_sink.put(land_path, landmarks.astype(np.uint32).tobytes())
+                if mask_path is not None:
+                    _, binary_mask = cv2.threshold(masks, 1, 255, cv2.THRESH_BINARY)  # obtain binary mask only
+                    mask_file = save_path / 'masks' / org_path.stem / f"{cnt_frame:03d}.png"
+                    _worker_sink.put(mask_file, cv2.imencode('.png', binary_mask)[1].tobytes())
+                saved_frames += 1
+                continue
+
             save_path_.mkdir(parents=True, exist_ok=True)
 
             # Save cropped face
-            image_path = save_path_ / f"{cnt_frame:03d}.png"
             if not image_path.is_file():
                 cv2.imwrite(str(image_path), cropped_face)
 
             # Save landmarks
-            land_path = save_path / 'landmarks' / org_path.stem / f"{cnt_frame:03d}.npy"
             os.makedirs(os.path.dirname(land_path), exist_ok=True)
             np.save(str(land_path), landmarks)
 
             # Save mask
             if mask_path is not None:
-                mask_path = save_path / 'masks' / org_path.stem / f"{cnt_frame:03d}.png"
-                os.makedirs(os.path.dirname(mask_path), exist_ok=True)
+                mask_file = save_path / 'masks' / org_path.stem / f"{cnt_frame:03d}.png"
+                os.makedirs(os.path.dirname(mask_file), exist_ok=True)
                 _, binary_mask = cv2.threshold(masks, 1, 255, cv2.THRESH_BINARY)  # obtain binary mask only
-                cv2.imwrite(str(mask_path), binary_mask)
+                cv2.imwrite(str(mask_file), binary_mask)
+
+            saved_frames += 1
+
+        if reader.error is not None:
+            logger.warning(f"{reader.error} of {org_path}")
+        logger.debug(f"{org_path.name} frame reading: {reader.stats()}")
+        if tracker is not None:
+            logger.debug(f"{org_path.name} face tracking: {tracker.stats()}")
 
         # Release the video capture
         cap_org.release()
-        if mask_path is not None:
+        if cap_mask is not None:
             cap_mask.release()
+        # Everything of this video is committed before it is reported (and recorded in the manifest) as done
+        if _worker_sink is not None:
+            _worker_sink.flush()
+        return saved_frames
 
     # Iterate through the videos in the dataset and extract faces
     try:
-        facecrop(movie_path, mask_path, dataset_path, mode, num_frames, stride, face_predictor, face_detector)
+        return facecrop(movie_path, mask_path, dataset_path, mode, num_frames, stride, face_predictor, face_detector,
+                        track_interval, seek_gap)
     except Exception as e:
         logger.error(f"Error processing video {movie_path}: {e}")
+        return None
+
+
+def preprocess(dataset_path, mask_path, mode, num_frames, stride, logger, face_detector_name='dlib_hog',
+               track_interval=0, num_workers=0, lmdb_options=None, seek_gap=SEEK_GAP):
+    """
+    Crop faces from every video under dataset_path with a process pool.
 
+    dlib / OpenCV work mostly holds the GIL, so videos are spread over worker processes that each load
+    the face models once. Finished videos are appended to `preprocess_manifest.jsonl` in dataset_path,
+    and a rerun with the same settings skips them, so an interrupted run resumes where it stopped.
 
-def preprocess(dataset_path, mask_path, mode, num_frames, stride, logger):
+    Args:
+        num_workers (int): Number of worker processes (0 = os.cpu_count()).
+        lmdb_options (dict): LMDBSink arguments (lmdb_path, dataset_name, dataset_dir, shards) to write
+            crops, landmarks and masks straight into LMDB instead of PNG / npy files.
+        seek_gap (int): Seek instead of grabbing through gaps longer than this many frames (0 never seeks).
+    """
     # Define paths to videos in dataset
     movies_path_list = sorted([Path(p) for p in glob.glob(os.path.join(dataset_path, '**/*.mp4'), recursive=True)])
     if len(movies_path_list) == 0:
@@ -359,57 +498,107 @@ def preprocess(dataset_path, mask_path, mode, num_frames, stride, logger):
         sys.exit()
     logger.info(f"{len(movies_path_list)} videos found in {dataset_path}")
     
-    # Define paths to masks in dataset
+    # Define paths to masks in dataset, indexed by video name
+    masks_by_stem = {}
     if mask_path is not None:
         masks_path_list = sorted([Path(p) for p in glob.glob(os.path.join(mask_path, '**/*.mp4'), recursive=True)])
         if len(masks_path_list) == 0:
             logger.error(f"No masks found in {mask_path}")
             # sys.exit()
         logger.info(f"{len(masks_path_list)} masks found in {mask_path}")    
+        masks_by_stem = {path.stem: path for path in masks_path_list}
+
+    ## Check if predictor path exists (before starting the workers)
+    if not os.path.exists(PREDICTOR_PATH):
+        logger.error(f"Predictor path does not exist: {PREDICTOR_PATH}")
+        sys.exit()
+
+    # Skip videos finished by a previous run with the same settings
+    signature = config_signature(mode, num_frames, stride, face_detector_name, track_interval, lmdb_options)
+    manifest_path = os.path.join(dataset_path, MANIFEST_NAME)
+    done = load_manifest(manifest_path, signature)
+    pending = [path for path in movies_path_list if os.path.relpath(path, dataset_path) not in done]
+    if len(pending) < len(movies_path_list):
+        logger.info(f"Resuming: {len(movies_path_list) - len(pending)} videos already processed, {len(pending)} remaining")
+    if not pending:
+        return
     
     # Start timer
     start_time = time.monotonic()
 
     # Define the number of processes based on CPU capabilities
-    num_processes = os.cpu_count()
+    num_processes = num_workers or os.cpu_count()
+    log_path = next((h.baseFilename for h in logger.handlers if isinstance(h, logging.FileHandler)), None)
+
+    finished_videos = 0
+    finished_frames = 0
+    failed_videos = 0
 
     # Use multiprocessing to process videos in parallel
-    with concurrent.futures.ThreadPoolExecutor(max_workers=num_processes) as executor:
-        futures = []
-        for movie_path in movies_path_list:
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_processes,
+        initializer=init_preprocess_worker,
+        initargs=(face_detector_name, log_path, lmdb_options),
+    ) as executor, open(manifest_path, 'a') as manifest:
+        futures = {}
+        for movie_path in pending:
             # Check if there is a mask for the video
+            video_mask_path = None
             if mask_path is not None:
-                if movie_path.stem not in [path.stem for path in masks_path_list]:
+                video_mask_path = masks_by_stem.get(movie_path.stem)
+                if video_mask_path is None:
                     logger.error(f"No mask for video {movie_path}")
-                # Define the mask path
-                mask_path = next((path for path in masks_path_list if path.stem == movie_path.stem), None)
-                if mask_path is None:
-                    logger.error(f"Mask path not found for video {movie_path}")
             # Create a future for each video and submit it for processing
-            futures.append(
-                executor.submit(
+            future = executor.submit(
                 video_manipulate,
                 movie_path,
-                mask_path,
+                video_mask_path,
                 dataset_path,
                 mode,
                 num_frames,
                 stride,
-                )
+                face_detector_name,
+                track_interval,
+                seek_gap,
             )
-        # Wait for all futures to complete and log any errors
-        for future in tqdm(concurrent.futures.as_completed(futures), total=len(movies_path_list)):
-            # Print the current time
-            logger.info(f"Current time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            futures[future] = movie_path
+
+        # Wait for all futures to complete, record finished videos and report throughput
+        progress = tqdm(concurrent.futures.as_completed(futures), total=len(futures))
+        for future in progress:
+            movie_path = futures[future]
             try:
-                future.result()
+                saved_frames = future.result()
             except Exception as e:
-                logger.error(f"Error processing video: {e}")
+                logger.error(f"Error processing video {movie_path}: {e}")
+                saved_frames = None
+
+            if saved_frames is None:
+                failed_videos += 1
+                continue
+
+            finished_videos += 1
+            finished_frames += saved_frames
+            append_manifest(manifest, {
+                'video': os.path.relpath(movie_path, dataset_path),
+                'frames': saved_frames,
+                'config': signature,
+                'finished_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            })
+
+            elapsed = max(time.monotonic() - start_time, 1e-9)
+            progress.set_postfix(videos_per_sec=f"{finished_videos / elapsed:.2f}",
+                                 frames_per_sec=f"{finished_frames / elapsed:.1f}")
             
         # End timer
         end_time = time.monotonic()
-        duration_minutes = (end_time - start_time) / 60
-        logger.info(f"Total time taken: {duration_minutes:.2f} minutes")
+        duration = end_time - start_time
+        logger.info(f"Total time taken: {duration / 60:.2f} minutes")
+        logger.info(
+            f"Processed {finished_videos} videos ({failed_videos} failed), {finished_frames} frames: "
+            f"{finished_videos / duration:.2f} videos/sec, {finished_frames / duration:.1f} frames/sec "
+            f"with {num_processes} workers"
+        )
 
 if __name__ == '__main__':
     # from config.yaml load parameters
@@ -428,6 +617,12 @@ if __name__ == '__main__':
     mode = config['preprocess']['mode']['default']
     stride = config['preprocess']['stride']['default']
     num_frames = config['preprocess']['num_frames']['default']
+    face_detector_name = config['preprocess'].get('face_detector', {}).get('default', 'dlib_hog')
+    track_interval = config['preprocess'].get('track_interval', {}).get('default', 0)
+    num_workers = config['preprocess'].get('num_workers', {}).get('default', 0)
+    lmdb_dir = config['preprocess'].get('lmdb_dir', {}).get('default', '')
+    lmdb_shards = config['preprocess'].get('lmdb_shards', {}).get('default', 1)
+    seek_gap = config['preprocess'].get('seek_gap', {}).get('default', SEEK_GAP)
     
     # use dataset_name and dataset_root_path to get dataset_path
     dataset_path = Path(os.path.join(dataset_root_path, dataset_name))
@@ -436,6 +631,17 @@ if __name__ == '__main__':
     log_path = f'./logs/{dataset_name}.log'
     logger = create_logger(log_path)
 
+    # Optionally write straight into f"{lmdb_dir}/{dataset_name}_lmdb" (same layout as dataset2lmdb_test.py)
+    lmdb_options = None
+    if lmdb_dir:
+        lmdb_options = {
+            'lmdb_path': os.path.join(lmdb_dir, f"{dataset_name}_lmdb"),
+            'dataset_name': dataset_name,
+            'dataset_dir': str(dataset_path),
+            'shards': lmdb_shards,
+        }
+        logger.info(f"Writing outputs to LMDB {lmdb_options['lmdb_path']} ({lmdb_shards} shard(s))")
+
     # Define dataset path based on the input arguments
     ## faceforensic++
     if dataset_name == 'FaceForensics++':
@@ -505,9 +711,9 @@ if __name__ == '__main__':
             # only part of FaceForensics++ has mask
             if dataset_name == 'FaceForensics++' and sub_dataset_path.parent in mask_dataset_paths:
                 mask_dataset_path = os.path.join(sub_dataset_path.parent, "masks")
-                preprocess(sub_dataset_path, mask_dataset_path, mode, num_frames, stride, logger)
+                preprocess(sub_dataset_path, mask_dataset_path, mode, num_frames, stride, logger, face_detector_name, track_interval, num_workers, lmdb_options, seek_gap)
             else:
-                preprocess(sub_dataset_path, None, mode, num_frames, stride, logger)
+                preprocess(sub_dataset_path, None, mode, num_frames, stride, logger, face_detector_name, track_interval, num_workers, lmdb_options, seek_gap)
     else:
         logger.error(f"Sub Dataset path does not exist: {sub_dataset_paths}")
         sys.exit()
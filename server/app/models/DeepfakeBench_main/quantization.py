@@ -0,0 +1,200 @@
+"""
+INT8 post-training quantization of the Xception scorer (CPU 서빙용)
+
+- backbone.features (separable conv / conv / bn / relu): FX graph mode static quantization
+  conv-bn 을 융합하고 calibration 배치로 activation 범위를 관측한 뒤 int8 conv 로 변환
+- fc head (last_linear): dynamic quantization (가중치 int8, activation 은 호출마다 양자화)
+
+결과물(`<이름>.int8.pt`)은 trace + freeze 한 TorchScript 라서 로드할 때 FX / 학습 코드가 필요 없다.
+정확도 게이트: training/test.py --quantized_path 가 float 모델과 AUC / EER 를 비교해
+`<이름>.int8.pt.eval.json` 리포트를 남기고, 서버 int8 backend 는 게이트를 통과한 결과물만 로드한다.
+
+DeepfakeBench_main/ 에서:
+    python training/quantize.py --detector_path ./training/config/detector/xception.yaml --weights_path ./training/pretrained/xception_best.pth
+    python training/test.py --detector_path ./training/config/detector/xception.yaml --weights_path ./training/pretrained/xception_best.pth \\
+        --quantized_path ./training/pretrained/xception_best.int8.pt
+"""
+import copy
+import datetime
+import hashlib
+import json
+import os
+
+import torch
+import torch.nn.functional as F
+
+QUANTIZED_SUFFIX = ".int8.pt"
+REPORT_SUFFIX = ".eval.json"
+QUANTIZATION_MODES = ("static", "dynamic")
+
+# float 모델 대비 허용 정확도 손실 (데이터셋마다 적용)
+MAX_AUC_DROP = 0.005
+MAX_EER_INCREASE = 0.005
+INPUT_SIZE = 256
+
+
+def quantized_path_for(weights_path):
+    """xception_best.pth / xception_best.serving.pt → xception_best.int8.pt"""
+    if weights_path.endswith(QUANTIZED_SUFFIX):
+        return weights_path
+    root = os.path.splitext(weights_path)[0]
+    if root.endswith(".serving"):
+        root = root[:-len(".serving")]
+    return root + QUANTIZED_SUFFIX
+
+
+def report_path_for(quantized_path):
+    return quantized_path + REPORT_SUFFIX
+
+
+def quantization_engine():
+    """x86 (fbgemm 후속) 우선, 없으면 fbgemm / qnnpack (ARM)"""
+    supported = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in supported:
+            return engine
+    raise RuntimeError("No quantized engine available in this torch build")
+
+
+def file_digest(path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class _Features(torch.nn.Module):
+    """backbone.features 만 FX trace 대상으로 감쌈 (classifier 는 shape 분기가 있어 trace 불가)"""
+
+    def __init__(self, backbone):
+        super().__init__()
+        self.backbone = backbone
+
+    def forward(self, x):
+        return self.backbone.features(x)
+
+
+class QuantizedXceptionScorer(torch.nn.Module):
+    """features → relu → global avg pool → fc → softmax[:, 1] (Xception.classifier 의 original 모드와 동일)"""
+
+    def __init__(self, features, head):
+        super().__init__()
+        self.features = features
+        self.head = head
+
+    def forward(self, x):
+        x = F.relu(self.features(x))
+        x = F.adaptive_avg_pool2d(x, (1, 1)).flatten(1)
+        return torch.softmax(self.head(x), dim=1)[:, 1]
+
+
+def quantize_backbone(backbone, calibration_batches=(), mode="static"):
+    """
+    float Xception backbone 의 양자화 복사본 (원본은 그대로)
+    mode: static  - features 는 calibration 기반 static int8, head 는 dynamic int8
+          dynamic - head 만 dynamic int8 (features 는 float, calibration 불필요)
+    calibration_batches: (N, 3, 256, 256) 정규화 텐서 iterable
+    반환: (QuantizedXceptionScorer, calibration 에 쓴 이미지 수)
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode: {mode} (choices: {', '.join(QUANTIZATION_MODES)})")
+    if getattr(backbone, "mode", None) != "original":
+        raise ValueError("Only the Xception backbone in 'original' mode can be quantized")
+
+    engine = quantization_engine()
+    torch.backends.quantized.engine = engine
+    backbone = copy.deepcopy(backbone).cpu().eval()
+    features = _Features(backbone)
+    seen = 0
+    if mode == "static":
+        example = (torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE),)
+        prepared = prepare_fx(features, get_default_qconfig_mapping(engine), example)
+        with torch.no_grad():
+            for batch in calibration_batches:
+                prepared(batch.cpu())
+                seen += batch.shape[0]
+        if not seen:
+            raise ValueError("Static quantization needs at least one calibration batch")
+        features = convert_fx(prepared)
+
+    # quantize_dynamic 은 자식 모듈만 교체하므로 Linear 를 Sequential 로 감쌈
+    head = quantize_dynamic(torch.nn.Sequential(backbone.last_linear), {torch.nn.Linear}, dtype=torch.qint8)
+    return QuantizedXceptionScorer(features, head).eval(), seen
+
+
+def save_quantized(scorer, path, meta):
+    """trace + freeze 한 TorchScript 로 저장 (meta 는 meta.json 으로 같이 저장)"""
+    meta = dict(meta, engine=torch.backends.quantized.engine, torch=torch.__version__)
+    with torch.no_grad():
+        module = torch.jit.freeze(torch.jit.trace(scorer.eval(), torch.randn(2, 3, INPUT_SIZE, INPUT_SIZE)))
+    # 중간에 끊겨도 반쯤 쓰인 파일이 서빙에 쓰이지 않도록 임시 파일에 쓰고 교체
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.jit.save(module, tmp_path, _extra_files={"meta.json": json.dumps(meta)})
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_quantized(path):
+    """(TorchScript 모듈, meta). 결과물을 만든 양자화 engine 으로 맞춘 뒤 로드"""
+    extra_files = {"meta.json": ""}
+    meta = {}
+    module = torch.jit.load(path, map_location="cpu", _extra_files=extra_files)
+    if extra_files["meta.json"]:
+        meta = json.loads(extra_files["meta.json"])
+    engine = meta.get("engine")
+    if engine and engine in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = engine
+    return module.eval(), meta
+
+
+def accuracy_gate(float_metrics, quantized_metrics, max_auc_drop=MAX_AUC_DROP, max_eer_increase=MAX_EER_INCREASE):
+    """
+    get_test_metrics 결과(데이터셋 이름 → metric dict) 두 개를 비교
+    데이터셋 하나라도 AUC 가 max_auc_drop 보다 많이 떨어지거나 EER 가 max_eer_increase 보다 많이 오르면 passed=False
+    """
+    datasets = {}
+    for name, reference in float_metrics.items():
+        quantized = quantized_metrics[name]
+        row = {}
+        for key in ("auc", "eer", "video_auc", "acc"):
+            row[key] = float(reference[key])
+            row[f"quantized_{key}"] = float(quantized[key])
+            row[f"{key}_delta"] = row[f"quantized_{key}"] - row[key]
+        row["passed"] = row["auc_delta"] >= -max_auc_drop and row["eer_delta"] <= max_eer_increase
+        datasets[name] = row
+    return {
+        "passed": bool(datasets) and all(row["passed"] for row in datasets.values()),
+        "max_auc_drop": max_auc_drop,
+        "max_eer_increase": max_eer_increase,
+        "datasets": datasets,
+    }
+
+
+def write_gate_report(quantized_path, report):
+    """게이트 결과를 결과물 해시와 함께 저장 (결과물을 다시 만들면 리포트가 무효가 됨)"""
+    report = dict(
+        report,
+        artifact_sha1=file_digest(quantized_path),
+        created_at=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+    with open(report_path_for(quantized_path), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def check_gate(quantized_path):
+    """게이트를 통과한 결과물이 아니면 RuntimeError"""
+    report_path = report_path_for(quantized_path)
+    if not os.path.exists(report_path):
+        raise RuntimeError(f"{quantized_path} has not been evaluated (run training/test.py --quantized_path)")
+    with open(report_path) as f:
+        report = json.load(f)
+    if report.get("artifact_sha1") != file_digest(quantized_path):
+        raise RuntimeError(f"{report_path} was written for a different {os.path.basename(quantized_path)}")
+    if not report.get("passed"):
+        raise RuntimeError(f"{quantized_path} failed the accuracy gate (see {report_path})")
+    return report
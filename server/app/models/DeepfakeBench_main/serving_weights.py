@@ -0,0 +1,98 @@
+"""
+Serving weights: 학습 체크포인트를 서빙용 state dict 로 한 번 변환해 두고, 로드는 그 파일을 바로 사용
+
+학습 체크포인트(xception_best.pth)는 로드할 때마다
+- 'state_dict' / 'model' 래핑과 DataParallel 'module.' 접두어를 풀고
+- ImageNet 초기 가중치 형식이면 pointwise conv 가중치를 (out, in) → (out, in, 1, 1) 로 바꿔야 한다.
+
+변환 파일(`<이름>.serving.pt`)은 이 정규화가 끝난 텐서만 담은 평범한 dict 라서
+torch.load(weights_only=True, mmap=True) 로 복사 없이 열리고 그대로 load_state_dict(assign=True) 에 쓸 수 있다.
+
+    python -m app.models.DeepfakeBench_main.serving_weights app/models/DeepfakeBench_main/training/pretrained/xception_best.pth
+"""
+import argparse
+import os
+import time
+
+import torch
+
+SERVING_SUFFIX = ".serving.pt"
+
+
+def serving_path_for(weights_path):
+    """xception_best.pth → xception_best.serving.pt"""
+    if weights_path.endswith(SERVING_SUFFIX):
+        return weights_path
+    return os.path.splitext(weights_path)[0] + SERVING_SUFFIX
+
+
+def resolve_weights_path(weights_path):
+    """
+    변환된 서빙 가중치가 원본보다 새로우면 그 경로, 아니면 원본 경로
+    (원본을 다시 학습해서 덮어쓰면 자동으로 원본으로 돌아감)
+    """
+    serving_path = serving_path_for(weights_path)
+    if serving_path == weights_path or not os.path.exists(serving_path):
+        return weights_path
+    if os.path.exists(weights_path) and os.path.getmtime(serving_path) < os.path.getmtime(weights_path):
+        return weights_path
+    return serving_path
+
+
+def normalize_checkpoint(checkpoint):
+    """체크포인트 래핑 / 'module.' 접두어 제거, pointwise 가중치 4D 화, 텐서가 아닌 항목 제거"""
+    if not isinstance(checkpoint, dict):
+        return checkpoint
+    state_dict = checkpoint.get('state_dict') or checkpoint.get('model') or checkpoint
+    normalized = {}
+    for key, value in state_dict.items():
+        if not isinstance(value, torch.Tensor):
+            continue
+        if 'pointwise' in key and value.dim() == 2:
+            value = value.unsqueeze(-1).unsqueeze(-1)
+        normalized[key.replace("module.", "")] = value
+    return normalized
+
+
+def convert(weights_path, output_path=None):
+    """학습 체크포인트를 서빙 가중치 파일로 변환하고 그 경로를 반환"""
+    output_path = output_path or serving_path_for(weights_path)
+    checkpoint = torch.load(weights_path, map_location="cpu")
+    state_dict = {key: value.contiguous() for key, value in normalize_checkpoint(checkpoint).items()}
+    # 중간에 끊겨도 반쯤 쓰인 파일이 서빙에 쓰이지 않도록 임시 파일에 쓰고 교체
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    torch.save(state_dict, tmp_path)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def load_weights(weights_path, mmap=None):
+    """
+    CPU state dict 로드. 서빙 가중치가 있으면 그것을 (정규화 없이) 사용하고, 없으면 원본을 읽어 정규화한다.
+    mmap=True 면 텐서가 파일 페이지를 직접 참조 (프로세스 간 page cache 공유, 로드 시 복사 없음)
+    mmap=None 이면 서빙 가중치일 때만 mmap (원본은 mmap 을 지원하지 않는 옛 형식일 수 있음)
+    """
+    path = resolve_weights_path(weights_path)
+    if path.endswith(SERVING_SUFFIX):
+        return torch.load(path, map_location="cpu", mmap=mmap is not False, weights_only=True)
+    if mmap:
+        return normalize_checkpoint(torch.load(path, map_location="cpu", mmap=True))
+    return normalize_checkpoint(torch.load(path, map_location="cpu"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a training checkpoint into serving weights")
+    parser.add_argument("weights_path")
+    parser.add_argument("-o", "--output", default=None, help=f"기본값: <weights_path 이름>{SERVING_SUFFIX} (서버는 이 기본 경로만 자동으로 사용)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    output_path = convert(args.weights_path, args.output)
+    state_dict = torch.load(output_path, map_location="cpu", weights_only=True)
+    size = sum(value.numel() * value.element_size() for value in state_dict.values())
+    print(f"{output_path}: {len(state_dict)} tensors, {size / (1 << 20):.1f} MB "
+          f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
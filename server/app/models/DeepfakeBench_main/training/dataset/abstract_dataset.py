@@ -30,6 +30,8 @@ from torchvision import transforms as T
 import albumentations as A
 
 from .albu import IsotropicResize
+from .frame_cache import FrameCache, cache_dir_for
+from preprocessing.lmdb_utils import open_lmdb
 
 FFpp_pool=['FaceForensics++','FaceShifter','DeepFakeDetection','FF-DF','FF-F2F','FF-FS','FF-NT']#
 
@@ -82,19 +84,19 @@ class DeepfakeAbstractBaseDataset(data.Dataset):
                 if len(dataset_list)>1:
                     if all_in_pool(dataset_list,FFpp_pool):
                         lmdb_path = os.path.join(config['lmdb_dir'], f"FaceForensics++_lmdb")
-                        self.env = lmdb.open(lmdb_path, create=False, subdir=True, readonly=True, lock=False)
+                        self.env = open_lmdb(lmdb_path, create=False, subdir=True, readonly=True, lock=False)
                     else:
                         raise ValueError('Training with multiple dataset and lmdb is not implemented yet.')
                 else:
                     lmdb_path = os.path.join(config['lmdb_dir'], f"{dataset_list[0] if dataset_list[0] not in FFpp_pool else 'FaceForensics++'}_lmdb")
-                    self.env = lmdb.open(lmdb_path, create=False, subdir=True, readonly=True, lock=False)
+                    self.env = open_lmdb(lmdb_path, create=False, subdir=True, readonly=True, lock=False)
         elif mode == 'test':
             one_data = config['test_dataset']
             # Test dataset should be evaluated separately. So collect only one dataset each time
             image_list, label_list, name_list = self.collect_img_and_label_for_one_dataset(one_data)
             if self.lmdb:
                 lmdb_path = os.path.join(config['lmdb_dir'], f"{one_data}_lmdb" if one_data not in FFpp_pool else 'FaceForensics++_lmdb')
-                self.env = lmdb.open(lmdb_path, create=False, subdir=True, readonly=True, lock=False)
+                self.env = open_lmdb(lmdb_path, create=False, subdir=True, readonly=True, lock=False)
         else:
             raise NotImplementedError('Only train and test modes are supported.')
 
@@ -109,6 +111,31 @@ class DeepfakeAbstractBaseDataset(data.Dataset):
         }
         
         self.transform = self.init_data_aug_method()
+
+        # Pre-decoded frames (optional), see init_frame_cache
+        self.frame_cache = None
+        if config.get('frame_cache_dir'):
+            self.frame_cache = self.init_frame_cache(dataset_list if mode == 'train' else one_data)
+
+    def init_frame_cache(self, dataset_names):
+        """Open the frame cache of this split, decoding and adding the frames it does not hold yet.
+
+        The frames are stored already resized to config['resolution'], so decode/resize is paid once
+        instead of on every access of every epoch.
+
+        Args:
+            dataset_names: The dataset name(s) of this split.
+
+        Returns:
+            FrameCache: The cache of this split.
+        """
+        frame_cache = FrameCache(cache_dir_for(self.config, self.mode, dataset_names))
+        keys = []
+        for image_paths in self.image_list:
+            keys.extend(image_paths if isinstance(image_paths, list) else [image_paths])
+        decoded = frame_cache.update(keys, self.decode_rgb, self.config['resolution'])
+        print(f"Frame cache {frame_cache.cache_dir}: {len(frame_cache)} frames ({decoded} newly decoded)")
+        return frame_cache
         
     def init_data_aug_method(self):
         trans = A.Compose([           
@@ -290,6 +317,38 @@ class DeepfakeAbstractBaseDataset(data.Dataset):
         Returns:
             An Image object containing the loaded and resized image.
 
+        Raises:
+            ValueError: If the loaded image is None.
+        """
+        return Image.fromarray(self.load_rgb_array(file_path))
+
+    def load_rgb_array(self, file_path):
+        """
+        Load an RGB image as a (resolution, resolution, 3) uint8 array, from the frame cache when it holds it.
+
+        Args:
+            file_path: A string indicating the path to the image file.
+
+        Returns:
+            A numpy array; a read-only view into the frame cache on a cache hit.
+        """
+        frame_cache = getattr(self, 'frame_cache', None)
+        if frame_cache is not None:
+            img = frame_cache.get(file_path)
+            if img is not None:
+                return img
+        return self.decode_rgb(file_path)
+
+    def decode_rgb(self, file_path):
+        """
+        Read, decode and resize an RGB image (from disk or LMDB), bypassing the frame cache.
+
+        Args:
+            file_path: A string indicating the path to the image file.
+
+        Returns:
+            A numpy array containing the loaded and resized image.
+
         Raises:
             ValueError: If the loaded image is None.
         """
@@ -312,7 +371,7 @@ class DeepfakeAbstractBaseDataset(data.Dataset):
                 img = cv2.imdecode(image_buf, cv2.IMREAD_COLOR)
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         img = cv2.resize(img, (size, size), interpolation=cv2.INTER_CUBIC)
-        return Image.fromarray(np.array(img, dtype=np.uint8))
+        return np.asarray(img, dtype=np.uint8)
 
 
     def load_mask(self, file_path):
@@ -487,12 +546,13 @@ class DeepfakeAbstractBaseDataset(data.Dataset):
 
             # Load the image
             try:
-                image = self.load_rgb(image_path)
+                image = self.load_rgb_array(image_path)
             except Exception as e:
                 # Skip this image and return the first one
                 print(f"Error loading image at index {index}: {e}")
                 return self.__getitem__(0)
-            image = np.array(image)  # Convert to numpy array for data augmentation
+            if not image.flags.writeable:
+                image = np.array(image)  # Private copy of the cached frame for data augmentation
 
             # Load mask and landmark (if needed)
             if self.config['with_mask']:
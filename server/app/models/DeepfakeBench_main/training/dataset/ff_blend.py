@@ -37,6 +37,7 @@ from dataset.utils.face_aug import aug_one_im, change_res
 from dataset.utils.image_ae import get_pretraiend_ae
 from dataset.utils.warp import warp_mask
 from dataset.utils import faceswap
+from preprocessing.lmdb_utils import open_lmdb
 from scipy.ndimage.filters import gaussian_filter
 
 
@@ -62,7 +63,7 @@ class FFBlendDataset(data.Dataset):
         self.lmdb = config.get('lmdb', False)
         if self.lmdb:
             lmdb_path = os.path.join(config['lmdb_dir'], f"FaceForensics++_lmdb")
-            self.env = lmdb.open(lmdb_path, create=False, subdir=True, readonly=True, lock=False)
+            self.env = open_lmdb(lmdb_path, create=False, subdir=True, readonly=True, lock=False)
 
         # Check if the dictionary has already been created
         if os.path.exists('training/lib/nearest_face_info.pkl'):
@@ -0,0 +1,114 @@
+# description: Pre-decoded frame cache, frames already resized to config['resolution'] in one np.memmap per split.
+
+import os
+import json
+
+import numpy as np
+from tqdm import tqdm
+
+FRAMES_NAME = 'frames.npy'
+INDEX_NAME = 'index.json'
+
+
+def cache_dir_for(config, mode, dataset_names):
+    """Directory of the cache of one split, e.g. {frame_cache_dir}/FaceForensics++_train_c23_256."""
+    if isinstance(dataset_names, str):
+        dataset_names = [dataset_names]
+    name = '+'.join(dataset_names)
+    return os.path.join(config['frame_cache_dir'], f"{name}_{mode}_{config['compression']}_{config['resolution']}")
+
+
+class FrameCache:
+    """
+    Read-only frame store: `frames.npy` holds a (N, size, size, 3) uint8 RGB array, `index.json` maps
+    each frame path (as listed in the dataset json) to its row.
+
+    `get` returns a view into the memory-mapped file, so reading a frame costs no decode, no resize and
+    no read() copy, and every DataLoader worker shares the same page cache. The memmap is opened lazily
+    in each process and is not pickled with the dataset.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.rows = {}
+        self.resolution = None
+        self._frames = None
+        index_path = os.path.join(cache_dir, INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, 'r') as f:
+                index = json.load(f)
+            self.rows = {key: row for row, key in enumerate(index['keys'])}
+            self.resolution = index['resolution']
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_frames'] = None
+        return state
+
+    @property
+    def frames(self):
+        if self._frames is None:
+            self._frames = np.load(os.path.join(self.cache_dir, FRAMES_NAME), mmap_mode='r')
+        return self._frames
+
+    def get(self, key):
+        """Read-only (size, size, 3) RGB view of the frame, or None if it is not cached."""
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return self.frames[row]
+
+    def update(self, keys, decode, resolution):
+        """
+        Make sure every key is cached, decoding the missing frames with `decode(key) -> (size, size, 3) RGB uint8`.
+        Already cached rows are copied over, so a new frame selection only pays for the new frames. Each frame
+        is written into its row of the new memmap as soon as it is decoded, so memory use does not grow with
+        the split. Frames that fail to decode are left out (the dataset falls back to its usual loading for
+        them); their rows are reused by the next frame and the unused tail rows are never written.
+
+        Returns:
+            int: The number of frames decoded.
+        """
+        if self.resolution is not None and self.resolution != resolution:
+            # a cache of another resolution is of no use, rebuild it from scratch
+            self.rows = {}
+        missing = [key for key in dict.fromkeys(keys) if key not in self.rows]
+        if not missing:
+            return 0
+
+        old_keys = sorted(self.rows, key=self.rows.get)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write next to the live files and rename, so readers (and concurrent DDP ranks) never see a partial cache
+        tmp_frames = os.path.join(self.cache_dir, f'frames.{os.getpid()}.tmp.npy')
+        tmp_index = os.path.join(self.cache_dir, f'index.{os.getpid()}.tmp.json')
+        # sized for every frame up front; the file is sparse until rows are written
+        out = np.lib.format.open_memmap(tmp_frames, mode='w+', dtype=np.uint8,
+                                        shape=(len(old_keys) + len(missing), resolution, resolution, 3))
+        for row, key in enumerate(old_keys):
+            out[row] = self.frames[self.rows[key]]
+
+        new_keys = list(old_keys)
+        for key in tqdm(missing, desc=f'caching frames into {self.cache_dir}'):
+            try:
+                out[len(new_keys)] = decode(key)
+            except Exception as e:
+                print(f"Frame cache: skipping {key}: {e}")
+                continue
+            new_keys.append(key)
+        out.flush()
+        del out
+        with open(tmp_index, 'w') as f:
+            json.dump({'resolution': resolution, 'count': len(new_keys), 'keys': new_keys}, f)
+
+        self._frames = None
+        os.replace(tmp_frames, os.path.join(self.cache_dir, FRAMES_NAME))
+        os.replace(tmp_index, os.path.join(self.cache_dir, INDEX_NAME))
+        self.rows = {key: row for row, key in enumerate(new_keys)}
+        self.resolution = resolution
+        return len(new_keys) - len(old_keys)
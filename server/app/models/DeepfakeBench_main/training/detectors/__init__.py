@@ -6,41 +6,52 @@ project_root_dir = os.path.dirname(parent_dir)
 sys.path.append(parent_dir)
 sys.path.append(project_root_dir)
 
-from metrics.registry import DETECTOR
-from .utils import slowfast
+from metrics.registry import DETECTOR, lazy_getattr
 
-from .facexray_detector import FaceXrayDetector
-from .xception_detector import XceptionDetector
-from .efficientnetb4_detector import EfficientDetector
-from .resnet34_detector import ResnetDetector
-from .f3net_detector import F3netDetector
-from .meso4_detector import Meso4Detector
-from .meso4Inception_detector import Meso4InceptionDetector
-from .spsl_detector import SpslDetector
-from .core_detector import CoreDetector
-from .capsule_net_detector import CapsuleNetDetector
-from .srm_detector import SRMDetector
-from .ucf_detector import UCFDetector
-from .recce_detector import RecceDetector
-from .fwa_detector import FWADetector
-from .ffd_detector import FFDDetector
-from .videomae_detector import VideoMAEDetector
-from .clip_detector import CLIPDetector
-from .timesformer_detector import TimeSformerDetector
-from .xclip_detector import XCLIPDetector
-from .sbi_detector import SBIDetector
-from .ftcn_detector import FTCNDetector
-from .i3d_detector import I3DDetector
-from .altfreezing_detector import AltFreezingDetector
-from .stil_detector import STILDetector
-from .lsda_detector import LSDADetector
-from .sladd_detector import SLADDXceptionDetector
-from .pcl_xception_detector import PCLXceptionDetector
-from .iid_detector import IIDDetector
-from .lrl_detector import LRLDetector
-from .rfm_detector import RFMDetector
-from .uia_vit_detector import UIAViTDetector
-from .multi_attention_detector import MultiAttentionDetector
-from .sia_detector import SIADetector
-from .tall_detector import TALLDetector
-from .effort_detector import EffortDetector
+# Detector modules are imported on first lookup (DETECTOR[name] or `from detectors import XceptionDetector`),
+# so importing the package does not load the CLIP / VideoMAE / X-CLIP / SlowFast code of unused detectors.
+# registered name: (module, class)
+_DETECTOR_MODULES = {
+    'facexray':        ('facexray_detector', 'FaceXrayDetector'),
+    'xception':        ('xception_detector', 'XceptionDetector'),
+    'efficientnetb4':  ('efficientnetb4_detector', 'EfficientDetector'),
+    'resnet34':        ('resnet34_detector', 'ResnetDetector'),
+    'f3net':           ('f3net_detector', 'F3netDetector'),
+    'meso4':           ('meso4_detector', 'Meso4Detector'),
+    'meso4Inception':  ('meso4Inception_detector', 'Meso4InceptionDetector'),
+    'spsl':            ('spsl_detector', 'SpslDetector'),
+    'core':            ('core_detector', 'CoreDetector'),
+    'capsule_net':     ('capsule_net_detector', 'CapsuleNetDetector'),
+    'srm':             ('srm_detector', 'SRMDetector'),
+    'ucf':             ('ucf_detector', 'UCFDetector'),
+    'recce':           ('recce_detector', 'RecceDetector'),
+    'fwa':             ('fwa_detector', 'FWADetector'),
+    'ffd':             ('ffd_detector', 'FFDDetector'),
+    'videomae':        ('videomae_detector', 'VideoMAEDetector'),
+    'clip':            ('clip_detector', 'CLIPDetector'),
+    'timesformer':     ('timesformer_detector', 'TimeSformerDetector'),
+    'xclip':           ('xclip_detector', 'XCLIPDetector'),
+    'sbi':             ('sbi_detector', 'SBIDetector'),
+    'ftcn':            ('ftcn_detector', 'FTCNDetector'),
+    'i3d':             ('i3d_detector', 'I3DDetector'),
+    'altfreezing':     ('altfreezing_detector', 'AltFreezingDetector'),
+    'stil':            ('stil_detector', 'STILDetector'),
+    'lsda':            ('lsda_detector', 'LSDADetector'),
+    'sladd':           ('sladd_detector', 'SLADDXceptionDetector'),
+    'pcl_xception':    ('pcl_xception_detector', 'PCLXceptionDetector'),
+    'iid':             ('iid_detector', 'IIDDetector'),
+    'lrl':             ('lrl_detector', 'LRLDetector'),
+    'rfm':             ('rfm_detector', 'RFMDetector'),
+    'uia_vit':         ('uia_vit_detector', 'UIAViTDetector'),
+    'multi_attention': ('multi_attention_detector', 'MultiAttentionDetector'),
+    'sia':             ('sia_detector', 'SIADetector'),
+    'tall':            ('tall_detector', 'TALLDetector'),
+    'effort':          ('effort_detector', 'EffortDetector'),
+}
+_CLASS_MODULES = {cls: module for module, cls in _DETECTOR_MODULES.values()}
+
+for _name, (_module, _) in _DETECTOR_MODULES.items():
+    DETECTOR.register_lazy(_name, f"{__name__}.{_module}")
+
+__all__ = ['DETECTOR'] + list(_CLASS_MODULES)
+__getattr__ = lazy_getattr(__name__, _CLASS_MODULES)
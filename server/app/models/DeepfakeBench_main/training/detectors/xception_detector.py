@@ -65,6 +65,9 @@ class XceptionDetector(AbstractDetector):
         backbone_class = BACKBONE[config['backbone_name']]
         model_config = config['backbone_config']
         backbone = backbone_class(model_config)
+        if not config.get('pretrained'):
+            # weights are loaded afterwards from a full detector checkpoint (serving)
+            return backbone
         # if donot load the pretrained weights, fail to get good results
         state_dict = torch.load(config['pretrained'])
         for name, weights in state_dict.items():
@@ -6,19 +6,30 @@ project_root_dir = os.path.dirname(parent_dir)
 sys.path.append(parent_dir)
 sys.path.append(project_root_dir)
 
-from metrics.registry import LOSSFUNC
+from metrics.registry import LOSSFUNC, lazy_getattr
 
-from .cross_entropy_loss import CrossEntropyLoss
-from .consistency_loss import ConsistencyCos
-from .capsule_loss import CapsuleLoss
-from .bce_loss import BCELoss
-from .am_softmax import AMSoftmaxLoss
-from .am_softmax import AMSoftmax_OHEM
-from .contrastive_regularization import ContrastiveLoss
-from .l1_loss import L1Loss
-from .id_loss import IDLoss
-from .vgg_loss import VGGLoss
-from .js_loss import JS_Loss
-from .patch_consistency_loss import PatchConsistencyLoss
-from .region_independent_loss import RegionIndependentLoss
-from .supercontrast_loss import SupConLoss
+# Loss modules are imported on first lookup (LOSSFUNC[name] or attribute access).
+# registered name: (module, class)
+_LOSSFUNC_MODULES = {
+    'cross_entropy':              ('cross_entropy_loss', 'CrossEntropyLoss'),
+    'consistency_loss':           ('consistency_loss', 'ConsistencyCos'),
+    'capsule_loss':               ('capsule_loss', 'CapsuleLoss'),
+    'bce':                        ('bce_loss', 'BCELoss'),
+    'am_softmax':                 ('am_softmax', 'AMSoftmaxLoss'),
+    'am_softmax_ohem':            ('am_softmax', 'AMSoftmax_OHEM'),
+    'contrastive_regularization': ('contrastive_regularization', 'ContrastiveLoss'),
+    'l1loss':                     ('l1_loss', 'L1Loss'),
+    'id_loss':                    ('id_loss', 'IDLoss'),
+    'vgg_loss':                   ('vgg_loss', 'VGGLoss'),
+    'jsloss':                     ('js_loss', 'JS_Loss'),
+    'patch_consistency_loss':     ('patch_consistency_loss', 'PatchConsistencyLoss'),
+    'region_independent_loss':    ('region_independent_loss', 'RegionIndependentLoss'),
+    'supcon':                     ('supercontrast_loss', 'SupConLoss'),
+}
+_CLASS_MODULES = {cls: module for module, cls in _LOSSFUNC_MODULES.values()}
+
+for _name, (_module, _) in _LOSSFUNC_MODULES.items():
+    LOSSFUNC.register_lazy(_name, f"{__name__}.{_module}")
+
+__all__ = ['LOSSFUNC'] + list(_CLASS_MODULES)
+__getattr__ = lazy_getattr(__name__, _CLASS_MODULES)
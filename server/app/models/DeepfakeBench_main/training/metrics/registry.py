@@ -1,7 +1,12 @@
+import importlib
+
+
 class Registry(object):
     def __init__(self):
         self.data = {}
-    
+        # name -> module that registers it when imported (see register_lazy)
+        self.lazy = {}
+
     def register_module(self, module_name=None):
         def _register(cls):
             name = module_name
@@ -10,11 +15,40 @@ class Registry(object):
             self.data[name] = cls
             return cls
         return _register
-    
+
+    def register_lazy(self, name, module_path):
+        """Declare that importing `module_path` registers `name`; the import happens on first lookup."""
+        self.lazy.setdefault(name, module_path)
+
     def __getitem__(self, key):
+        if key not in self.data and key in self.lazy:
+            importlib.import_module(self.lazy[key])
         return self.data[key]
-    
+
+    def __contains__(self, key):
+        return key in self.data or key in self.lazy
+
+    def keys(self):
+        return sorted(set(self.data) | set(self.lazy))
+
 BACKBONE = Registry()
 DETECTOR = Registry()
 TRAINER  = Registry()
 LOSSFUNC = Registry()
+
+
+def lazy_getattr(package, class_modules):
+    """
+    Module-level __getattr__ (PEP 562) for a package whose classes live in submodules that are only
+    imported when the class is first accessed, e.g. `from detectors import XceptionDetector`.
+
+    Args:
+        package (str): __name__ of the package.
+        class_modules (dict): class name -> submodule name.
+    """
+    def __getattr__(name):
+        module = class_modules.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        return getattr(importlib.import_module(f".{module}", package), name)
+    return __getattr__
@@ -6,10 +6,22 @@ project_root_dir = os.path.dirname(parent_dir)
 sys.path.append(parent_dir)
 sys.path.append(project_root_dir)
 
-from metrics.registry import BACKBONE
+from metrics.registry import BACKBONE, lazy_getattr
 
-from .xception import Xception
-from .mesonet import Meso4, MesoInception4
-from .resnet34 import ResNet34
-from .efficientnetb4 import EfficientNetB4
-from .xception_sladd import Xception_SLADD
+# Backbone modules are imported on first lookup (BACKBONE[name] or attribute access).
+# registered name: (module, class)
+_BACKBONE_MODULES = {
+    'xception':       ('xception', 'Xception'),
+    'meso4':          ('mesonet', 'Meso4'),
+    'meso4Inception': ('mesonet', 'MesoInception4'),
+    'resnet34':       ('resnet34', 'ResNet34'),
+    'efficientnetb4': ('efficientnetb4', 'EfficientNetB4'),
+    'xception_sladd': ('xception_sladd', 'Xception_SLADD'),
+}
+_CLASS_MODULES = {cls: module for module, cls in _BACKBONE_MODULES.values()}
+
+for _name, (_module, _) in _BACKBONE_MODULES.items():
+    BACKBONE.register_lazy(_name, f"{__name__}.{_module}")
+
+__all__ = ['BACKBONE'] + list(_CLASS_MODULES)
+__getattr__ = lazy_getattr(__name__, _CLASS_MODULES)
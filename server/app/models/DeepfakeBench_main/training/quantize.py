@@ -0,0 +1,105 @@
+"""
+INT8 post-training quantization of a trained Xception detector for CPU serving.
+
+backbone.features (separable convs) is statically quantized with activation ranges calibrated on
+a dataset split, the fc head is dynamically quantized (see quantization.py in DeepfakeBench_main).
+The artifact is written next to the weights as <name>.int8.pt and is only loaded by the server
+after it passes the accuracy gate of test.py (--quantized_path).
+
+Run from DeepfakeBench_main/:
+    python training/quantize.py --detector_path ./training/config/detector/xception.yaml \
+        --weights_path ./training/pretrained/xception_best.pth --calib_dataset FaceForensics++
+"""
+import os
+import sys
+current_file_path = os.path.abspath(__file__)
+parent_dir = os.path.dirname(os.path.dirname(current_file_path))
+project_root_dir = os.path.dirname(parent_dir)
+sys.path.append(parent_dir)
+sys.path.append(project_root_dir)
+
+import argparse
+import datetime
+import itertools
+import time
+
+import yaml
+import torch
+import torch.utils.data
+
+from dataset.abstract_dataset import DeepfakeAbstractBaseDataset
+from detectors import DETECTOR
+from quantization import QUANTIZATION_MODES, quantize_backbone, quantized_path_for, save_quantized
+from serving_weights import load_weights
+
+parser = argparse.ArgumentParser(description='Quantize a trained Xception detector to INT8.')
+parser.add_argument('--detector_path', type=str, default='./training/config/detector/xception.yaml',
+                    help='path to detector YAML file')
+parser.add_argument('--weights_path', type=str, required=True)
+parser.add_argument('--mode', choices=QUANTIZATION_MODES, default='static',
+                    help='static: int8 convs (calibrated) + dynamic int8 fc; dynamic: dynamic int8 fc only')
+parser.add_argument('--calib_dataset', type=str, default=None,
+                    help='dataset used for calibration (default: first train_dataset of the config)')
+parser.add_argument('--calib_split', choices=['train', 'test'], default='train',
+                    help='split of the calibration dataset; keep it disjoint from the data test.py gates on')
+parser.add_argument('--calib_batches', type=int, default=32, help='number of calibration batches')
+parser.add_argument('--output', type=str, default=None, help='default: <weights_path name>.int8.pt')
+args = parser.parse_args()
+
+
+def calibration_batches(config, dataset_name, split, num_batches):
+    """Normalized image batches from a random subset of one dataset split, without augmentation."""
+    config = config.copy()
+    config['use_data_augmentation'] = False
+    if split == 'train':
+        config['train_dataset'] = [dataset_name]
+    else:
+        config['test_dataset'] = dataset_name
+    dataset = DeepfakeAbstractBaseDataset(config=config, mode=split)
+    loader = torch.utils.data.DataLoader(
+        dataset=dataset,
+        batch_size=config['test_batchSize'],
+        shuffle=True,
+        num_workers=int(config['workers']),
+        collate_fn=dataset.collate_fn,
+        drop_last=False,
+        generator=torch.Generator().manual_seed(config['manualSeed'] or 0),
+    )
+    for data_dict in itertools.islice(loader, num_batches):
+        yield data_dict['image']
+
+
+def main():
+    with open(args.detector_path, 'r') as f:
+        config = yaml.safe_load(f)
+    with open('./training/config/test_config.yaml', 'r') as f:
+        config.update(yaml.safe_load(f))
+    # the checkpoint overwrites every weight, skip the ImageNet initialization
+    config['pretrained'] = None
+
+    model = DETECTOR[config['model_name']](config)
+    model.load_state_dict(load_weights(args.weights_path), strict=True)
+    model.eval()
+
+    calib_dataset = args.calib_dataset or config['train_dataset'][0]
+    batches = ()
+    if args.mode == 'static':
+        batches = calibration_batches(config, calib_dataset, args.calib_split, args.calib_batches)
+
+    start = time.perf_counter()
+    scorer, calib_images = quantize_backbone(model.backbone, batches, mode=args.mode)
+    output_path = save_quantized(scorer, args.output or quantized_path_for(args.weights_path), {
+        'mode': args.mode,
+        'source_weights': os.path.basename(args.weights_path),
+        'calib_dataset': calib_dataset if args.mode == 'static' else None,
+        'calib_split': args.calib_split if args.mode == 'static' else None,
+        'calib_images': calib_images,
+        'created_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    print(f'===> {output_path}: {os.path.getsize(output_path) / (1 << 20):.1f} MB, '
+          f'{calib_images} calibration images ({time.perf_counter() - start:.1f}s)')
+    print('===> Run training/test.py with --quantized_path to gate it before serving')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,13 @@
 eval pretained model.
 """
 import os
+import sys
+current_file_path = os.path.abspath(__file__)
+parent_dir = os.path.dirname(os.path.dirname(current_file_path))
+project_root_dir = os.path.dirname(parent_dir)
+sys.path.append(parent_dir)
+sys.path.append(project_root_dir)
+
 import numpy as np
 from os.path import join
 import cv2
@@ -31,6 +38,9 @@ from trainer.trainer import Trainer
 from detectors import DETECTOR
 from metrics.base_metrics_class import Recorder
 from collections import defaultdict
+from quantization import (
+    MAX_AUC_DROP, MAX_EER_INCREASE, accuracy_gate, load_quantized, write_gate_report
+)
 
 import argparse
 from logger import create_logger
@@ -43,6 +53,10 @@ parser.add_argument("--test_dataset", nargs="+")
 parser.add_argument('--weights_path', type=str, 
                     default='/mntcephfs/lab_data/zhiyuanyan/benchmark_results/auc_draw/cnn_aug/resnet34_2023-05-20-16-57-22/test/FaceForensics++/ckpt_epoch_9_best.pth')
 #parser.add_argument("--lmdb", action='store_true', default=False)
+parser.add_argument('--quantized_path', type=str, default=None,
+                    help='INT8 model from quantize.py; evaluated against the float model and gated on AUC/EER')
+parser.add_argument('--max_auc_drop', type=float, default=MAX_AUC_DROP)
+parser.add_argument('--max_eer_increase', type=float, default=MAX_EER_INCREASE)
 args = parser.parse_args()
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -109,7 +123,8 @@ def test_one_dataset(model, data_loader):
         predictions = inference(model, data_dict)
         label_lists += list(data_dict['label'].cpu().detach().numpy())
         prediction_lists += list(predictions['prob'].cpu().detach().numpy())
-        feature_lists += list(predictions['feat'].cpu().detach().numpy())
+        if 'feat' in predictions:
+            feature_lists += list(predictions['feat'].cpu().detach().numpy())
     
     return np.array(prediction_lists), np.array(label_lists),np.array(feature_lists)
     
@@ -145,6 +160,33 @@ def inference(model, data_dict):
     return predictions
 
 
+class QuantizedDetector(nn.Module):
+    """Detector-style wrapper around a quantized TorchScript scorer (CPU only, returns prob only)."""
+
+    def __init__(self, scorer):
+        super().__init__()
+        self.scorer = scorer
+
+    def forward(self, data_dict, inference=False):
+        image = data_dict['image']
+        return {'prob': self.scorer(image.cpu()).to(image.device)}
+
+
+def test_quantized(float_metrics, test_data_loaders):
+    """Evaluate the quantized model on the same loaders and gate it against the float metrics."""
+    scorer, meta = load_quantized(args.quantized_path)
+    print(f"===> Testing quantized model {args.quantized_path} "
+          f"(mode: {meta.get('mode')}, engine: {meta.get('engine')})")
+    quantized_metrics = test_epoch(QuantizedDetector(scorer), test_data_loaders)
+    report = accuracy_gate(float_metrics, quantized_metrics,
+                           max_auc_drop=args.max_auc_drop, max_eer_increase=args.max_eer_increase)
+    for name, row in report['datasets'].items():
+        tqdm.write(f"{name}: auc {row['auc']:.4f} -> {row['quantized_auc']:.4f} ({row['auc_delta']:+.4f}), "
+                   f"eer {row['eer']:.4f} -> {row['quantized_eer']:.4f} ({row['eer_delta']:+.4f}), "
+                   f"video_auc {row['video_auc_delta']:+.4f}, {'pass' if row['passed'] else 'FAIL'}")
+    return write_gate_report(args.quantized_path, report)
+
+
 def main():
     # parse options and load config
     with open(args.detector_path, 'r') as f:
@@ -189,6 +231,13 @@ def main():
     
     # start testing
     best_metric = test_epoch(model, test_data_loaders)
+    if args.quantized_path:
+        report = test_quantized(best_metric, test_data_loaders)
+        if not report['passed']:
+            print(f"===> Quantized model rejected: AUC drop > {args.max_auc_drop} "
+                  f"or EER increase > {args.max_eer_increase} on at least one dataset")
+            sys.exit(1)
+        print('===> Quantized model accepted')
     print('===> Test Done!')
 
 if __name__ == '__main__':
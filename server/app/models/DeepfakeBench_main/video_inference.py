@@ -0,0 +1,101 @@
+"""
+Video-level detection helpers
+
+- sample_frame_indices: preprocessing/preprocess.py 와 같은 규칙 (fixed_num_frames | fixed_stride)
+- read_sampled_frames: cv2.VideoCapture 로 필요한 프레임만 디코딩 (나머지는 grab 으로 건너뜀)
+- VideoVerdict: 프레임 확률 평균으로 영상 판정 (metrics/utils.get_test_metrics 의 video 집계와 동일)
+  + 판정이 충분히 확실해지면 남은 프레임을 건너뛰는 early exit
+"""
+import math
+
+import cv2
+import numpy as np
+
+SAMPLING_MODES = ("fixed_num_frames", "fixed_stride")
+
+
+def sample_frame_indices(frame_count, mode="fixed_num_frames", num_frames=32, stride=10):
+    """
+    샘플링할 프레임 번호 (오름차순, 중복 제거)
+    frame_count 를 모르면 (일부 컨테이너는 0 을 반환) None — 호출 측에서 stride 로 읽는다.
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode: {mode} (choices: {', '.join(SAMPLING_MODES)})")
+    if frame_count <= 0:
+        return None
+    if mode == "fixed_num_frames":
+        if num_frames >= frame_count:
+            return list(range(frame_count))
+        return sorted(set(np.linspace(0, frame_count - 1, num_frames, endpoint=True, dtype=int).tolist()))
+    return list(range(0, frame_count, max(1, stride)))
+
+
+def read_sampled_frames(capture, indices=None, stride=10):
+    """
+    (프레임 번호, BGR 프레임) 을 순서대로 생성
+    indices 가 없으면 stride 간격으로 끝까지 읽음. 샘플하지 않는 프레임은 grab 만 하고 retrieve 하지 않는다.
+    """
+    wanted = set(indices) if indices is not None else None
+    last = max(indices) if indices else None
+    index = 0
+    while last is None or index <= last:
+        if not capture.grab():
+            break
+        sampled = index in wanted if wanted is not None else index % max(1, stride) == 0
+        if sampled:
+            ok, frame = capture.retrieve()
+            if ok and frame is not None:
+                yield index, frame
+        index += 1
+
+
+class VideoVerdict:
+    """Running mean of frame fake probabilities with a confidence-based stopping rule"""
+
+    def __init__(self, threshold=0.5, min_frames=8, z=3.0):
+        """
+        min_frames: early exit 를 고려하기 전에 점수화할 최소 프레임 수
+        z: 평균의 표준오차 대비 threshold 와의 거리 (클수록 보수적)
+        """
+        self.threshold = threshold
+        self.min_frames = min_frames
+        self.z = z
+        self.probs = []
+
+    def add(self, probs):
+        self.probs.extend(float(p) for p in probs)
+
+    @property
+    def count(self):
+        return len(self.probs)
+
+    @property
+    def mean(self):
+        return sum(self.probs) / len(self.probs) if self.probs else None
+
+    def decided(self):
+        """
+        평균 ± z * 표준오차 구간이 threshold 한쪽에만 있으면 True
+        (남은 프레임을 더 봐도 판정이 바뀔 가능성이 낮음)
+        """
+        n = len(self.probs)
+        if n < max(2, self.min_frames):
+            return False
+        mean = self.mean
+        variance = sum((p - mean) ** 2 for p in self.probs) / (n - 1)
+        return abs(mean - self.threshold) > self.z * math.sqrt(variance / n)
+
+    @property
+    def is_fake(self):
+        return self.mean is not None and self.mean > self.threshold
+
+
+def open_video(path):
+    """(VideoCapture, frame_count, fps) — 열지 못하면 ValueError"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        capture.release()
+        raise ValueError("Unable to open video")
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    return capture, frame_count, fps
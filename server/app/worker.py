@@ -0,0 +1,57 @@
+"""
+Standalone inference job worker
+
+API 서버와 같은 Redis 작업 큐(JOB_QUEUE_NAME)를 소비하는 별도 프로세스.
+수집(업로드) 속도와 추론 속도를 분리해서 추론 용량만 따로 늘릴 수 있다.
+
+    JOB_MODE=async JOB_WORKERS=0 uvicorn app.main:app --workers 4   # API 는 큐에 넣기만
+    JOB_WORKERS=2 python -m app.worker                               # 추론 전용 워커
+"""
+import asyncio
+import signal
+
+from app.api.server import process_job
+from app.core import get_settings, get_inference_executor, get_job_queue, get_micro_batcher
+from app.db import db
+from app.inference.jobs import JobWorkerPool
+
+
+async def main() -> int:
+    settings = get_settings()
+    await asyncio.gather(db.connect_redis(), db.connect_mongodb())
+    if not db.redis_client:
+        print("⚠️  Redis is required for standalone job workers")
+        await db.disconnect()
+        return 1
+
+    workers = JobWorkerPool(get_job_queue(), process_job, max(1, settings.JOB_WORKERS))
+    workers.start()
+    print(f"✅ Job worker started: queue={settings.JOB_QUEUE_NAME}, workers={workers.concurrency}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await stop.wait()
+    except KeyboardInterrupt:
+        pass
+
+    print("🛑 Stopping job worker...")
+    await workers.stop()
+    if get_inference_executor.cache_info().currsize:
+        get_inference_executor().shutdown()
+    if get_micro_batcher.cache_info().currsize:
+        batcher = get_micro_batcher()
+        if batcher is not None:
+            batcher.stop()
+    await db.disconnect()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,110 @@
+"""
+Xception scoring backends: eager vs torchscript / compile / onnx / int8
+
+backend 마다 DeepfakeDetector 를 새로 만들어 (기동 시 verify_backend 포함) 다음을 비교한다.
+- build s   : detector 생성 시간 (가중치 로드 + trace / compile / export + 검증)
+- max|Δ|    : 샘플 얼굴 크롭에 대한 eager 확률과의 최대 차이 (판정이 0.5 기준으로 뒤집힌 수도 함께 출력)
+- batch 별 : predict_batch 중앙값 지연(ms)과 처리량(얼굴/초)
+
+얼굴 크롭은 eager detector 로 한 번 찾아 두고 batch 크기에 맞게 반복해서 채운다.
+생성에 실패한 backend (onnxruntime 미설치, 오차 초과, 게이트를 통과한 int8 결과물 없음 등) 는 이유를 출력하고 건너뛴다.
+
+Usage (server/ 에서):
+    python benchmarks/bench_backends.py --backends eager torchscript compile onnx int8 --batch-sizes 1 4 16 --repeat 20
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import torch
+
+SERVER_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVER_ROOT))
+
+from app.models.DeepfakeBench_main.deepfake_detector import DeepfakeDetector
+from app.models.DeepfakeBench_main.inference_backends import INFERENCE_BACKENDS
+
+from bench_face_detection import IMAGE_EXTENSIONS
+
+DEEPFAKE_BENCH_ROOT = SERVER_ROOT / "app" / "models" / "DeepfakeBench_main"
+WEIGHTS_PATH = str(DEEPFAKE_BENCH_ROOT / "training" / "pretrained" / "xception_best.pth")
+
+
+def load_crops(detector, image_dir):
+    crops = []
+    for path in sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS):
+        crops.extend(crop for crop, _ in detector.locate_faces(str(path)))
+    return crops
+
+
+def batch_of(crops, size):
+    return [crops[i % len(crops)] for i in range(size)]
+
+
+def time_batches(detector, crops, batch_sizes, repeat, warmup=2):
+    """batch 크기별 (중앙값 ms, 얼굴/초)"""
+    results = {}
+    for size in batch_sizes:
+        batch = batch_of(crops, size)
+        latencies = []
+        for i in range(warmup + repeat):
+            start = time.perf_counter()
+            detector.predict_batch(detector.face_batch(batch))
+            if i >= warmup:
+                latencies.append((time.perf_counter() - start) * 1000.0)
+        median = statistics.median(latencies)
+        results[size] = (median, size / (median / 1000.0))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weights", default=WEIGHTS_PATH)
+    parser.add_argument("--images", default=str(DEEPFAKE_BENCH_ROOT / "face"))
+    parser.add_argument("--backends", nargs="+", default=list(INFERENCE_BACKENDS))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op 스레드 수 (0 = 기본값)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    eager = DeepfakeDetector(weights_path=args.weights, device="cpu", backend="eager")
+    crops = load_crops(eager, args.images)
+    if not crops:
+        print(f"No faces found in {args.images}")
+        return 1
+    reference = eager.predict_batch(eager.face_batch(crops))
+    print(f"{len(crops)} face crops, torch {torch.__version__}, {torch.get_num_threads()} threads\n")
+
+    header = f"{'backend':<12} {'build s':>8} {'max|Δ|':>9} {'flips':>5} " + " ".join(
+        f"{f'b{size} ms':>9} {'face/s':>7}" for size in args.batch_sizes
+    )
+    print(header)
+    for name in args.backends:
+        start = time.perf_counter()
+        try:
+            detector = eager if name == "eager" else DeepfakeDetector(
+                weights_path=args.weights, device="cpu", backend=name
+            )
+        except Exception as e:
+            print(f"{name:<12} skipped: {e}")
+            continue
+        build = time.perf_counter() - start if name != "eager" else 0.0
+
+        probs = detector.predict_batch(detector.face_batch(crops))
+        diff = max(abs(p - r) for p, r in zip(probs, reference))
+        flips = sum((p > 0.5) != (r > 0.5) for p, r in zip(probs, reference))
+        timings = time_batches(detector, crops, args.batch_sizes, args.repeat)
+        print(
+            f"{name:<12} {build:>8.1f} {diff:>9.2e} {flips:>5} "
+            + " ".join(f"{ms:>9.2f} {rate:>7.1f}" for ms, rate in timings.values())
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+"""
+Face detection latency vs. input size
+
+DeepfakeBench_main/face/ 의 샘플 이미지를 여러 해상도(메가픽셀)로 리사이즈한 뒤
+- full    : 원본 해상도 검출 (기존 방식)
+- adaptive: 작업 해상도로 축소 검출 → 원본 좌표 복원
+- refine  : adaptive + 원본 해상도 ROI 재검출
+의 검출 지연과, full 결과 대비 첫 박스 IoU 를 비교한다.
+
+Usage (server/ 에서):
+    python benchmarks/bench_face_detection.py --megapixels 0.3 1 4 12 --max-side 640 --repeat 3 --backend dlib_hog
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+DEEPFAKE_BENCH_ROOT = Path(__file__).resolve().parent.parent / "app" / "models" / "DeepfakeBench_main"
+sys.path.insert(0, str(DEEPFAKE_BENCH_ROOT))
+
+from face_detectors import AdaptiveFaceDetector
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def resize_to_megapixels(img, megapixels):
+    h, w = img.shape[:2]
+    scale = (megapixels * 1_000_000 / (h * w)) ** 0.5
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(img, size, interpolation=interpolation)
+
+
+def iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def time_detect(detector, img, repeat):
+    latencies = []
+    boxes = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        boxes = detector.detect(img)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(latencies), boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=str(DEEPFAKE_BENCH_ROOT / "face"))
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[0.3, 1.0, 4.0, 12.0])
+    parser.add_argument("--max-side", type=int, default=640)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backend", default="dlib_hog", help="dlib_hog | dlib_cnn | haar | yunet | auto")
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not paths:
+        print(f"No images found in {args.images}")
+        return 1
+
+    detectors = {
+        "full": AdaptiveFaceDetector(backend=args.backend, max_side=0),
+        "adaptive": AdaptiveFaceDetector(backend=args.backend, max_side=args.max_side, refine=False),
+        "refine": AdaptiveFaceDetector(backend=args.backend, max_side=args.max_side, refine=True),
+    }
+
+    print(f"{'image':<18} {'MP':>5} " + " ".join(f"{name + ' ms':>12}" for name in detectors)
+          + f" {'faces f/a/r':>12} {'IoU a/r':>11}")
+    totals = {mp: {name: [] for name in detectors} for mp in args.megapixels}
+
+    for path in paths:
+        original = cv2.imread(str(path))
+        if original is None:
+            continue
+        for mp in args.megapixels:
+            img = resize_to_megapixels(original, mp)
+            results = {name: time_detect(det, img, args.repeat) for name, det in detectors.items()}
+            for name, (latency, _) in results.items():
+                totals[mp][name].append(latency)
+
+            full_boxes = results["full"][1]
+            ious = [
+                iou(full_boxes[0], results[name][1][0]) if full_boxes and results[name][1] else 0.0
+                for name in ("adaptive", "refine")
+            ]
+            print(
+                f"{path.name[:18]:<18} {mp:>5.1f} "
+                + " ".join(f"{results[name][0]:>12.1f}" for name in detectors)
+                + f" {'/'.join(str(len(results[n][1])) for n in detectors):>12}"
+                + f" {ious[0]:>5.2f}/{ious[1]:<5.2f}"
+            )
+
+    print("\nMedian latency per input size (ms)")
+    print(f"{'MP':>5} " + " ".join(f"{name:>10}" for name in detectors) + f" {'speedup':>9}")
+    for mp, by_name in totals.items():
+        medians = {name: statistics.median(values) for name, values in by_name.items() if values}
+        if not medians:
+            continue
+        speedup = medians["full"] / medians["refine"] if medians["refine"] > 0 else 0.0
+        print(f"{mp:>5.1f} " + " ".join(f"{medians[name]:>10.1f}" for name in detectors) + f" {speedup:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+"""
+Cold-start import time: lazy vs eager detector registry
+
+각 측정은 새 인터프리터에서 대상 모듈을 import 하는 시간 (인터프리터 기동 제외) 과 로드된 모듈 수.
+- lazy : 현재 코드. DETECTOR / BACKBONE / LOSSFUNC 는 이름으로 처음 조회될 때 해당 모듈만 import
+- eager: 이전 동작 재현. training/detectors/__init__.py 가 35 개 detector 모듈과 slowfast 를
+         `training.detectors` 와 `detectors` 두 패키지 이름으로 모두 import 하던 것과 같은 모듈들을 먼저 import
+
+대상:
+- app.main           : FastAPI 앱 (uvicorn app.main:app 의 cold start)
+- detectors          : train.py / test.py 의 `from detectors import DETECTOR`
+
+Usage (server/ 에서):
+    python benchmarks/bench_import.py --repeat 5
+    python benchmarks/bench_import.py --targets app.main --repeat 10
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SERVER_ROOT = Path(__file__).resolve().parent.parent
+DEEPFAKE_BENCH_ROOT = SERVER_ROOT / "app" / "models" / "DeepfakeBench_main"
+TRAINING_ROOT = DEEPFAKE_BENCH_ROOT / "training"
+
+CHILD = r"""
+import importlib, json, sys, time
+sys.path[:0] = {paths!r}
+start = time.perf_counter()
+if {eager!r}:
+    from metrics.registry import DETECTOR, BACKBONE, LOSSFUNC
+    for package in ("training.detectors", "detectors"):
+        registry_package = importlib.import_module(package)
+        importlib.import_module(package + ".utils.slowfast")
+        for module, _ in registry_package._DETECTOR_MODULES.values():
+            importlib.import_module(package + "." + module)
+    for package, registry in (("networks", BACKBONE), ("loss", LOSSFUNC)):
+        registry_package = importlib.import_module(package)
+        for name in registry.keys():
+            registry[name]
+importlib.import_module({target!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": len(sys.modules)}}))
+"""
+
+
+def measure(target, eager):
+    code = CHILD.format(
+        paths=[str(SERVER_ROOT), str(DEEPFAKE_BENCH_ROOT), str(TRAINING_ROOT)],
+        eager=eager,
+        target=target,
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=SERVER_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=["app.main", "detectors"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'target':<12} {'mode':<6} {'median s':>9} {'min s':>7} {'modules':>8}")
+    for target in args.targets:
+        medians = {}
+        for mode in ("eager", "lazy"):
+            runs = [measure(target, eager=(mode == "eager")) for _ in range(args.repeat)]
+            seconds = [run["seconds"] for run in runs]
+            medians[mode] = statistics.median(seconds)
+            print(f"{target:<12} {mode:<6} {medians[mode]:>9.3f} {min(seconds):>7.3f} {runs[-1]['modules']:>8}")
+        print(f"{target:<12} speedup {medians['eager'] / medians['lazy']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Preprocessing latency / allocations: legacy vs fused path
+
+샘플 이미지를 여러 해상도(메가픽셀)의 JPEG 로 다시 인코딩한 뒤 단계별로 비교한다.
+- legacy: imdecode(원본) → 검출 → BGR 크롭 → RGB PIL → Resize/ToTensor/Normalize, 저장용 PIL resize
+- fused : IMREAD_REDUCED_* 축소 디코딩 → 검출 → OpenCV crop/resize(RGB 256) → 공유 float32 버퍼에 정규화
+
+단계별 지연은 tracemalloc 없이 repeat 회 측정한 중앙값, 할당량은 별도 1회 실행에서 tracemalloc 으로 잰
+단계 내 peak 바이트 (numpy / OpenCV / PIL 버퍼 포함, torch CPU 텐서 저장소는 tracemalloc 에 잡히지 않음).
+fused 결과와 legacy 결과의 텐서 최대 차이(max |Δ|, 리사이즈 보간 차이)도 함께 출력한다.
+
+Usage (server/ 에서):
+    python benchmarks/bench_preprocess.py --megapixels 0.3 2 8 12 --repeat 5 --backend dlib_hog
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+from torchvision import transforms
+
+DEEPFAKE_BENCH_ROOT = Path(__file__).resolve().parent.parent / "app" / "models" / "DeepfakeBench_main"
+sys.path.insert(0, str(DEEPFAKE_BENCH_ROOT))
+
+from face_detectors import AdaptiveFaceDetector
+from fused_preprocess import FusedPreprocessor
+
+from bench_face_detection import IMAGE_EXTENSIONS, resize_to_megapixels
+
+STAGES = ("decode", "detect", "crop", "tensor")
+
+LEGACY_TRANSFORM = transforms.Compose([
+    transforms.Resize((256, 256)),
+    transforms.ToTensor(),
+    transforms.Normalize([0.5] * 3, [0.5] * 3),
+])
+
+
+def largest(boxes):
+    return max(boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1])) if boxes else None
+
+
+def legacy_stages(detector):
+    """기존 deepfake_detector 경로를 단계 함수로 분해"""
+    state = {}
+
+    def decode(data):
+        state["img"] = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+    def detect(_):
+        state["box"] = largest(detector.detect(state["img"]))
+
+    def crop(_):
+        img, box = state["img"], state["box"]
+        x1, y1 = max(0, box[0]), max(0, box[1])
+        x2, y2 = min(img.shape[1], box[2]), min(img.shape[0], box[3])
+        margin = int((x2 - x1) * 0.2)
+        x1, y1 = max(0, x1 - margin), max(0, y1 - margin)
+        x2, y2 = min(img.shape[1], x2 + margin), min(img.shape[0], y2 + margin)
+        state["crop"] = Image.fromarray(cv2.cvtColor(img[y1:y2, x1:x2], cv2.COLOR_BGR2RGB))
+
+    def tensor(_):
+        state["tensor"] = LEGACY_TRANSFORM(state["crop"]).unsqueeze(0)
+        state["array"] = np.array(state["crop"].resize((256, 256)))
+
+    return state, dict(zip(STAGES, (decode, detect, crop, tensor)))
+
+
+def fused_stages(detector, preprocessor):
+    state = {}
+
+    def decode(data):
+        state["img"], state["factor"] = preprocessor.decode(data)
+
+    def detect(_):
+        state["box"] = largest(detector.detect(state["img"]))
+
+    def crop(_):
+        img, box = state["img"], state["box"]
+        box = (max(0, box[0]), max(0, box[1]), min(img.shape[1], box[2]), min(img.shape[0], box[3]))
+        state["array"] = preprocessor.crop(img, box)
+
+    def tensor(_):
+        state["tensor"] = preprocessor.batch_tensor([state["array"]])
+
+    return state, dict(zip(STAGES, (decode, detect, crop, tensor)))
+
+
+def run(stages, data, repeat):
+    """단계별 (중앙값 ms, peak 할당 바이트)"""
+    latencies = {name: [] for name in stages}
+    for _ in range(repeat):
+        for name, fn in stages.items():
+            start = time.perf_counter()
+            fn(data)
+            latencies[name].append((time.perf_counter() - start) * 1000.0)
+
+    allocations = {}
+    tracemalloc.start()
+    try:
+        for name, fn in stages.items():
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            fn(data)
+            _, peak = tracemalloc.get_traced_memory()
+            allocations[name] = peak - baseline
+    finally:
+        tracemalloc.stop()
+    return {name: (statistics.median(values), allocations[name]) for name, values in latencies.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=str(DEEPFAKE_BENCH_ROOT / "face"))
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[0.3, 2.0, 8.0, 12.0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", default="dlib_hog", help="dlib_hog | dlib_cnn | haar | yunet | auto")
+    parser.add_argument("--max-side", type=int, default=640)
+    parser.add_argument("--decode-min-side", type=int, default=1024)
+    parser.add_argument("--quality", type=int, default=92, help="재인코딩 JPEG 품질")
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not paths:
+        print(f"No images found in {args.images}")
+        return 1
+
+    detector = AdaptiveFaceDetector(backend=args.backend, max_side=args.max_side)
+    preprocessor = FusedPreprocessor(size=256, decode_min_side=args.decode_min_side)
+    legacy_state, legacy = legacy_stages(detector)
+    fused_state, fused = fused_stages(detector, preprocessor)
+
+    totals = {mp: {"legacy": [], "fused": []} for mp in args.megapixels}
+    print(f"{'image':<18} {'MP':>5} {'path':<7} "
+          + " ".join(f"{stage + ' ms':>10} {'KiB':>8}" for stage in STAGES) + f" {'max|Δ|':>7}")
+
+    for path in paths:
+        original = cv2.imread(str(path))
+        if original is None:
+            continue
+        for mp in args.megapixels:
+            ok, encoded = cv2.imencode(".jpg", resize_to_megapixels(original, mp),
+                                       [cv2.IMWRITE_JPEG_QUALITY, args.quality])
+            if not ok:
+                continue
+            data = encoded.tobytes()
+
+            # 얼굴이 없는 입력은 단계 함수가 박스를 전제하므로 건너뜀
+            legacy["decode"](data)
+            legacy["detect"](data)
+            fused["decode"](data)
+            fused["detect"](data)
+            if legacy_state["box"] is None or fused_state["box"] is None:
+                print(f"{path.name[:18]:<18} {mp:>5.1f} no face, skipped")
+                continue
+
+            results = {"legacy": run(legacy, data, args.repeat), "fused": run(fused, data, args.repeat)}
+            diff = float((legacy_state["tensor"] - fused_state["tensor"]).abs().max())
+            for name, stages in results.items():
+                totals[mp][name].append(stages)
+                print(
+                    f"{path.name[:18]:<18} {mp:>5.1f} {name:<7} "
+                    + " ".join(f"{ms:>10.2f} {alloc / 1024:>8.0f}" for ms, alloc in stages.values())
+                    + (f" {diff:>7.3f}" if name == "fused" else "")
+                )
+
+    print("\nMedian per input size: total ms / peak KiB (legacy → fused)")
+    print(f"{'MP':>5} " + " ".join(f"{stage:>22}" for stage in STAGES) + f" {'total ms':>18}")
+    for mp, by_path in totals.items():
+        if not by_path["legacy"]:
+            continue
+        cells = []
+        for stage in STAGES:
+            ms = {n: statistics.median(r[stage][0] for r in by_path[n]) for n in by_path}
+            kib = {n: statistics.median(r[stage][1] for r in by_path[n]) / 1024 for n in by_path}
+            cells.append(f"{ms['legacy']:>5.1f}→{ms['fused']:<5.1f} {kib['legacy']:>5.0f}→{kib['fused']:<5.0f}")
+        total = {n: statistics.median(sum(ms for ms, _ in r.values()) for r in by_path[n]) for n in by_path}
+        print(f"{mp:>5.1f} " + " ".join(f"{c:>22}" for c in cells)
+              + f" {total['legacy']:>8.1f}→{total['fused']:<8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
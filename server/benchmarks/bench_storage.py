@@ -0,0 +1,152 @@
+"""
+Storage overhead benchmark (Redis + MongoDB 저장 경로)
+
+실제 서버 없이 네트워크 왕복 지연(RTT)을 흉내 내는 로컬 stand-in 으로
+요청당 저장 오버헤드와 동시 처리량을 비교한다.
+
+- legacy: 동기 redis-py setex(이벤트 루프 블로킹) 후 Mongo insert 를 순차 실행
+- async : DatabaseManager (redis.asyncio 파이프라인 + Mongo insert 동시 실행)
+
+Usage (server/ 에서):
+    python benchmarks/bench_storage.py --requests 500 --concurrency 50 --redis-rtt-ms 0.5 --mongo-rtt-ms 2
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db.database import DatabaseManager
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, value))
+        return self
+
+    async def execute(self):
+        await asyncio.sleep(self.redis.rtt)  # 파이프라인 전체가 한 번의 왕복
+        for key, value in self.commands:
+            self.redis.store[key] = value
+        return [True] * len(self.commands)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeAsyncRedis:
+    """redis.asyncio.Redis 의 필요한 부분만 흉내 (fakeredis 대용)"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.store = {}
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        await asyncio.sleep(self.rtt)
+        return self.store.get(key)
+
+    async def setex(self, key, ttl, value):
+        await asyncio.sleep(self.rtt)
+        self.store[key] = value
+
+
+class FakeCollection:
+    """motor collection 의 필요한 부분만 흉내 (mongomock 대용)"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(self.rtt)
+        self.docs[doc["_id"]] = doc
+
+    async def find_one(self, query):
+        await asyncio.sleep(self.rtt)
+        return self.docs.get(query["_id"])
+
+
+class LegacyStorage:
+    """변경 전 DatabaseManager.save 와 같은 호출 패턴"""
+
+    def __init__(self, redis_rtt: float, mongo_rtt: float):
+        self.redis_rtt = redis_rtt
+        self.collection = FakeCollection(mongo_rtt)
+
+    async def save(self, task_id, data):
+        time.sleep(self.redis_rtt)  # 동기 redis-py 호출이 이벤트 루프를 막음
+        doc = data.copy()
+        doc["_id"] = task_id
+        await self.collection.insert_one(doc)
+
+
+def sample_document(task_id: str) -> dict:
+    return {
+        "task_id": task_id,
+        "filename": "sample.jpg",
+        "file_size": 123456,
+        "timestamp": "2025-01-01T00:00:00",
+        "detection_result": {"is_fake": True, "confidence": 0.97, "verdict": "TRUE"},
+    }
+
+
+async def run(storage, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await storage.save(f"task-{i}", sample_document(f"task-{i}"))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+    return wall, latencies
+
+
+def report(name, wall, latencies, requests):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:>7}: wall={wall * 1000:8.1f} ms  throughput={requests / wall:8.1f} req/s  "
+          f"mean={statistics.mean(latencies) * 1000:6.2f} ms  p95={p95 * 1000:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage overhead benchmark")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--redis-rtt-ms", type=float, default=0.5)
+    parser.add_argument("--mongo-rtt-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    redis_rtt = args.redis_rtt_ms / 1000.0
+    mongo_rtt = args.mongo_rtt_ms / 1000.0
+
+    legacy = LegacyStorage(redis_rtt, mongo_rtt)
+    wall, latencies = asyncio.run(run(legacy, args.requests, args.concurrency))
+    report("legacy", wall, latencies, args.requests)
+
+    db = DatabaseManager()
+    db.redis_client = FakeAsyncRedis(redis_rtt)
+    db.mongo_collection = FakeCollection(mongo_rtt)
+    wall, latencies = asyncio.run(run(db, args.requests, args.concurrency))
+    report("async", wall, latencies, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Face detector backend comparison
+
+이미지 폴더에 대해 각 backend 의 검출 지연, 검출률, 기준 backend 대비 박스 일치도(IoU)를 비교한다.
+모델 파일이 없는 backend (dlib_cnn, yunet) 는 건너뛴다.
+
+Usage (server/ 에서):
+    python benchmarks/compare_face_detectors.py --images app/models/DeepfakeBench_main/face \
+        --backends dlib_hog haar yunet --reference dlib_hog --max-side 640
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+DEEPFAKE_BENCH_ROOT = Path(__file__).resolve().parent.parent / "app" / "models" / "DeepfakeBench_main"
+sys.path.insert(0, str(DEEPFAKE_BENCH_ROOT))
+
+from face_detectors import FACE_DETECTOR_BACKENDS, AdaptiveFaceDetector
+
+from bench_face_detection import IMAGE_EXTENSIONS, iou
+
+
+def best_iou(box, candidates):
+    return max((iou(box, other) for other in candidates), default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=str(DEEPFAKE_BENCH_ROOT / "face"))
+    parser.add_argument("--backends", nargs="+", default=list(FACE_DETECTOR_BACKENDS))
+    parser.add_argument("--reference", default="dlib_hog", help="box agreement 기준 backend")
+    parser.add_argument("--max-side", type=int, default=640, help="0 이면 원본 해상도")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    images = [(p.name, img) for p in paths if (img := cv2.imread(str(p))) is not None]
+    if not images:
+        print(f"No images found in {args.images}")
+        return 1
+
+    detectors = {}
+    for name in dict.fromkeys([args.reference] + args.backends):
+        try:
+            detectors[name] = AdaptiveFaceDetector(backend=name, max_side=args.max_side)
+        except (FileNotFoundError, RuntimeError, ValueError) as e:
+            print(f"skip {name}: {e}")
+    if args.reference not in detectors:
+        print(f"Reference backend {args.reference} is unavailable")
+        return 1
+
+    results = {name: {} for name in detectors}
+    latencies = {name: [] for name in detectors}
+    for name, detector in detectors.items():
+        for image_name, img in images:
+            runs = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                boxes = detector.detect(img)
+                runs.append((time.perf_counter() - start) * 1000.0)
+            latencies[name].append(statistics.median(runs))
+            results[name][image_name] = boxes
+
+    reference = results[args.reference]
+    print(f"{'backend':<10} {'median ms':>10} {'p90 ms':>8} {'found':>7} {'agree':>7} {'mean IoU':>9}")
+    for name in detectors:
+        found = sum(1 for boxes in results[name].values() if boxes)
+        # 기준 backend 가 찾은 얼굴마다 가장 잘 맞는 박스의 IoU
+        ious = [
+            best_iou(ref_box, results[name][image_name])
+            for image_name, ref_boxes in reference.items()
+            for ref_box in ref_boxes
+        ]
+        agree = sum(1 for v in ious if v >= 0.5)
+        values = sorted(latencies[name])
+        p90 = values[min(len(values) - 1, int(len(values) * 0.9))]
+        print(
+            f"{name:<10} {statistics.median(values):>10.1f} {p90:>8.1f} "
+            f"{found:>3}/{len(images):<3} {agree:>3}/{len(ious):<3} "
+            f"{(statistics.mean(ious) if ious else 0.0):>9.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
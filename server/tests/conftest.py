@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+SERVER_ROOT = Path(__file__).resolve().parent.parent
+DEEPFAKE_BENCH_ROOT = SERVER_ROOT / "app" / "models" / "DeepfakeBench_main"
+
+# deepfake_detector.py 와 같은 방식으로 DeepfakeBench_main 의 최상위 모듈(inference_backends 등)을 import
+for path in (SERVER_ROOT, DEEPFAKE_BENCH_ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,119 @@
+"""
+inference_backends: eager 이외 backend 가 샘플 얼굴 크롭에서 eager 와 같은 확률을 내는지 확인
+
+가중치 파일(training/pretrained/xception_best.pth)이 있으면 그 가중치로, 없으면 고정 seed 랜덤 초기화 모델로 비교한다.
+onnx 는 onnxruntime 이 없으면, compile 은 dynamo 미지원 환경이거나 inductor 용 C++ 컴파일러가 없으면 skip
+(그 밖의 compile 실패와 수치 차이는 실패로 보고).
+"""
+import subprocess
+from pathlib import Path
+
+import pytest
+
+torch = pytest.importorskip("torch")
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from inference_backends import DEFAULT_ATOL, EagerBackend, create_backend
+from serving_weights import load_weights
+from training.detectors.xception_detector import XceptionDetector
+
+DEEPFAKE_BENCH_ROOT = Path(__file__).resolve().parent.parent / "app" / "models" / "DeepfakeBench_main"
+WEIGHTS_PATH = DEEPFAKE_BENCH_ROOT / "training" / "pretrained" / "xception_best.pth"
+SAMPLE_CROPS = [DEEPFAKE_BENCH_ROOT / "cropped_test.png"]
+SAMPLE_IMAGES = sorted((DEEPFAKE_BENCH_ROOT / "face").glob("*.*"))
+INPUT_SIZE = 256
+
+
+def to_tensor(img):
+    """DeepfakeDetector 와 같은 정규화: 256x256 RGB, (x / 255 - 0.5) / 0.5"""
+    array = np.asarray(img.convert("RGB").resize((INPUT_SIZE, INPUT_SIZE), Image.BILINEAR), dtype=np.float32)
+    return torch.from_numpy((array / 255.0 - 0.5) / 0.5).permute(2, 0, 1)
+
+
+@pytest.fixture(scope="module")
+def model():
+    config = {
+        'pretrained': None,
+        'backbone_name': 'xception',
+        'backbone_config': {'mode': 'original', 'num_classes': 2, 'inc': 3, 'dropout': False},
+        'loss_func': 'cross_entropy',
+    }
+    torch.manual_seed(0)
+    model = XceptionDetector(config)
+    if WEIGHTS_PATH.exists():
+        model.load_state_dict(load_weights(str(WEIGHTS_PATH)), strict=False)
+    return model.eval()
+
+
+@pytest.fixture(scope="module")
+def faces():
+    """샘플 얼굴 크롭 + face/ 의 샘플 이미지 (256x256 로 축소), 좌우 반전본 포함"""
+    images = [Image.open(path) for path in SAMPLE_CROPS + SAMPLE_IMAGES if path.suffix.lower() in (".png", ".jpg", ".jpeg")]
+    tensors = [to_tensor(img) for img in images]
+    tensors += [tensor.flip(-1) for tensor in tensors]
+    return torch.stack(tensors)
+
+
+@pytest.fixture(scope="module")
+def eager_probs(model, faces):
+    return EagerBackend(model)(faces)
+
+
+def test_eager_backend_matches_detector_forward(model, faces, eager_probs):
+    with torch.no_grad():
+        expected = model({'image': faces, 'label': torch.zeros(len(faces), dtype=torch.long)}, inference=True)['prob']
+    torch.testing.assert_close(eager_probs, expected, rtol=0, atol=1e-6)
+
+
+def _compiler_missing(error):
+    """inductor 가 C++ 컴파일러를 찾지 못하거나 실행하지 못한 경우만 True (수치 / 코드 오류는 False)"""
+    try:
+        from torch._inductor.exc import InvalidCxxCompiler
+    except ImportError:
+        InvalidCxxCompiler = ()
+    inner = getattr(error, "inner_exception", None)
+    return isinstance(inner, (InvalidCxxCompiler, subprocess.CalledProcessError, FileNotFoundError))
+
+
+def _build(name, model):
+    if name == "onnx":
+        pytest.importorskip("onnxruntime")
+    if name != "compile":
+        return create_backend(name, model, verify=False)
+
+    dynamo = pytest.importorskip("torch._dynamo")
+    if not dynamo.is_dynamo_supported():
+        pytest.skip("torch.compile is not supported on this platform / Python version")
+    try:
+        return create_backend(name, model, verify=False)
+    except dynamo.exc.BackendCompilerFailed as e:
+        if _compiler_missing(e):
+            pytest.skip(f"torch.compile has no working C++ compiler: {e.inner_exception}")
+        raise
+
+
+@pytest.mark.parametrize("name", ["torchscript", "compile", "onnx"])
+def test_backend_matches_eager_on_sample_faces(name, model, faces, eager_probs):
+    backend = _build(name, model)
+    probs = backend(faces)
+    assert probs.shape == eager_probs.shape
+    torch.testing.assert_close(probs.float(), eager_probs.float(), rtol=0, atol=DEFAULT_ATOL)
+
+
+@pytest.mark.parametrize("name", ["torchscript", "compile", "onnx"])
+def test_backend_handles_other_batch_sizes(name, model, faces, eager_probs):
+    # trace / export 는 batch 2 예제로 만들어지므로 batch 1 에서도 같은 결과인지 확인
+    backend = _build(name, model)
+    single = backend(faces[:1])
+    torch.testing.assert_close(single.float(), eager_probs[:1].float(), rtol=0, atol=DEFAULT_ATOL)
+
+
+def test_unknown_backend_is_rejected(model):
+    with pytest.raises(ValueError):
+        create_backend("tensorrt", model)
+
+
+def test_int8_requires_weights_path(model):
+    with pytest.raises(ValueError):
+        create_backend("int8", model)